@@ -18,7 +18,9 @@ from database.connection import create_db_and_tables
 
 from .routers import image, text, session_router, user_router, advertisement_router, authentication_router, TI
 from schemas import session_schema, user_schema, advertisement_schema
-from .services.image_main import generator
+from .services import model_registry, executors, llm_clients
+from .services.text_modules import prompt_budget
+from .services.image_main import cfg as image_cfg
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] [%(name)s] - %(message)s')
@@ -33,11 +35,31 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logging.error(f"데이터베이스 생성 실패: {e}")
 
+    image.job_queue.start()
+    llm_clients.startup()
+    try:
+        prompt_budget.initialize()
+    except Exception as e:
+        logging.error(f"프롬프트 토큰 예산 계산 실패: {e}")
+
+    # 무거운 모델은 서버가 요청을 받기 시작한 뒤 백그라운드에서 미리 로드 (warmup.components)
+    warmup_components = image_cfg.get("warmup", {}).get("components", [])
+    warmup_task = asyncio.create_task(executors.run("accelerator", model_registry.warm_up, warmup_components)) if warmup_components else None
+
     yield 
 
     logging.info("FastAPI 서버 종료 중...")
     try:
-        generator.cleanup()
+        image.job_queue.stop(timeout=30)
+        logging.info("배경 생성 작업 큐 정리 완료")
+    except Exception as e:
+        logging.error(f"배경 생성 작업 큐 정리 중 오류 발생: {e}")
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    await llm_clients.shutdown()
+    executors.shutdown()
+    try:
+        model_registry.unload_all()
         logging.info("이미지 생성기 정리 완료")
     except Exception as e:
         logging.error(f"이미지 생성기 정리 중 오류 발생: {e}")
@@ -114,6 +136,19 @@ async def root():
     """서버가 실행 중임을 확인하는 간단한 메시지를 반환합니다."""
     return {"message": "FastAPI에 환영합니다. FastAPI 서버가 실행 중입니다."}
 
+# 준비 상태 엔드포인트
+@app.get("/ready")
+async def ready():
+    """무거운 구성요소(rembg, 이미지 생성기 등)의 로드 상태를 반환합니다. 텍스트/인증/세션 API는 로드 여부와 관계없이 사용할 수 있습니다."""
+    components = model_registry.status()
+    return {
+        "ready": all(component["loaded"] for component in components.values()),
+        "components": components,
+        "executors": executors.stats(),
+        "llm_cache": llm_clients.cache_stats(),
+        "llm_governor": llm_clients.governor_stats(),
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
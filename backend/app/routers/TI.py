@@ -2,6 +2,7 @@
 from fastapi import APIRouter, HTTPException, status
 from services.TI_modules.TI_schemas import TextImageRequest, TextImageResponse, FontListResponse
 from services.TI_modules.TI_models import text_image_service
+from app.services import executors
 
 router = APIRouter(prefix="/text-image", tags=["Text-Image Generation"])
 
@@ -38,8 +39,10 @@ async def generate_text_image(request: TextImageRequest):
                     detail="단어별 색상 모드에서는 테두리 색상 개수가 단어 개수와 일치해야 합니다."
                 )
         
-        # 이미지 생성
-        image_base64, format_name, error_message = text_image_service.generate_text_image(
+        # 이미지 생성 (PIL 렌더링/인코딩은 CPU 풀에서 실행)
+        image_base64, format_name, error_message = await executors.run(
+            "cpu",
+            text_image_service.generate_text_image,
             text=request.text,
             font_name=request.font_name,
             font_size=request.font_size,
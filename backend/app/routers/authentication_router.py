@@ -8,6 +8,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import Session 
 from jose import jwt, JWTError 
 
+from app.services import executors
 from database.connection import get_session 
 from crud import user_crud 
 from schemas import user_schema as schemas 
@@ -37,10 +38,10 @@ async def login_for_access_token(
     user_login: schemas.UserLogin, # JSON 형식의 이메일과 비밀번호를 포함한 요청 본문
     db: Annotated[Session, Depends(get_session)]
 ):
-    user = user_crud.get_user_by_email(db, email=user_login.email)
+    user = await executors.run("db", user_crud.get_user_by_email, db, email=user_login.email)
     
-    # 사용자와 비밀번호 검증
-    if not user or not verify_password(user_login.password, user.password):
+    # 사용자와 비밀번호 검증 (bcrypt는 CPU 풀에서 실행)
+    if not user or not await executors.run("cpu", verify_password, user_login.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="이메일 또는 비밀번호가 잘못 입력되었습니다.",
@@ -1,15 +1,16 @@
 # backend/app/routers/image.py
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Header, Depends, status, Body
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Header, Depends, status, Body, Query
 from fastapi.responses import StreamingResponse
-import io, logging, os
+import io, json, logging, os, uuid
 from PIL import Image
-from typing import Annotated, Union, Literal
+from typing import Annotated, Optional, Union, Literal
 from sqlmodel import Session
 from pydantic import BaseModel
 
-from app.services import image_main
-from database.connection import get_session
-from utils.sha_save_image import save_image_to_disk
+from app.services import image_main, image_jobs, executors, progress_events
+from database.connection import get_session, engine
+from utils.sha_save_image import save_image_to_disk, save_bytes_to_disk
+from utils.cutout_cache import CutoutCache
 from crud import advertisement_crud, session_crud
 
 logger = logging.getLogger(__name__)
@@ -20,6 +21,15 @@ BACKEND_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..",
 STATIC_ROOT_DIR_IMAGE_ROUTER = os.path.join(BACKEND_ROOT_DIR, "static")
 GENERATED_IMAGES_SUBDIR_NAME = "generated_images"
 TEMP_SESSION_IMAGES_SUBDIR_NAME = "temp_session_images"
+CUTOUT_CACHE_SUBDIR_NAME = "cutout_cache"
+
+CUTOUT_CACHE_CONFIG = image_main.cfg.get("cutout_cache", {})
+cutout_cache = CutoutCache(
+    os.path.join(STATIC_ROOT_DIR_IMAGE_ROUTER, CUTOUT_CACHE_SUBDIR_NAME),
+    max_bytes=CUTOUT_CACHE_CONFIG.get("max_mb", 512) * 1024 * 1024,
+    max_entries=CUTOUT_CACHE_CONFIG.get("max_entries", 2000),
+    max_age=CUTOUT_CACHE_CONFIG.get("max_age_sec", 7 * 24 * 3600),
+)
 
 class ProductBox(BaseModel):
     canvas_type: str
@@ -32,6 +42,49 @@ class BackgroundRequest(BaseModel):
     mode: Literal["inpaint"]
     prompt: str
     product_box: ProductBox
+    use_prompt_cache: bool = True  # False면 같은 입력이어도 광고 기획/프롬프트를 새로 생성
+    profile: Optional[str] = None  # 생성 프로필 (model_config.yaml의 generation_profiles, None이면 기본 프로필)
+    phase: Literal["full", "preview", "refine"] = "full"  # preview: 빠른 저해상도 미리보기 / refine: 선택한 미리보기를 원래 품질로 정제
+    preview_id: Optional[str] = None  # refine일 때 정제할 미리보기 (preview 작업 결과의 preview_id)
+    seed: Optional[int] = None        # preview일 때 사용할 seed (None이면 무작위)
+
+def _remove_background_cached(image_bytes: bytes, session_id: str) -> bytes:
+    """CPU 풀에서 호출됩니다. 같은 이미지 + 같은 rembg 설정이면 캐시된 배경 제거 결과(PNG 바이트)를 그대로 사용합니다."""
+    cache_key = CutoutCache.make_key(image_bytes, image_main.cfg.get("rembg", {}))
+    back_rm_bytes = cutout_cache.get(cache_key)
+    if back_rm_bytes is not None:
+        logger.info(f"세션 {session_id}: 배경 제거 캐시 적중 ({cache_key[:12]})")
+        return back_rm_bytes
+
+    image = Image.open(io.BytesIO(image_bytes)).convert("RGBA")
+    back_rm = image_main.step1(image)
+    buffer = io.BytesIO()
+    back_rm.save(buffer, format="PNG")
+    back_rm_bytes = buffer.getvalue()
+    cutout_cache.put(cache_key, back_rm_bytes)
+    return back_rm_bytes
+
+def _store_back_rm(db: Session, session_id: str, category: str, back_rm_bytes: bytes):
+    """DB 풀에서 호출됩니다. 배경 제거 이미지를 세션 디렉토리에 저장하고 세션 데이터를 업데이트합니다."""
+    db_session_entry = session_crud.get_session_by_id(db, session_id)
+    if not db_session_entry:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="세션을 찾을 수 없습니다.")
+
+    session_data = db_session_entry.session_data if db_session_entry.session_data is not None else {} 
+
+    # static/temp_session_images/{session_id} 디렉토리 생성
+    session_temp_dir = os.path.join(STATIC_ROOT_DIR_IMAGE_ROUTER, TEMP_SESSION_IMAGES_SUBDIR_NAME, session_id)
+    os.makedirs(session_temp_dir, exist_ok=True)
+
+    # back_rm 저장
+    back_rm_full_path = save_bytes_to_disk(back_rm_bytes, session_temp_dir)
+    session_data["back_rm_url"] = f"/static/{os.path.relpath(back_rm_full_path, STATIC_ROOT_DIR_IMAGE_ROUTER).replace(os.sep, '/')}"
+
+    session_data["category"] = category
+
+    session_crud.update_session_data(db, db_session_entry, session_data)
+    updated_session = session_crud.get_session_by_id(db, session_id) # 검증
+    logger.info(f"세션 {session_id}: 세션 데이터 업데이트 완료: {updated_session.session_data}")
 
 @router.post("/preprocess")
 async def preprocess_image(
@@ -43,38 +96,15 @@ async def preprocess_image(
     """새로운 세션을 초기화하거나 기존 세션을 업데이트합니다."""
     try:
         image_bytes = await file.read()
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGBA")
         logger.info(f"세션 {session_id}: 이미지 전처리 시작")
-        image_main.generator.cfg['paths']['product_image'] = image
-
-        back_rm = image_main.step1() 
 
-        db_session_entry = session_crud.get_session_by_id(db, session_id)
-        if not db_session_entry:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="세션을 찾을 수 없습니다.")
-
-        session_data = db_session_entry.session_data if db_session_entry.session_data is not None else {} 
-
-        # static/temp_session_images/{session_id} 디렉토리 생성
-        session_temp_dir = os.path.join(STATIC_ROOT_DIR_IMAGE_ROUTER, TEMP_SESSION_IMAGES_SUBDIR_NAME, session_id)
-        os.makedirs(session_temp_dir, exist_ok=True)
-
-        # back_rm 저장
-        back_rm_full_path = save_image_to_disk(back_rm, session_temp_dir, prefix="back_rm_")
-        session_data["back_rm_url"] = f"/static/{os.path.relpath(back_rm_full_path, STATIC_ROOT_DIR_IMAGE_ROUTER).replace(os.sep, '/')}"
-
-        session_data["category"] = category
-
-        session_crud.update_session_data(db, db_session_entry, session_data)
-        updated_session = session_crud.get_session_by_id(db, session_id) # 검증
-        logger.info(f"세션 {session_id}: 세션 데이터 업데이트 완료: {updated_session.session_data}")
+        back_rm_bytes = await executors.run("cpu", _remove_background_cached, image_bytes, session_id)
+        await executors.run("db", _store_back_rm, db, session_id, category, back_rm_bytes)
+        progress_events.publish(session_id, "cutout_ready", category=category)
 
         # 전처리된 이미지를 캔버스에 적용
-        buffer = io.BytesIO()
-        back_rm.save(buffer, format="PNG")
-        buffer.seek(0)
         logger.info(f"세션 {session_id}: 이미지 전처리 완료 및 세션 데이터 업데이트")
-        return StreamingResponse(buffer, media_type="image/png")
+        return StreamingResponse(io.BytesIO(back_rm_bytes), media_type="image/png")
     
     except HTTPException:
         raise
@@ -82,68 +112,20 @@ async def preprocess_image(
         logger.error(f"세션 {session_id}: 이미지 전처리 실패: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-@router.post("/generate-background", response_model=dict)
-async def generate_background(
-    db: Annotated[Session, Depends(get_session)],
-    request: BackgroundRequest = Body(...), 
-    session_id: str = Header(..., alias="session-id"),
-):
-    try:
-        print("RUNNING GENERATE BACKGROUND!!!")
+def _save_generated_background(spec: image_jobs.BackgroundJobSpec, generated_image: Image.Image) -> dict:
+    """작업 워커에서 호출됩니다. 생성된 배경 이미지를 저장하고 광고 객체를 생성한 뒤 결과를 반환합니다."""
+    session_id = spec.session_id
+    with Session(engine) as db:
         db_session_entry = session_crud.get_session_by_id(db, session_id)
-        if not db_session_entry or not db_session_entry.session_data:
-            logger.error(f"세션 {session_id}: 데이터베이스에 세션 데이터 없음")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="세션 데이터를 찾을 수 없습니다. /preprocess 먼저 호출해주세요.")
-
-        session_data = db_session_entry.session_data
-        logger.info(f"세션 {session_id}: Generate-Background 함수 - 세션 데이터: {session_data}")
-
-        # 저장된 URL에서 이미지 불러오기
-        back_rm_url = session_data.get("back_rm_url") 
-
-        logger.info(f"세션 {session_id}: Generate-Background 함수 - 추출한 URL: back_rm={back_rm_url}")
-
-        if not back_rm_url:
-            logger.error(f"세션 {session_id}: 데이터베이스 세션에 필요한 이미지 또는 마스크 이미지 URL 없음")
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="세션에 해당하는 이미지가 없습니다. /preprocess 먼저 호출해주세요.")
-
-        # 이미지 URL에서 파일 경로 추출
-        back_rm_path = os.path.join(STATIC_ROOT_DIR_IMAGE_ROUTER, back_rm_url.replace("/static/", "").replace('/', os.sep))
-        if not os.path.exists(back_rm_path):
-            logger.error(f"세션 {session_id}: 저장된 back_rm 파일이 없습니다: {back_rm_path}")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="백그라운드가 제거된 이미지가 파일 시스템에서 발견되지 않습니다.")
-
-        image_main.generator.back_rm = Image.open(back_rm_path).convert("RGBA")
-        logger.info(f"세션 {session_id}: back_rm 이미지를 로드하여 generator에 설정 완료.")
-
-        image_main.generator.category = session_data.get("category") 
-        image_main.generator.marketing_type = request.prompt
-        size_info = (int(request.product_box.width), int(request.product_box.height))
-        position = (int(request.product_box.x), int(request.product_box.y))
-        
-        image_main.generator.cfg['image_config']['resize_info'] = size_info
-        image_main.generator.cfg['image_config']['position'] = position
-        image_main.generator.cfg['canvas_type'] = request.product_box.canvas_type
-        
-        logger.info(f"***************캔버스 종류: {image_main.generator.cfg['canvas_type']}")
-        logger.info(f"세션 {session_id}: 배경 생성 시작, 모드: {request.mode}")
-        logger.info(f"세션 {session_id}: 프롬프트: {request.prompt}")
-        logger.info(f"세션 {session_id}: 제품 박스: {request.product_box}")
-
-        canv, _, mask = image_main.step1_5() 
-        result = image_main.step2(
-            mode=request.mode,
-            canvas=canv,
-            mask=mask
-        )
-
-        generated_image: Image.Image = result[0] if isinstance(result, list) else result
+        if not db_session_entry:
+            raise RuntimeError(f"세션 {session_id}: 데이터베이스에 세션 정보가 없습니다. 광고를 저장할 수 없습니다.")
+        session_data = db_session_entry.session_data or {}
 
         session_temp_dir = os.path.join(STATIC_ROOT_DIR_IMAGE_ROUTER, TEMP_SESSION_IMAGES_SUBDIR_NAME, session_id)
         os.makedirs(session_temp_dir, exist_ok=True)
         generated_background_temp_path = save_image_to_disk(generated_image, session_temp_dir, prefix="generated_bg_")
         session_data["generated_background_url"] = f"/static/{os.path.relpath(generated_background_temp_path, STATIC_ROOT_DIR_IMAGE_ROUTER).replace(os.sep, '/')}"
-        
+
         logger.info(f"세션 {session_id}: 배경 이미지 생성 완료 및 임시 세션 데이터 업데이트")
 
         # 1. 생성한 광고 이미지 저장 
@@ -156,23 +138,15 @@ async def generate_background(
         logger.info(f"세션 {session_id}: 배경 이미지 URL 경로: {image_url_path}")
 
         # 2. user_id 가지고 오기
-        user_id = None
-        db_session_entry = session_crud.get_session_by_id(db, session_id)
-        if db_session_entry:
-            user_id = db_session_entry.user_id
-            logger.info(f"세션 {session_id}: 사용자 아이디 {user_id} 확인")
-        else:
-            logger.warning(f"세션 {session_id}: 데이터베이스에 세션 정보가 없습니다. 광고를 저장할 수 없습니다.")
-        
+        user_id = db_session_entry.user_id
         if user_id is None:
-            logger.error(f"세션 {session_id}: 사용자 아이디가 없습니다. 광고를 생성할 수 없습니다.")
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="사용자 아이디가 없습니다. 광고를 생성할 수 없습니다.")
+            raise RuntimeError(f"세션 {session_id}: 사용자 아이디가 없습니다. 광고를 생성할 수 없습니다.")
 
         # 3. 광고 객체 생성
         advertisement = advertisement_crud.create_advertisement(
             db=db,
             user_id=user_id,
-            description=request.prompt,
+            description=spec.prompt,
         )
         logger.info(f"세션 {session_id}: 광고 객체 생성 완료: {advertisement}")
 
@@ -188,16 +162,257 @@ async def generate_background(
         session_data["advertisement_id"] = advertisement.id
         session_crud.update_session_data(db, db_session_entry, session_data)
 
+        progress_events.publish(session_id, "saved", phase=spec.phase, advertisement_id=advertisement.id, image_url=image_url_path)
         return {"message": "배경 이미지 생성 완료 및 광고 저장 완료", "advertisement_id": advertisement.id, "image_url": image_url_path}
 
+def _save_preview(spec: image_jobs.BackgroundJobSpec, preview: image_main.PreviewResult) -> dict:
+    """
+    작업 워커에서 호출됩니다. 미리보기 이미지를 세션 임시 폴더에 저장하고, 정제에 필요한 정보(seed, 프롬프트, 제품 박스)를 세션에 기록합니다.
+    광고 객체는 만들지 않으며, 세션당 최근 max_previews개만 보관합니다.
+    """
+    session_id = spec.session_id
+    with Session(engine) as db:
+        db_session_entry = session_crud.get_session_by_id(db, session_id)
+        if not db_session_entry:
+            raise RuntimeError(f"세션 {session_id}: 데이터베이스에 세션 정보가 없습니다. 미리보기를 저장할 수 없습니다.")
+        session_data = db_session_entry.session_data or {}
+
+        session_temp_dir = os.path.join(STATIC_ROOT_DIR_IMAGE_ROUTER, TEMP_SESSION_IMAGES_SUBDIR_NAME, session_id)
+        os.makedirs(session_temp_dir, exist_ok=True)
+        preview_path = save_image_to_disk(preview.image, session_temp_dir, prefix="preview_bg_")
+        preview_url = f"/static/{os.path.relpath(preview_path, STATIC_ROOT_DIR_IMAGE_ROUTER).replace(os.sep, '/')}"
+
+        preview_id = uuid.uuid4().hex
+        latents_path = image_main.save_preview_latents(preview, os.path.splitext(preview_path)[0] + ".latents.pt")
+        previews = dict(session_data.get("background_previews", {}))
+        previews[preview_id] = {
+            "image_url": preview_url,
+            "latents_path": latents_path,
+            "seed": preview.seed,
+            "sd_prompt": preview.prompt,
+            "prompt": spec.prompt,
+            "canvas_type": spec.canvas_type,
+            "product_box": list(spec.product_box),
+        }
+        max_previews = image_main.progressive_settings()["max_previews"]
+        for old_id in list(previews.keys())[:-max_previews]:
+            old_preview = previews.pop(old_id)
+            old_files = [old_preview.get("latents_path")]
+            if old_preview.get("image_url"):
+                old_files.append(os.path.join(STATIC_ROOT_DIR_IMAGE_ROUTER, old_preview["image_url"].replace("/static/", "").replace('/', os.sep)))
+            for old_file in old_files:
+                if old_file and os.path.exists(old_file):
+                    os.remove(old_file)
+        session_data["background_previews"] = previews
+        session_crud.update_session_data(db, db_session_entry, session_data)
+
+    logger.info(f"세션 {session_id}: 미리보기 저장 완료: {preview_id} (seed {preview.seed})")
+    progress_events.publish(session_id, "saved", phase=spec.phase, preview_id=preview_id, image_url=preview_url, seed=preview.seed)
+    return {"message": "미리보기 생성 완료", "preview_id": preview_id, "image_url": preview_url, "seed": preview.seed}
+
+def _complete_background_job(spec: image_jobs.BackgroundJobSpec, result) -> dict:
+    """작업 워커에서 호출됩니다. 미리보기는 세션에만 기록하고, 전체 생성과 정제 결과는 광고로 저장합니다."""
+    if spec.phase == "preview":
+        return _save_preview(spec, result)
+    return _save_generated_background(spec, result)
+
+def _publish_job_status(job: image_jobs.BackgroundJob):
+    """작업 큐의 상태 변화(queued / running / done / failed)를 세션 진행 이벤트로 발행합니다."""
+    data = {"job_id": job.job_id, "phase": job.spec.phase}
+    if job.status == image_jobs.JOB_DONE:
+        data["result"] = job.result
+    elif job.status == image_jobs.JOB_FAILED:
+        data["error"] = job.error
+    progress_events.publish(job.spec.session_id, job.status, **data)
+
+JOB_CONFIG = image_main.cfg.get("jobs", {})
+
+job_queue = image_jobs.BackgroundJobQueue(
+    runner=image_main.run_background_batch,
+    on_complete=_complete_background_job,
+    on_status=_publish_job_status,
+    max_queue_size=JOB_CONFIG.get("max_queue_size", 32),
+    result_ttl=JOB_CONFIG.get("result_ttl_sec", 3600),
+    batch_key=image_main.batch_key,
+    max_batch_size=JOB_CONFIG.get("batching", {}).get("max_batch_size", 1),
+    max_wait=JOB_CONFIG.get("batching", {}).get("max_wait_ms", 0) / 1000,
+    batch_limit=image_main.batch_limit,
+)
+
+@router.post("/generate-background", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+@executors.offload("db")
+def generate_background(
+    db: Annotated[Session, Depends(get_session)],
+    request: BackgroundRequest = Body(...), 
+    session_id: str = Header(..., alias="session-id"),
+):
+    """
+    배경 생성 작업을 대기열에 등록하고 곧바로 job_id를 반환합니다.
+    진행 상태는 /image/events (세션 진행 이벤트) 또는 /image/jobs/{job_id}로 확인합니다.
+
+    phase
+        - full: 원래 품질로 바로 생성하고 광고로 저장
+        - preview: 적은 step, 낮은 해상도로 빠르게 미리보기만 생성 (결과: preview_id, image_url, seed)
+        - refine: preview_id의 미리보기 latent를 같은 seed와 프롬프트로 이어서 정제하여 광고로 저장 (제품 박스는 미리보기의 값을 사용)
+    """
+    try:
+        db_session_entry = session_crud.get_session_by_id(db, session_id)
+        if not db_session_entry or not db_session_entry.session_data:
+            logger.error(f"세션 {session_id}: 데이터베이스에 세션 데이터 없음")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="세션 데이터를 찾을 수 없습니다. /preprocess 먼저 호출해주세요.")
+
+        if db_session_entry.user_id is None:
+            logger.error(f"세션 {session_id}: 사용자 아이디가 없습니다. 광고를 생성할 수 없습니다.")
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="사용자 아이디가 없습니다. 광고를 생성할 수 없습니다.")
+
+        session_data = db_session_entry.session_data
+        logger.info(f"세션 {session_id}: Generate-Background 함수 - 세션 데이터: {session_data}")
+
+        if request.profile is not None and request.profile not in image_main.profile_names():
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"지원하지 않는 생성 프로필입니다: {request.profile} (선택 가능: {image_main.profile_names()})")
+
+        # 저장된 URL에서 이미지 불러오기
+        back_rm_url = session_data.get("back_rm_url") 
+
+        logger.info(f"세션 {session_id}: Generate-Background 함수 - 추출한 URL: back_rm={back_rm_url}")
+
+        if not back_rm_url:
+            logger.error(f"세션 {session_id}: 데이터베이스 세션에 필요한 이미지 또는 마스크 이미지 URL 없음")
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="세션에 해당하는 이미지가 없습니다. /preprocess 먼저 호출해주세요.")
+
+        # 이미지 URL에서 파일 경로 추출
+        back_rm_path = os.path.join(STATIC_ROOT_DIR_IMAGE_ROUTER, back_rm_url.replace("/static/", "").replace('/', os.sep))
+        if not os.path.exists(back_rm_path):
+            logger.error(f"세션 {session_id}: 저장된 back_rm 파일이 없습니다: {back_rm_path}")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="백그라운드가 제거된 이미지가 파일 시스템에서 발견되지 않습니다.")
+
+        canvas_type = request.product_box.canvas_type
+        product_box = (
+            int(request.product_box.x),
+            int(request.product_box.y),
+            int(request.product_box.width),
+            int(request.product_box.height),
+        )
+        progressive = image_main.progressive_settings()
+        phase_fields = {"profile": request.profile}
+        if request.phase == "preview":
+            phase_fields = {"profile": request.profile or progressive["preview_profile"], "seed": request.seed}
+        elif request.phase == "refine":
+            preview = session_data.get("background_previews", {}).get(request.preview_id) if request.preview_id else None
+            if preview is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="정제할 미리보기를 찾을 수 없습니다. phase=preview로 먼저 생성해주세요.")
+            preview_image_path = os.path.join(STATIC_ROOT_DIR_IMAGE_ROUTER, preview["image_url"].replace("/static/", "").replace('/', os.sep))
+            if not os.path.exists(preview_image_path):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="미리보기 이미지 파일이 없습니다.")
+            # 미리보기의 구도를 이어받으므로 제품 박스와 캔버스는 미리보기의 값을 사용
+            canvas_type = preview["canvas_type"]
+            product_box = tuple(preview["product_box"])
+            phase_fields = {
+                "profile": request.profile or progressive["refine_profile"],
+                "seed": preview["seed"],
+                "sd_prompt": preview["sd_prompt"],
+                "preview_image_path": preview_image_path,
+                "preview_latents_path": preview.get("latents_path") if preview.get("latents_path") and os.path.exists(preview["latents_path"]) else None,
+            }
+
+        spec = image_jobs.BackgroundJobSpec(
+            session_id=session_id,
+            mode=request.mode,
+            canvas_type=canvas_type,
+            product_box=product_box,
+            category=session_data.get("category"),
+            prompt=request.prompt,
+            back_rm_path=back_rm_path,
+            use_prompt_cache=request.use_prompt_cache,
+            phase=request.phase,
+            **phase_fields,
+        )
+        logger.info(f"세션 {session_id}: 배경 생성 작업 등록, 모드: {request.mode}, 단계: {spec.phase}, 캔버스 종류: {spec.canvas_type}")
+        logger.info(f"세션 {session_id}: 프롬프트: {request.prompt}")
+        logger.info(f"세션 {session_id}: 제품 박스: {request.product_box}")
+
+        job = job_queue.submit(spec)
+        return {"job_id": job.job_id, "status": job.status, "queue_position": job_queue.position(job.job_id)}
+
     except HTTPException:
         raise
+    except image_jobs.QueueFullError as e:
+        logger.warning(f"세션 {session_id}: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
-        logger.error(f"세션 {session_id}: 배경 생성 실패 및 광고 저장 실패: {str(e)}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"배경 생성 실패 및 광고 저장 실패: {str(e)}")
+        logger.error(f"세션 {session_id}: 배경 생성 작업 등록 실패: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"배경 생성 작업 등록 실패: {str(e)}")
+
+@router.get("/jobs/{job_id}", response_model=dict)
+async def get_job_status(job_id: str):
+    """배경 생성 작업의 진행 상태를 조회합니다."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="작업을 찾을 수 없습니다.")
+    job_info = job.to_dict()
+    if job.status == image_jobs.JOB_QUEUED:
+        job_info["queue_position"] = job_queue.position(job_id)
+    return job_info
+
+@router.get("/jobs/{job_id}/result", response_model=dict)
+async def get_job_result(job_id: str):
+    """완료된 배경 생성 작업의 결과(광고 아이디, 이미지 URL)를 반환합니다."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="작업을 찾을 수 없습니다.")
+    if job.status == image_jobs.JOB_FAILED:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"배경 생성 실패 및 광고 저장 실패: {job.error}")
+    if job.status != image_jobs.JOB_DONE:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"작업이 아직 완료되지 않았습니다. 상태: {job.status}")
+    return job.result
+
+def _sse_event(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['stage']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+@router.get("/events")
+async def stream_progress_events(
+    session_header: Optional[str] = Header(None, alias="session-id"),
+    session_query: Optional[str] = Query(None, alias="session_id"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    after: int = Query(0, ge=0),
+):
+    """
+    세션의 배경 생성 진행 이벤트 (Server-Sent Events).
+    브라우저 EventSource는 헤더를 보낼 수 없으므로 세션 아이디는 session-id 헤더 또는 session_id 쿼리로 받습니다.
+    각 이벤트의 id는 세션 내 순번(seq)이며, 다시 연결하면(Last-Event-ID 또는 after) 그 이후의 보관 이벤트부터 이어서 보냅니다.
+
+    이벤트: queued / running {job_id, phase} / cutout_ready / canvas_ready / plan_ready {ad_plan, copy, cached} / prompt_ready {prompt, cached}
+        / diffusion_step {step, total, preview?} / scoring {candidates} / saved {image_url, ...} / done {job_id, result} / failed {job_id, error}
+    """
+    session_id = session_header or session_query
+    if not session_id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="session-id 헤더 또는 session_id 쿼리가 필요합니다.")
+    if last_event_id and last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+    keepalive = image_main.progress_event_settings()["keepalive_sec"]
+
+    async def event_stream():
+        async for event in progress_events.broker.subscribe(session_id, after=after, heartbeat=keepalive):
+            yield _sse_event(event) if event is not None else ": keep-alive\n\n"
+
+    logger.info(f"세션 {session_id}: 진행 이벤트 구독 (after={after})")
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/pipeline-pool", response_model=dict)
+def get_pipeline_pool_stats():
+    """상주 파이프라인 풀의 hit/miss/eviction 카운터와 상주 모델 정보를 반환합니다."""
+    # 워커가 가중치를 로드하는 동안 풀 잠금을 기다릴 수 있으므로 스레드풀에서 실행되도록 동기 함수로 둔다.
+    if not image_main.generator.loaded:
+        return {"loaded": False}
+    return {"loaded": True, **image_main.get_generator().pool.stats()}
 
 @router.get("/generated-background")
-async def get_generated_background(db: Annotated[Session, Depends(get_session)], session_id: str = Header(..., alias="session-id")):
+@executors.offload("db")
+def get_generated_background(db: Annotated[Session, Depends(get_session)], session_id: str = Header(..., alias="session-id")):
     """세션 아이디로 생성된 배경 이미지 데이터를 조회합니다."""
     try:
         db_session_entry = session_crud.get_session_by_id(db, session_id)
@@ -217,10 +432,9 @@ async def get_generated_background(db: Annotated[Session, Depends(get_session)],
             logger.error(f"세션 {session_id}: 저장된 배경 이미지 파일이 없습니다: {image_path}")
             raise HTTPException(status_code=404, detail="배경 이미지가 파일 시스템에서 발견되지 않습니다.")
 
-        image = Image.open(image_path) # PIL.Image 객체
-        img_bytes = io.BytesIO()
-        image.save(img_bytes, format="PNG")
-        img_bytes.seek(0)
+        # 저장된 파일은 이미 PNG이므로 다시 인코딩하지 않고 그대로 반환
+        with open(image_path, "rb") as f:
+            img_bytes = io.BytesIO(f.read())
 
         logger.info(f"세션 {session_id}: 배경 이미지 반환")
         return StreamingResponse(img_bytes, media_type="image/png")
@@ -6,6 +6,7 @@ from fastapi import APIRouter, Header, Depends, HTTPException, status
 from fastapi.responses import JSONResponse 
 from sqlmodel import Session
 
+from app.services import executors
 from database.connection import get_session 
 from crud import session_crud, user_crud # 데이터베이스 CRUD 함수
 from schemas import session_schema as schemas # Pydantic 세션 스키마
@@ -16,7 +17,8 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/sessions", tags=["Sessions"])
 
 @router.post("/init", response_model=schemas.SessionRead, status_code=status.HTTP_201_CREATED)
-async def init_session(
+@executors.offload("db")
+def init_session(
     session_id: Annotated[str, Header(alias="session-id", description="React 앱에서 사용하는 고유 식별자입니다.")],
     db: Annotated[Session, Depends(get_session)],
     user_id: Annotated[Optional[int], Header(alias="user-id", description="로그인한 사용자의 선택적 아이디입니다.")] = None
@@ -53,7 +55,8 @@ async def init_session(
 
 
 @router.get("/{session_id}", response_model=schemas.SessionRead)
-async def get_session_data(
+@executors.offload("db")
+def get_session_data(
     session_id: str,
     db: Annotated[Session, Depends(get_session)]
 ) -> DBSession:
@@ -72,7 +75,8 @@ async def get_session_data(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"세션 데이터 조회 실패: {str(e)}")
 
 @router.patch("/{session_id}/data", response_model=schemas.SessionRead)
-async def update_session_data_endpoint(
+@executors.offload("db")
+def update_session_data_endpoint(
     session_id: str,
     data: Dict[str, Any],
     db: Annotated[Session, Depends(get_session)]
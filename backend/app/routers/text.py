@@ -1,14 +1,18 @@
 # backend/app/routers/text.py
 from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Annotated 
+from typing import Annotated, List, Tuple
 from sqlmodel import Session
-import logging
+import json, logging
 
 from app.services.text_modules.text_models import OpenAIClient
 from app.services.text_modules.text_prompts import PROMPT_CONFIGS
+from app.services.text_modules import prompt_budget, candidate_ranker
 
-from database.connection import get_session
+from app.services import executors
+from app.services.llm_clients import get_openai_client
+from database.connection import get_session, engine
 from crud import advertisement_crud, session_crud
 from schemas.advertisement_schema import AdvertisementCopyCreate 
 
@@ -23,45 +27,60 @@ class TextGenRequest(BaseModel):
     user_prompt: str    # 사용자 설명
     session_id: str     # 세션 아이디
 
-@router.post("/generate")
-async def generate_text(req: TextGenRequest, db: Annotated[Session, Depends(get_session)]):
-    """사용자 프롬프트와 광고 유형에 따라 광고 문구를 생성하고, 생성된 문구를 데이터베이스에 저장합니다."""
-    try:
-        if req.ad_type not in PROMPT_CONFIGS:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"지원하지 않는 광고 유형입니다: {req.ad_type}")
-        if req.model_type not in ["mini", "nano"]:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"지원하지 않는 모델 유형입니다: {req.model_type}")
-        
-        db_session_entry = session_crud.get_session_by_id(db, req.session_id)
-        if not db_session_entry or not db_session_entry.session_data:
-            logger.error(f"세션 {req.session_id}: 데이터베이스에 세션 데이터 없음")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="세션 데이터를 찾을 수 없습니다. 이미지 전처리 또는 이전 단계가 먼저 호출되어야 합니다.")
+async def _prepare_generation(req: TextGenRequest, db: Session, save_prompt: bool = True):
+    """요청을 검증하고 (save_prompt이면) 사용자 프롬프트를 세션에 저장합니다. (세션 엔트리, 세션 데이터, 광고 아이디)를 반환합니다."""
+    if req.ad_type not in PROMPT_CONFIGS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"지원하지 않는 광고 유형입니다: {req.ad_type}")
+    if req.model_type not in ["mini", "nano"]:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"지원하지 않는 모델 유형입니다: {req.model_type}")
+    
+    db_session_entry = await executors.run("db", session_crud.get_session_by_id, db, req.session_id)
+    if not db_session_entry or not db_session_entry.session_data:
+        logger.error(f"세션 {req.session_id}: 데이터베이스에 세션 데이터 없음")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="세션 데이터를 찾을 수 없습니다. 이미지 전처리 또는 이전 단계가 먼저 호출되어야 합니다.")
 
-        session_data = db_session_entry.session_data
+    session_data = db_session_entry.session_data
 
-        advertisement_id = session_data.get("advertisement_id")
-        if not advertisement_id:
-            logger.error(f"세션 {req.session_id}: 세션 데이터에 광고 아이디가 없습니다.")
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="세션에 광고 아이디가 없습니다. 이미지 배경 생성 단계가 먼저 완료되어야 합니다.")
+    advertisement_id = session_data.get("advertisement_id")
+    if not advertisement_id:
+        logger.error(f"세션 {req.session_id}: 세션 데이터에 광고 아이디가 없습니다.")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="세션에 광고 아이디가 없습니다. 이미지 배경 생성 단계가 먼저 완료되어야 합니다.")
 
+    if save_prompt:
         session_data["user_prompt"] = req.user_prompt
         # 세션 데이터 업데이트
-        session_crud.update_session_data(db, db_session_entry, session_data) 
+        await executors.run("db", session_crud.update_session_data, db, db_session_entry, session_data)
         logger.info(f"세션 {req.session_id}: 사용자 프롬프트 세션에 저장됨.")
+    return db_session_entry, session_data, advertisement_id
 
-        system_prompt, few_shot_examples = PROMPT_CONFIGS[req.ad_type]
+@router.post("/generate")
+async def generate_text(
+    req: TextGenRequest,
+    db: Annotated[Session, Depends(get_session)],
+    client: Annotated[OpenAIClient, Depends(get_openai_client)],
+):
+    """사용자 프롬프트와 광고 유형에 따라 광고 문구를 생성하고, 생성된 문구를 데이터베이스에 저장합니다."""
+    try:
+        db_session_entry, session_data, advertisement_id = await _prepare_generation(req, db)
 
-        client = OpenAIClient()
-        result = await client.run_generation(
-            req.model_type,
-            req.user_prompt,
-            system_prompt,
-            few_shot_examples
-        )
+        system_prompt, few_shot_examples, strategy = PROMPT_CONFIGS[req.ad_type]
+
+        with prompt_budget.track_usage(req.ad_type) as usage:
+            result = await client.run_generation(
+                req.model_type,
+                req.user_prompt,
+                system_prompt,
+                few_shot_examples,
+                strategy
+            )
+        logger.info(f"세션 {req.session_id}: 토큰 사용량 {usage.to_dict()}")
+
+        # 거의 같은 후보를 합치고 점수순으로 상위 top_k개만 남김 (첫 번째 후보가 기본 선택값)
+        result = await executors.run("cpu", candidate_ranker.rank_candidates, result, req.ad_type, strategy.top_k, strategy.dedup_threshold)
 
         session_data["generated_text"] = result
         # 세션 데이터 업데이트
-        session_crud.update_session_data(db, db_session_entry, session_data)
+        await executors.run("db", session_crud.update_session_data, db, db_session_entry, session_data)
         logger.info(f"세션 {req.session_id}: 광고 문구 생성 완료 및 세션에 저장: {result}")
 
         extracted_copy_text = ""
@@ -79,7 +98,9 @@ async def generate_text(req: TextGenRequest, db: Annotated[Session, Depends(get_
         )
 
         # 데이터베이스에 광고 문구 저장
-        advertisement_copy = advertisement_crud.create_advertisement_copy(
+        advertisement_copy = await executors.run(
+            "db",
+            advertisement_crud.create_advertisement_copy,
             db=db,
             advertisement_id=advertisement_id,
             copy_text=advertisement_copy_data.copy_text,
@@ -89,7 +110,7 @@ async def generate_text(req: TextGenRequest, db: Annotated[Session, Depends(get_
 
         logger.info(f"세션 {req.session_id}: 광고 문구 데이터베이스에 저장 완료: {advertisement_copy.id}")
 
-        return {"result": result}
+        return {"result": result, "usage": usage.to_dict()}
     
     except HTTPException:
         logger.error(f"세션 {req.session_id}: HTTP 오류 발생") # req.detail is not available here, log actual exception detail if possible
@@ -97,4 +118,90 @@ async def generate_text(req: TextGenRequest, db: Annotated[Session, Depends(get_
     except Exception as e:
         db.rollback() 
         logger.error(f"세션 {req.session_id}: 예외 발생: {str(e)}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"오류 발생: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"오류 발생: {str(e)}")
+
+def _save_streamed_text(req: TextGenRequest, advertisement_id: int, result: List[Tuple[float, str, float]]) -> int:
+    """
+    DB 풀에서 호출됩니다. 스트리밍이 끝난 뒤 사용자 프롬프트와 생성 결과를 세션과 광고 문구 테이블에 한 번에 저장합니다.
+    응답 스트리밍 중에는 요청 의존성의 DB 세션이 이미 닫혔을 수 있으므로 새 세션을 엽니다.
+    """
+    with Session(engine) as db:
+        db_session_entry = session_crud.get_session_by_id(db, req.session_id)
+        if db_session_entry:
+            session_data = db_session_entry.session_data or {}
+            session_data["user_prompt"] = req.user_prompt
+            session_data["generated_text"] = result
+            session_crud.update_session_data(db, db_session_entry, session_data)
+
+        advertisement_copy = advertisement_crud.create_advertisement_copy(
+            db=db,
+            advertisement_id=advertisement_id,
+            copy_text=result[0][1] if result else "",
+            ad_type=req.ad_type,
+            user_prompt_for_generation=req.user_prompt
+        )
+        return advertisement_copy.id
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/generate/stream")
+async def generate_text_stream(
+    req: TextGenRequest,
+    db: Annotated[Session, Depends(get_session)],
+    client: Annotated[OpenAIClient, Depends(get_openai_client)],
+):
+    """
+    /text/generate의 스트리밍 버전 (Server-Sent Events).
+    후보별 토큰을 도착하는 대로 전송하고, 각 후보가 끝나는 즉시 candidate 이벤트로 확정합니다.
+    후보 수와 방식은 광고 유형별 전략(PROMPT_CONFIGS)을 따릅니다.
+    모든 후보가 끝나면 /text/generate와 같이 중복 제거·정렬한 뒤 DB에 한 번 저장하고, 같은 형식의 결과를 done 이벤트로 전송합니다.
+
+    이벤트: delta {index, temperature, text} / candidate {index, temperature, content, elapsed} / candidate_error {index, temperature, error} / done {result, advertisement_copy_id, usage} / error {detail}
+    """
+    _, _, advertisement_id = await _prepare_generation(req, db, save_prompt=False)
+    system_prompt, few_shot_examples, strategy = PROMPT_CONFIGS[req.ad_type]
+
+    async def event_stream():
+        candidates = {}
+        try:
+            with prompt_budget.track_usage(req.ad_type) as usage:
+                async for event in client.stream_multiple_responses(
+                    system_prompt,
+                    req.user_prompt,
+                    model=client.model_name(req.model_type),
+                    few_shot_examples=few_shot_examples,
+                    strategy=strategy
+                ):
+                    if event["event"] == "candidate":
+                        candidates[event["index"]] = (event["temperature"], event["content"], event["elapsed"])
+                    elif event["event"] == "candidate_error":
+                        logger.warning(f"세션 {req.session_id}: 후보 {event['index']} (온도 {event['temperature']}) 생성 실패: {event['error']}")
+                    yield _sse(event.pop("event"), event)
+
+            if not candidates:
+                raise RuntimeError("생성된 광고 문구가 없습니다.")
+
+            # /text/generate와 같이 후보 인덱스(온도) 순서에서 중복 제거·점수 정렬한 뒤 한 번만 저장
+            result = [candidates[index] for index in sorted(candidates)]
+            result = await executors.run("cpu", candidate_ranker.rank_candidates, result, req.ad_type, strategy.top_k, strategy.dedup_threshold)
+            copy_id = await executors.run("db", _save_streamed_text, req, advertisement_id, result)
+            logger.info(f"세션 {req.session_id}: 스트리밍 광고 문구 생성 완료 및 저장: {copy_id}")
+            yield _sse("done", {"result": result, "advertisement_copy_id": copy_id, "usage": usage.to_dict()})
+        except Exception as e:
+            logger.error(f"세션 {req.session_id}: 스트리밍 중 예외 발생: {str(e)}")
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/token-budget")
+def get_token_budget():
+    """
+    광고 유형별 고정 prefix 토큰 수(시작 시 계산)와 지금까지의 입력/출력 토큰 사용량을 반환합니다.
+    estimated가 true이면 tiktoken을 사용할 수 없어 prefix 토큰 수가 추정치입니다. (사용량 totals는 API 응답의 usage 값)
+    """
+    return prompt_budget.report()
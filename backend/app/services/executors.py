@@ -0,0 +1,120 @@
+# backend/app/services/executors.py
+
+import asyncio, functools, logging, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from fastapi import HTTPException, status
+from pydantic_settings import BaseSettings
+
+logger = logging.getLogger(__name__)
+
+# 모든 풀은 스레드 풀입니다. CPU 풀의 주요 작업(rembg/onnxruntime 추론, PIL/cv2 인코딩, bcrypt)은
+# 네이티브 코드에서 GIL을 놓고 실행되므로 스레드로도 병렬로 돌고, 프로세스 풀은 이미지 바이트 직렬화와
+# 프로세스마다 rembg 세션을 따로 올리는 비용만 늘어나므로 사용하지 않습니다.
+
+class ExecutorSettings(BaseSettings):
+    """작업 종류별 스레드 풀 크기와 대기열 한도 (환경 변수 EXECUTOR_* 로 변경 가능)"""
+    cpu_workers: int = 4            # 이미지 전처리(rembg, PIL 인코딩), bcrypt 등 CPU 작업
+    cpu_queue: int = 16
+    accelerator_workers: int = 1    # 모델 로드/warm-up 등 GPU 작업
+    accelerator_queue: int = 4
+    db_workers: int = 8             # 동기 SQLModel 호출
+    db_queue: int = 64
+
+    class Config:
+        env_file = ".env"
+        extra = "allow"
+        env_prefix = "EXECUTOR_"
+
+class ExecutorBusyError(HTTPException):
+    """실행 풀의 대기열이 가득 찼을 때 발생합니다. HTTPException이므로 라우터에서 그대로 503으로 응답합니다."""
+    def __init__(self, name: str):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"서버가 요청을 처리 중입니다. 잠시 후 다시 시도해주세요. ({name})",
+            headers={"Retry-After": "1"},
+        )
+
+class BoundedExecutor:
+    """
+    실행 중 + 대기 중인 작업 수가 max_workers + max_queue를 넘지 않는 스레드 풀.
+    한도를 넘으면 대기열에 쌓지 않고 즉시 ExecutorBusyError를 발생시킵니다.
+    """
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.rejected = 0
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        슬롯은 작업이 실제로 끝날 때(executor future의 done callback) 반납합니다.
+        기다리던 코루틴이 취소되어도(클라이언트 연결 끊김 등) 이미 실행 중인 스레드 작업은 멈추지 않으므로,
+        그 작업이 끝날 때까지 슬롯을 잡고 있어야 capacity와 stats()가 실제 사용량과 맞습니다.
+        """
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            logger.warning(f"{self.name} 실행 풀 대기열 초과 (capacity={self.capacity})")
+            raise ExecutorBusyError(self.name)
+        try:
+            future = self._executor.submit(functools.partial(func, *args, **kwargs))
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_flight += 1
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"workers": self.max_workers, "capacity": self.capacity, "in_flight": self._in_flight, "rejected": self.rejected}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+settings = ExecutorSettings()
+
+POOLS: Dict[str, BoundedExecutor] = {
+    "cpu": BoundedExecutor("cpu", settings.cpu_workers, settings.cpu_queue),
+    "accelerator": BoundedExecutor("accelerator", settings.accelerator_workers, settings.accelerator_queue),
+    "db": BoundedExecutor("db", settings.db_workers, settings.db_queue),
+}
+
+async def run(pool: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """func(*args, **kwargs)를 지정한 풀("cpu" / "accelerator" / "db")에서 실행하고 결과를 기다립니다."""
+    return await POOLS[pool].run(func, *args, **kwargs)
+
+def offload(pool: str):
+    """
+    동기 엔드포인트 함수를 지정한 풀에서 실행하는 async 엔드포인트로 바꾸는 데코레이터.
+    functools.wraps로 시그니처를 유지하므로 FastAPI 의존성 주입이 그대로 동작합니다.
+    처음부터 def인 단순 CRUD 엔드포인트는 FastAPI가 이미 스레드 풀에서 실행하므로 붙이지 않습니다.
+    (async 엔드포인트 안의 블로킹 호출을 옮길 때 사용)
+
+    예:
+        @router.get("/{user_id}")
+        @executors.offload("db")
+        def read_user(user_id: int, db: Annotated[Session, Depends(get_session)]): ...
+    """
+    def decorator(func: Callable[..., Any]):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await run(pool, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def stats() -> Dict[str, Dict[str, int]]:
+    return {name: pool.stats() for name, pool in POOLS.items()}
+
+def shutdown():
+    for pool in POOLS.values():
+        pool.shutdown()
@@ -0,0 +1,251 @@
+# backend/app/services/image_jobs.py
+
+import logging, queue, threading, time, uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+@dataclass(frozen=True)
+class BackgroundJobSpec:
+    '''배경 생성 요청 한 건을 나타내는 불변 작업 명세. 요청 시점의 값이 그대로 워커에 전달됩니다.'''
+    session_id: str
+    mode: str
+    canvas_type: str
+    product_box: Tuple[int, int, int, int]  # (x, y, width, height)
+    category: str
+    prompt: str
+    back_rm_path: str
+    use_prompt_cache: bool = True  # False면 캐시된 광고 기획/프롬프트를 무시하고 새로 생성
+    profile: Optional[str] = None  # 생성 프로필 (draft / standard / final 등, None이면 기본 프로필)
+    phase: str = "full"            # full: 한 번에 생성 / preview: 저해상도 미리보기 / refine: 미리보기를 원래 품질로 정제
+    seed: Optional[int] = None
+    sd_prompt: Optional[str] = None           # refine: 미리보기에 사용한 프롬프트
+    preview_image_path: Optional[str] = None  # refine: 정제할 미리보기 이미지
+    preview_latents_path: Optional[str] = None  # refine: 미리보기에서 선택된 후보의 latent (없으면 이미지로 정제)
+
+@dataclass
+class BackgroundJob:
+    '''큐에 등록된 작업과 그 진행 상태'''
+    job_id: str
+    spec: BackgroundJobSpec
+    status: str = JOB_QUEUED
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "session_id": self.spec.session_id,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+class QueueFullError(RuntimeError):
+    '''대기열이 가득 차 작업을 받을 수 없을 때 발생합니다.'''
+
+class BackgroundJobQueue:
+    '''
+    배경 생성 작업 큐.
+    전용 워커 스레드 하나가 AdImageGenerator를 독점하고 큐를 순서대로 처리하므로,
+    요청 핸들러는 작업을 등록하고 곧바로 job_id를 반환할 수 있습니다.
+
+    워커는 첫 작업을 꺼낸 뒤 max_wait 동안 batch_key가 같은 작업을 최대 max_batch_size개까지 모아
+    runner를 한 번 호출합니다. 키가 다른 작업은 다음 배치의 첫 작업으로 넘어갑니다.
+
+    Args:
+        - runner: 작업 명세 리스트를 받아 같은 순서의 결과(또는 예외 객체) 리스트를 반환하는 함수 (워커 스레드에서만 호출)
+        - on_complete: 생성 결과를 저장하고 결과 dict를 반환하는 함수 (선택)
+        - on_status: 작업 상태가 바뀔 때(queued / running / done / failed) 작업을 받아 호출되는 함수 (선택, 진행 이벤트 발행용)
+        - max_queue_size: 대기 가능한 최대 작업 수
+        - result_ttl: 완료된 작업 정보를 보관하는 시간 (초)
+        - batch_key: 함께 묶을 수 있는 작업을 구분하는 함수. None을 반환하면 단독으로 실행합니다.
+        - max_batch_size: 한 번에 묶을 최대 작업 수
+        - batch_limit: 첫 작업 명세를 받아 그 배치의 최대 작업 수를 반환하는 함수 (선택, max_batch_size보다 작을 때만 적용)
+        - max_wait: 첫 작업 이후 호환 작업을 기다리는 최대 시간 (초)
+    '''
+    def __init__(
+        self,
+        runner: Callable[[List[BackgroundJobSpec]], List[Any]],
+        on_complete: Optional[Callable[[BackgroundJobSpec, Any], Dict[str, Any]]] = None,
+        on_status: Optional[Callable[[BackgroundJob], None]] = None,
+        max_queue_size: int = 32,
+        result_ttl: float = 3600,
+        batch_key: Optional[Callable[[BackgroundJobSpec], Optional[Hashable]]] = None,
+        max_batch_size: int = 1,
+        max_wait: float = 0.0,
+        batch_limit: Optional[Callable[[BackgroundJobSpec], int]] = None,
+    ):
+        self.runner = runner
+        self.on_complete = on_complete
+        self.on_status = on_status
+        self.result_ttl = result_ttl
+        self.batch_key = batch_key
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.batch_limit = batch_limit
+        self._queue: "queue.Queue[Optional[BackgroundJob]]" = queue.Queue(maxsize=max_queue_size)
+        self._jobs: Dict[str, BackgroundJob] = {}
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._carry: Optional[BackgroundJob] = None  # 이전 배치에 들어가지 못한 작업
+        self._stopping = False
+
+    def start(self):
+        '''워커 스레드를 시작합니다.'''
+        if self._worker and self._worker.is_alive():
+            return
+        self._stopping = False
+        self._worker = threading.Thread(target=self._run, name="background-job-worker", daemon=True)
+        self._worker.start()
+        logger.info("배경 생성 작업 워커 시작")
+
+    def stop(self, timeout: Optional[float] = None):
+        '''현재 작업이 끝나면 워커를 종료합니다.'''
+        if not self._worker:
+            return
+        self._stopping = True
+        try:
+            self._queue.put_nowait(None)  # 빈 큐에서 기다리는 워커를 깨운다
+        except queue.Full:
+            pass  # 큐가 가득 찼으면 워커가 실행 중이므로 현재 배치가 끝난 뒤 _stopping을 보고 종료
+        self._worker.join(timeout)
+        self._worker = None
+        logger.info("배경 생성 작업 워커 종료")
+
+    def submit(self, spec: BackgroundJobSpec) -> BackgroundJob:
+        '''작업을 등록하고 즉시 반환합니다. 대기열이 가득 차면 QueueFullError가 발생합니다.'''
+        job = BackgroundJob(job_id=uuid.uuid4().hex, spec=spec)
+        self._prune()
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._notify(job)  # 워커가 곧바로 꺼내 running을 알리기 전에 queued를 먼저 알린다.
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.job_id, None)
+            job.status = JOB_FAILED
+            job.error = "배경 생성 대기열이 가득 찼습니다."
+            self._notify(job)
+            raise QueueFullError(job.error)
+        logger.info(f"세션 {spec.session_id}: 작업 {job.job_id} 등록 (대기 {self._queue.qsize()}건)")
+        return job
+
+    def get(self, job_id: str) -> Optional[BackgroundJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def position(self, job_id: str) -> int:
+        '''대기 중인 작업 앞에 남은 작업 수를 반환합니다.'''
+        with self._lock:
+            queued = sorted(
+                (j for j in self._jobs.values() if j.status == JOB_QUEUED),
+                key=lambda j: j.created_at,
+            )
+        for idx, job in enumerate(queued):
+            if job.job_id == job_id:
+                return idx
+        return 0
+
+    def _prune(self):
+        '''보관 기간이 지난 완료 작업을 정리합니다.'''
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished_at is not None and now - job.finished_at > self.result_ttl
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def _run(self):
+        while True:
+            if self._carry is not None:
+                job, self._carry = self._carry, None
+            elif self._stopping:
+                break
+            else:
+                job = self._queue.get()
+                if job is None:
+                    break
+            self._execute(self._collect_batch(job))
+
+    def _collect_batch(self, first: BackgroundJob) -> List[BackgroundJob]:
+        '''첫 작업과 batch_key가 같은 작업을 max_wait 동안 모읍니다.'''
+        batch = [first]
+        key = self.batch_key(first.spec) if self.batch_key else None
+        max_batch_size = self.max_batch_size
+        if key is not None and self.batch_limit is not None:
+            max_batch_size = min(max_batch_size, max(1, self.batch_limit(first.spec)))
+        if key is None or max_batch_size <= 1:
+            return batch
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < max_batch_size and not self._stopping:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self._stopping = True
+                break
+            if self.batch_key(job.spec) == key:
+                batch.append(job)
+            else:
+                self._carry = job
+                break
+        return batch
+
+    def _execute(self, batch: List[BackgroundJob]):
+        started_at = time.time()
+        for job in batch:
+            job.status = JOB_RUNNING
+            job.started_at = started_at
+            logger.info(f"세션 {job.spec.session_id}: 작업 {job.job_id} 실행 시작 (배치 {len(batch)}건)")
+            self._notify(job)
+        try:
+            outputs = self.runner([job.spec for job in batch])
+        except Exception as e:
+            outputs = [e] * len(batch)
+        if len(outputs) != len(batch):
+            logger.error(f"작업 runner가 {len(batch)}건 중 {len(outputs)}건의 결과를 반환했습니다.")
+            missing = RuntimeError("배경 생성 결과가 반환되지 않았습니다.")
+            outputs = list(outputs[:len(batch)]) + [missing] * (len(batch) - len(outputs))
+
+        for job, output in zip(batch, outputs):
+            spec = job.spec
+            try:
+                if isinstance(output, Exception):
+                    raise output
+                job.result = self.on_complete(spec, output) if self.on_complete else {"output": output}
+                job.status = JOB_DONE
+                logger.info(f"세션 {spec.session_id}: 작업 {job.job_id} 완료 ({time.time() - job.started_at:.2f}초)")
+            except Exception as e:
+                job.error = str(e)
+                job.status = JOB_FAILED
+                logger.error(f"세션 {spec.session_id}: 작업 {job.job_id} 실패: {e}")
+            finally:
+                job.finished_at = time.time()
+                self._notify(job)
+
+    def _notify(self, job: BackgroundJob):
+        '''on_status 호출. 알림 실패가 작업 처리에 영향을 주지 않도록 예외는 기록만 합니다.'''
+        if self.on_status is None:
+            return
+        try:
+            self.on_status(job)
+        except Exception as e:
+            logger.warning(f"세션 {job.spec.session_id}: 작업 {job.job_id} 상태 알림 실패: {e}")
@@ -9,14 +9,45 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from typing import Literal, Union, List
+import asyncio
+import concurrent.futures
+import random
+from typing import Any, Literal, NamedTuple, Optional, Union, List
 from PIL import Image
 import logging
-import torch
-from diffusers import StableDiffusionInpaintPipeline, StableDiffusionPipeline
 
-from image_modules import utils, pipeline_utils, gpt_module, ad_generator, evaluation
+# torch/diffusers/transformers를 불러오는 모듈(pipeline_pool, evaluation)은 generator 생성 시점에 import 합니다.
+from image_modules import utils, gpt_module, ad_generator
 from image_modules.utils import logger
+from app.services import model_registry, llm_clients, llm_governor, progress_events
+
+class PreviewResult(NamedTuple):
+    '''미리보기 생성 결과. 정제(refine) 단계에서 같은 seed, 프롬프트와 선택된 후보의 latent를 다시 사용합니다.'''
+    image: Image.Image
+    seed: int
+    prompt: str
+    latents: Any = None  # 선택된 후보의 latent (1 x 4 x h/8 x w/8, CPU 텐서)
+
+def progressive_settings() -> dict:
+    '''미리보기 → 정제 2단계 생성 설정 (model_config.yaml의 progressive 섹션)'''
+    return {
+        'preview_profile': 'draft',
+        'preview_scale': 0.5,
+        'refine_profile': None,
+        'refine_strength': 0.6,
+        'max_previews': 8,
+        **cfg.get('progressive', {}),
+    }
+
+def progress_event_settings() -> dict:
+    '''세션별 진행 이벤트 설정 (model_config.yaml의 progress_events 섹션)'''
+    return {
+        'step_every': 1,
+        'latent_preview_every': 0,
+        'latent_preview_size': 128,
+        'keepalive_sec': 15,
+        **cfg.get('progress_events', {}),
+    }
 
 class AdImageGenerator:
     def __init__(self, config: dict, category: str = "cosmetics"):
@@ -24,22 +55,38 @@ class AdImageGenerator:
         설정값을 입력으로 받아 generator를 초기화 합니다.
 
         note: 
-            - client: OpenAI GPT 4.1 mini
-            - evaluator: 생성 이미지 평가 모듈 (Clip, Aesthetic, Caption -> 현재는 CLIP score만 고려합니다.)
+            - async_client: 작업 워커와 별도의 이벤트 루프(planning_loop)에서 광고 기획을 진행하는 OpenAI 비동기 클라이언트
+            - evaluator: 생성 이미지 평가 모듈 (설정의 evaluation.backend: clip / clip_small / heuristic)
         '''
+        from image_modules import pipeline_pool, evaluation
+
         self.cfg = config
         self._category = category
         self.canvas_size = config.get('canvas_size', (512, 512))
-        self.api_key = config['openai']['api_key_env']
-        self.client = gpt_module.GPTClient(
+        self.api_key = os.getenv(config['openai']['api_key_env'])  # api_key_env는 환경 변수 이름
+        self.async_client = gpt_module.AsyncGPTClient(
             api_key=self.api_key,
-            model_name=config['openai']['gpt_model']
+            model_name=config['openai']['gpt_model'],
+            cache=llm_clients.response_cache,
+            base_url=llm_clients.settings.base_url,
+            governor=llm_governor.governor,
+            timeout=config['openai'].get('timeout_sec', 60)
         )
+        self.prompt_timeout = config['openai'].get('prompt_timeout_sec', 120)
+        self.planning_mode = config['openai'].get('planning_mode', 'two_step')  # two_step | structured
+        # GPT vision 인코딩 정책 (긴 변, 포맷, 품질) 과 detail 힌트
+        self.vision_policy = utils.vision_policy(config.get('vision_encoding', {}), config['openai']['gpt_model'])
+        self.vision_detail = self.vision_policy.pop('detail', None)
+        self.prompt_cache = llm_clients.response_cache
+        self.prompt_cache_cfg = {'enabled': True, 'ttl_sec': 86400, **config.get('prompt_cache', {})}
+        self.planning_loop = gpt_module.BackgroundLoop("gpt-planning")
         self.pipe = None
-        self.evaluator = evaluation.ImageEvaluator()
+        self.pool = pipeline_pool.PipelinePool(config)
+        self.evaluator = evaluation.build_evaluator(config)
         self.current_mode = None
-        self.current_category = None
         self.marketing_type = None
+        self.profile = None  # 생성 프로필 이름 (None이면 generation_profiles.default)
+        self.event_sessions: List[str] = []  # 진행 이벤트를 받을 세션 (작업 워커가 작업마다 설정, 배치면 요청 순서대로)
 
     @property
     def category(self):
@@ -47,13 +94,10 @@ class AdImageGenerator:
 
     @category.setter
     def category(self, value):
-        '''카테고리 변경 감지 및 적용 setter'''
+        '''카테고리 변경 감지 setter. LoRA 전환은 다음 prepare_pipeline 호출 시 풀에서 처리합니다.'''
         if self._category != value:
             logger.info(f"카테고리를 '{value}'로 변경합니다.")
             self._category = value
-            if self.pipe:
-                # 동일한 mode로 pipeline 재적용
-                self.prepare_pipeline(self.current_mode) 
 
     def update_config(self, new_cfg: dict):
         '''Canvas_size 및 포지션 정보를 반영하기 위해 설정값을 업데이트'''
@@ -68,6 +112,7 @@ class AdImageGenerator:
             3. Controlnet 구도조정 (Backend 미구현)
             4. IP-Adapter 스타일 반영 (Backend 미구현)
         우선적으로 광고전략을 생성 후 prompt로 convert한다.
+        다른 작업과 겹쳐 진행하려면 start_prompt / wait_prompt를 직접 사용합니다.
 
         input:
             - pipe: 파이프라인
@@ -77,132 +122,386 @@ class AdImageGenerator:
         return:
             - prompt: 이미지 생성에 사용할 프롬프트
         '''
-        if isinstance(pipe, StableDiffusionPipeline) and canvas is None:
+        from diffusers import StableDiffusionInpaintPipeline, StableDiffusionPipeline
+
+        if not isinstance(pipe, (StableDiffusionPipeline, StableDiffusionInpaintPipeline)):
+            raise TypeError(f"지원하지 않는 파이프라인 입니다. TYPE: {type(pipe)}")
+        if isinstance(pipe, StableDiffusionInpaintPipeline) and canvas is None:
+            raise ValueError("base64로 변환할 이미지를 입력하지 않았습니다.")
+        return self.wait_prompt(self.start_prompt(canvas, ref_image))
+
+    def prompt_cache_key(self, canvas: Optional[Image.Image], ref_image: Optional[Image.Image], category: str, marketing_type: str) -> str:
+        '''
+        광고 기획/SD 프롬프트 캐시 키. 캔버스와 참조 이미지는 픽셀 해시로 구분합니다. (같은 이미지면 인코딩 결과도 같음)
+        텍스트 기반 경로(canvas 없음)는 메시지가 category에만 의존하므로 marketing_type을 키에서 제외합니다.
+        '''
+        return self.prompt_cache.make_key(
+            "ad_prompt",
+            model=self.async_client.model_name,
+            category=category,
+            marketing_type=marketing_type if canvas is not None else None,
+            canvas=utils.image_digest(canvas) if canvas is not None else None,
+            ref_image=utils.image_digest(ref_image) if ref_image is not None else None,
+        )
+
+    async def _generate_prompt_async(self, canvas: Optional[Image.Image], ref_image: Optional[Image.Image], category: str, marketing_type: str, use_cache: bool = True, sessions: Optional[List[str]] = None) -> str:
+        '''
+        광고 기획 → SD 프롬프트 변환. planning_loop에서 실행됩니다.
+        같은 캔버스/참조 이미지/카테고리/마케팅 유형/모델이면 캐시된 프롬프트를 곧바로 반환합니다. ("다시 생성" 시 GPT 호출 생략)
+        use_cache=False이면 캐시를 읽지 않고 새로 기획한 뒤 캐시를 갱신합니다.
+        기획과 프롬프트가 나오면 sessions에 plan_ready / prompt_ready 이벤트를 발행합니다.
+
+        설정의 openai.planning_mode
+            - two_step: 광고 기획(한글) → SD 프롬프트 변환, GPT를 두 번 순서대로 호출
+            - structured: 기획/SD 프롬프트/카피를 JSON 한 번의 호출로 받고, 형식이 맞지 않으면 two_step으로 다시 진행
+        '''
+        cache_key = None
+        if self.prompt_cache_cfg['enabled']:
+            cache_key = await asyncio.to_thread(self.prompt_cache_key, canvas, ref_image, category, marketing_type)
+            cached = self.prompt_cache.get(cache_key) if use_cache else None
+            if cached is not None:
+                logger.info(f"캐시된 광고 기획/프롬프트를 사용합니다. ({cache_key[:12]})")
+                self._emit('plan_ready', sessions, ad_plan=cached['ad_plan'], copy=cached.get('copy'), cached=True)
+                self._emit('prompt_ready', sessions, prompt=cached['prompt'], cached=True)
+                return cached['prompt']
+
+        # 인코딩 정책(vision_policy)에 맞게 줄이고 압축. 인코딩은 루프를 막지 않도록 스레드에서 진행
+        encode = lambda image: utils.encode_image_for_vision(image, **self.vision_policy)
+        product_b64, mime = await asyncio.to_thread(encode, canvas) if canvas is not None else (None, "image/png")
+        ref_b64 = (await asyncio.to_thread(encode, ref_image))[0] if ref_image is not None else None
+        image_options = {'mime': mime, 'detail': self.vision_detail}
+
+        plan = None
+        if self.planning_mode == 'structured':
+            try:
+                plan = await self.async_client.plan_structured(
+                    product_b64=product_b64,
+                    ref_b64=ref_b64,
+                    product_type=category,
+                    marketing_type=marketing_type,
+                    max_tokens=self.cfg['openai'].get('structured_max_tokens', 450),
+                    use_cache=use_cache,
+                    **image_options
+                )
+            except (RuntimeError, ValueError) as e:
+                logger.warning(f"구조화된 기획 응답을 사용할 수 없어 2단계 기획으로 전환합니다: {e}")
+        if plan is None:
+            plan = await self._plan_two_step(product_b64, ref_b64, category, marketing_type, use_cache, image_options, sessions)
+        else:
+            self._emit('plan_ready', sessions, ad_plan=plan['ad_plan'], copy=plan.get('copy'), cached=False)
+        self._emit('prompt_ready', sessions, prompt=plan['sd_prompt'], cached=False)
+
+        logger.debug(f"광고 전략: {plan['ad_plan']}")
+        logger.debug(f"생성된 프롬프트: {plan['sd_prompt']}")
+        if cache_key is not None:
+            self.prompt_cache.set(cache_key, {'ad_plan': plan['ad_plan'], 'prompt': plan['sd_prompt'], 'copy': plan.get('copy')}, ttl=self.prompt_cache_cfg['ttl_sec'])
+        return plan['sd_prompt']
+
+    async def _plan_two_step(self, product_b64: Optional[str], ref_b64: Optional[str], category: str, marketing_type: str, use_cache: bool = True, image_options: Optional[dict] = None, sessions: Optional[List[str]] = None) -> dict:
+        '''기존 방식: 광고 기획(한글)을 받은 뒤 SD 프롬프트로 변환합니다.'''
+        if product_b64 is None:
             logger.info("홍보 전략을 구성합니다. (텍스트 기반)")
             messages = [
                 {"role": "system", "content": (
                     "You are an advertisement planner. Plan the advertisement background for a product. "
                     "Do NOT mention the product, human, or text. Only describe mood, color, and background design."
                 )},
-                {"role": "user", "content": f"{self._category} 광고에 맞는 배경 생성"}
+                {"role": "user", "content": f"{category} 광고에 맞는 배경 생성"}
             ]
-            ad_plan = self.client.chat(messages, max_tokens=200)
-    
-        elif (
-        (isinstance(pipe, StableDiffusionPipeline) or isinstance(pipe, StableDiffusionInpaintPipeline))
-        and canvas is not None
-    ):
+            ad_plan = await self.async_client.chat(messages, max_tokens=200, use_cache=use_cache)
+        else:
             logger.info("이미지를 정보로 홍보 전략을 구성합니다.")
-            if canvas is None:
-                raise ValueError("base64로 변환할 이미지를 입력하지 않았습니다.")
-            ad_plan = self.client.analyze_ad_plan(
-                    product_b64=utils.encode_image(canvas),
-                    ref_b64=utils.encode_image(ref_image) if ref_image is not None else None,
-                    product_type=self._category,
-                    marketing_type=f"{self.marketing_type}의 분위기에 맞는 배경 생성"
+            ad_plan = await self.async_client.analyze_ad_plan(
+                    product_b64=product_b64,
+                    ref_b64=ref_b64,
+                    product_type=category,
+                    marketing_type=f"{marketing_type}의 분위기에 맞는 배경 생성",
+                    use_cache=use_cache,
+                    **(image_options or {})
                 )
-        else:
-            raise TypeError(f"지원하지 않는 파이프라인 입니다. TYPE: {type(pipe)}")
-        logger.debug(f"광고 전략: {ad_plan}")
-        prompt = self.client.convert_to_sd_prompt(ad_plan)
-        logger.debug(f"생성된 프롬프트: {prompt}")
-        return prompt
-        
+        self._emit('plan_ready', sessions, ad_plan=ad_plan, copy=None, cached=False)
+        prompt = await self.async_client.convert_to_sd_prompt(ad_plan, use_cache=use_cache)
+        return {'ad_plan': ad_plan, 'sd_prompt': prompt, 'copy': None}
+
+    def start_prompt(self, canvas:Image.Image=None, ref_image:Image.Image=None, use_cache: bool = True) -> concurrent.futures.Future:
+        '''
+        광고 기획과 프롬프트 변환을 백그라운드 루프에서 시작하고 곧바로 Future를 반환합니다.
+        호출 시점의 category, marketing_type, event_sessions를 사용하므로, 이후 마스크 생성이나 파이프라인 준비와 겹쳐 진행할 수 있습니다.
+        결과가 필요 없어지면 future.cancel()로 진행 중인 GPT 요청까지 취소합니다.
+        '''
+        return self.planning_loop.submit(self._generate_prompt_async(canvas, ref_image, self._category, self.marketing_type, use_cache, list(self.event_sessions)))
+
+    def wait_prompt(self, future: concurrent.futures.Future) -> str:
+        '''start_prompt의 결과를 prompt_timeout까지 기다립니다. 시간이 초과되면 요청을 취소합니다.'''
+        try:
+            return future.result(timeout=self.prompt_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise RuntimeError(f"프롬프트 생성이 {self.prompt_timeout}초 안에 끝나지 않았습니다.")
+
+    def _emit(self, stage: str, sessions: Optional[List[str]] = None, **data):
+        '''진행 이벤트를 발행합니다. sessions가 없으면 현재 작업의 세션(event_sessions)에 발행합니다.'''
+        progress_events.publish_many(self.event_sessions if sessions is None else sessions, stage, **data)
+
+    def _step_callback(self, sessions: Optional[List[str]] = None, num_image: int = 1, total_steps: Optional[int] = None):
+        '''
+        파이프라인 step 콜백 (ad_generator의 callback 인자).
+        step_every마다 diffusion_step {step, total} 이벤트를 발행하고, latent_preview_every마다 각 세션의 첫 후보 latent를
+        저해상도 미리보기(data URL)로 변환해 함께 보냅니다. 배치면 sessions[i]의 latent는 i * num_image번째입니다.
+        diffusion_step은 자주 발생하므로 이벤트 기록에 남기지 않습니다.
+        '''
+        sessions = list(self.event_sessions if sessions is None else sessions)
+        if not sessions:
+            return None
+        settings = progress_event_settings()
+        step_every = max(1, settings['step_every'])
+        preview_every = settings['latent_preview_every']
+
+        def on_step_end(pipe, step, timestep, callback_kwargs):
+            total = getattr(pipe, 'num_timesteps', None) or total_steps
+            current = step + 1
+            if current % step_every and current != total:
+                return callback_kwargs
+            latents = callback_kwargs.get('latents') if preview_every and current % preview_every == 0 else None
+            for i, session_id in enumerate(sessions):
+                if not session_id:
+                    continue
+                data = {'step': current, 'total': total}
+                if latents is not None and i * num_image < len(latents):
+                    data['preview'] = utils.latent_preview(latents[i * num_image], settings['latent_preview_size'])
+                progress_events.publish(session_id, 'diffusion_step', keep=False, **data)
+            return callback_kwargs
+        return on_step_end
+
+    def _generation_callback(self, config: dict, sessions: Optional[List[str]] = None):
+        '''generation_cfg()의 step 수와 후보 수에 맞춘 step 콜백'''
+        generation = config['generation']
+        return self._step_callback(sessions, generation['num_image'], generation['inference_steps'])
+
     def prepare_pipeline(self, mode: str):
         '''
         모드 입력에 맞게 파이프라인을 설정합니다.
         예: ['text2img', 'inpaint'] +  ['controlnet', 'controlnet_inpaint'] (현재 서버에 기능 반영은 안된 상태, 추후 업데이트)
-        또한, 내부적으로 모드 변경을 감지하여 필요한 경우 원래있던 파이프라인을 내리고 다시 로드합니다.
+        파이프라인은 (mode, category) 단위로 풀에 상주하므로, 모드나 카테고리가 바뀌어도
+        가중치를 다시 읽지 않고 풀에서 꺼내 LoRA 어댑터만 전환합니다.
+        현재 생성 프로필의 scheduler / LoRA(예: LCM)도 이때 상주 파이프라인에 적용합니다.
         '''
-        if self.current_mode != mode:
-            self._unload_pipeline()
-            logger.info(f"{mode} 파이프라인을 새로 로드합니다.")
-            self.pipe = pipeline_utils.load_pipeline_by_type(self.cfg, mode)
-            self.current_mode = mode
-
-        if self.current_category != self._category:
-            if hasattr(self.pipe, "unload_lora_weights"):
-                self.pipe.unload_lora_weights()
-            self.pipe = pipeline_utils.apply_loras(self.pipe, self.cfg, category=self._category)
-            self.current_category = self._category
-            logger.debug(f"LoRA 적용 상태: {self.pipe.get_active_adapters()}")
-
+        self.pipe = self.pool.get(mode, self._category, profile=self.resolve_profile(self.profile))
+        self.current_mode = mode
         return self.pipe
+
+    def resolve_profile(self, name: Optional[str] = None) -> dict:
+        '''생성 프로필 설정을 반환합니다. 프로필이 정의되어 있지 않으면 빈 dict(기존 generation 설정 그대로)를 반환합니다.'''
+        profiles_cfg = self.cfg.get('generation_profiles', {})
+        profiles = profiles_cfg.get('profiles', {})
+        name = name or profiles_cfg.get('default')
+        if not name or not profiles:
+            return {}
+        if name not in profiles:
+            raise ValueError(f"지원하지 않는 생성 프로필입니다: {name} (선택 가능: {list(profiles.keys())})")
+        return profiles[name]
+
+    def generation_cfg(self) -> dict:
+        '''현재 프로필의 steps / guidance / 후보 수를 generation 섹션에 덮어쓴 설정 (ad_generator에 전달)'''
+        profile = self.resolve_profile(self.profile)
+        overrides = {key: profile[key] for key in ('inference_steps', 'guidance_scale', 'num_image') if key in profile}
+        if not overrides:
+            return self.cfg
+        return {**self.cfg, 'generation': {**self.cfg['generation'], **overrides}}
+
     def image_append(self):
         self.img = self.cfg['paths']['product_image']
-        _, self.back_rm = utils.remove_background(self.img)
+        _, self.back_rm = utils.remove_background(self.img, session=self.rembg_session)
         return self.back_rm
 
+    @property
+    def rembg_session(self):
+        '''설정(rembg 섹션)에 맞는 rembg 세션. 처음 사용할 때 한 번만 생성됩니다.'''
+        return rembg_session.get()
+
     def image_process(self, canvas_input:Image.Image=None):
         '''
         이미지 전처리 단계.
-        입력이미지의 배경을 제거하고 사용자 설정을 반영하여 크기를 변경하고 위치를 조정하여 캔버스에 붙이는 작업.
-        이후 작업을 위해 추가적으로 만들어진 canvas의 배경을 제거한 이미지와 마스킹 이미지를 만들어 반환합니다.
+        배경이 제거된 제품 이미지를 사용자 설정에 맞게 크기를 변경하고 위치를 조정하여 캔버스에 붙이는 작업.
+        제품의 알파 채널을 그대로 캔버스에 옮기므로, 캔버스에 대해 배경 제거를 다시 하지 않고
+        이미 알고 있는 알파로부터 마스킹 이미지를 만들어 반환합니다.
         '''
-        resized = utils.resize_to_ratio(self.back_rm, self.cfg['image_config']['resize_info'])
-        #canvas = Image.new("RGBA", self.canvas_size, (255, 255, 255, 255)) if canvas_input is None else canvas_input
-        canvas = Image.new("RGBA", self.canvas_size, (0, 0, 0, 0)) if canvas_input is None else canvas_input
-        canvas = utils.overlay_product(canvas, resized, self.cfg['image_config']['position'])
-        canvas, back_rm_canv = utils.remove_background(canvas)
-        #mask = utils.create_mask(back_rm_canv)
-        mask = utils.create_mask(back_rm_canv, 10, 10)
+        canvas, back_rm_canv = self.compose_canvas(canvas_input)
+        mask = self.build_mask(back_rm_canv)
         return canvas, back_rm_canv, mask
 
-    def run_text2img(self, canvas:Image.Image=None, ref_image:Image.Image=None):
+    def compose_canvas(self, canvas_input:Image.Image=None):
+        '''제품을 크기/위치에 맞게 캔버스에 붙인 이미지와, 제품 알파만 옮긴 투명 캔버스를 반환합니다.'''
+        canvas_size = self.cfg['canvas_size'][self.cfg['canvas_type']] if 'canvas_type' in self.cfg else self.canvas_size
+        resized = utils.resize_to_ratio(self.back_rm, self.cfg['image_config']['resize_info'], keep_alpha=True)
+        canvas = Image.new("RGBA", canvas_size, (0, 0, 0, 0)) if canvas_input is None else canvas_input
+        canvas = utils.overlay_product(canvas, resized, self.cfg['image_config']['position'])
+
+        # 제품 알파를 그대로 옮긴 투명 캔버스 (마스크 생성용)
+        back_rm_canv = Image.new("RGBA", canvas.size, (0, 0, 0, 0))
+        back_rm_canv.paste(resized, self.cfg['image_config']['position'])
+        return canvas, back_rm_canv
+
+    def build_mask(self, back_rm_canv:Image.Image) -> Image.Image:
+        '''compose_canvas가 만든 투명 캔버스의 알파로부터 마스킹 이미지를 만듭니다.'''
+        return utils.create_mask(back_rm_canv, **self.mask_params())
+
+    def mask_params(self) -> dict:
+        '''설정(mask 섹션)에서 현재 canvas_type에 맞는 마스크 파라미터를 가져옵니다.'''
+        mask_cfg = self.cfg.get('mask', {})
+        params = {'threshold': 10, 'blur_radius': 10}
+        params.update(mask_cfg.get('default', {}))
+        params.update(mask_cfg.get(self.cfg.get('canvas_type'), {}))
+        return params
+
+    def run_text2img(self, canvas:Image.Image=None, ref_image:Image.Image=None, prompt_future:concurrent.futures.Future=None):
         '''
         텍스트 기반 이미지 생성.
         - 입력 이미지를 감지 하여, 프롬프트를 생성할때 이미지정보를 고려하는 기능.
         - 입력 이미지가 없을 경우, category를 기반으로 자동 프롬프트 생성.
         이후 생성된 프롬프트를 기반으로 배경이미지를 생성합니다.
+        프롬프트 생성(prompt_future, 없으면 여기서 시작)은 파이프라인 준비와 동시에 진행됩니다.
         '''
-        if self.pipe is None or not isinstance(self.pipe, StableDiffusionPipeline):
-            self._unload_pipeline()
-            self.pipe = self.prepare_pipeline("text2img")
-        prompt = self.generate_prompt(self.pipe, canvas, ref_image)
-        images = ad_generator.generate_background(self.pipe, prompt, self.cfg)
+        prompt = self._prepare_with_prompt("text2img", canvas, ref_image, prompt_future)
+        config = self.generation_cfg()
+        images = ad_generator.generate_background(self.pipe, prompt, config, callback=self._generation_callback(config))
         top_image = self.evaluate_and_save(images, prompt)
         return top_image
 
-    def run_inpaint(self, canvas:Image.Image, mask:Image.Image, ref_image:Image.Image=None):
+    def _prepare_with_prompt(self, mode: str, canvas:Image.Image=None, ref_image:Image.Image=None, prompt_future:concurrent.futures.Future=None) -> str:
+        '''GPT 광고 기획을 백그라운드에서 진행하는 동안 파이프라인을 준비(LoRA 전환 등)하고, 프롬프트를 반환합니다.'''
+        if prompt_future is None:
+            prompt_future = self.start_prompt(canvas, ref_image)
+        try:
+            self.prepare_pipeline(mode)
+            return self.wait_prompt(prompt_future)
+        except BaseException:
+            prompt_future.cancel()
+            raise
+
+    def run_inpaint(self, canvas:Image.Image, mask:Image.Image, ref_image:Image.Image=None, prompt_future:concurrent.futures.Future=None):
         '''
         Inpaint를 진행.
         모드는 inpaint이나, 사실은 outpaint를 진행.
         mask 이미지를 invert 시켜 제품이미지를 제외한 배경을 프롬프트 기반으로 재생성한다.
+        프롬프트 생성(prompt_future, 없으면 여기서 시작)은 파이프라인 준비와 동시에 진행됩니다.
         '''
-        if self.pipe is None or not isinstance(self.pipe, StableDiffusionInpaintPipeline):
-            self._unload_pipeline()
-            self.pipe = self.prepare_pipeline("inpaint")
-        prompt = self.generate_prompt(self.pipe, canvas, ref_image)
-        images = ad_generator.run_inpainting(self.pipe, canvas, mask, prompt, self.cfg)
-        top_image = self.evaluate_and_save(images, prompt)
+        prompt = self._prepare_with_prompt("inpaint", canvas, ref_image, prompt_future)
+        config = self.generation_cfg()
+        images = ad_generator.run_inpainting(self.pipe, canvas, mask, prompt, config, callback=self._generation_callback(config))
+        top_image = self.evaluate_and_save(images, prompt, canvas=canvas, mask=mask)
         return top_image
 
-    def evaluate_and_save(self, images: List[Image.Image], prompt: str):
+    def run_inpaint_batch(self, items: List[tuple]) -> List[Union[Image.Image, Exception]]:
         '''
-        여러개의 생성된 이미지 중 Clip score 기반으로 정렬 후 최상위(top_1) 이미지를 선택 후 반환
+        여러 요청의 Inpaint를 하나의 파이프라인 호출로 묶어서 진행.
+        items의 각 원소는 (canvas, mask, marketing_type) 또는 (canvas, mask, marketing_type, prompt_future) 이며,
+        요청별 프롬프트 생성을 모두 동시에 진행하면서 파이프라인을 준비한 뒤
+        캔버스/마스크/프롬프트를 쌓아 한 번에 생성하고 결과를 요청별로 나눠 평가합니다.
+        event_sessions가 items와 같은 순서로 설정되어 있으면 진행 이벤트를 요청별 세션에 발행합니다.
         '''
-        
-        eval_logs = [self.evaluator.evaluate_image(img, prompt) for img in images]
+        sessions = list(self.event_sessions) if len(self.event_sessions) == len(items) else [None] * len(items)
+        futures = []
+        for item in items:
+            canvas, _, marketing_type = item[:3]
+            if len(item) > 3 and item[3] is not None:
+                futures.append(item[3])
+            else:
+                self.marketing_type = marketing_type
+                futures.append(self.start_prompt(canvas))
 
-        clip_sorted = sorted(
-            zip(images, eval_logs),
-            key=lambda x: x[1].get("clip_score", 0),
-            reverse=True
+        try:
+            self.prepare_pipeline("inpaint")
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+        results: List[Union[Image.Image, Exception, None]] = [None] * len(items)
+        canvases, masks, prompts, indices = [], [], [], []
+        for idx, (item, future) in enumerate(zip(items, futures)):
+            canvas, mask = item[0], item[1]
+            try:
+                prompts.append(self.wait_prompt(future))
+                canvases.append(canvas)
+                masks.append(mask)
+                indices.append(idx)
+            except Exception as e:
+                logger.error(f"프롬프트 생성 실패: {e}")
+                results[idx] = e
+
+        if canvases:
+            config = self.generation_cfg()
+            active = [sessions[idx] for idx in indices]
+            groups = ad_generator.run_inpainting_batch(self.pipe, canvases, masks, prompts, config, callback=self._generation_callback(config, active))
+            for idx, images, prompt, canvas, mask in zip(indices, groups, prompts, canvases, masks):
+                results[idx] = self.evaluate_and_save(images, prompt, canvas=canvas, mask=mask, sessions=[sessions[idx]])
+        return results
+
+    def run_preview(self, canvas:Image.Image, mask:Image.Image, prompt_future:concurrent.futures.Future=None, seed:Optional[int]=None) -> PreviewResult:
+        '''
+        미리보기 생성 (1단계).
+        캔버스와 마스크를 preview_scale로 줄여 현재 프로필(기본 draft)의 적은 step으로 생성합니다.
+        정제 단계에서 이어서 denoise 할 수 있도록 latent로 받아 decode하고, 평가로 선택된 후보의 latent를 seed, 프롬프트와 함께 반환합니다.
+        '''
+        settings = progressive_settings()
+        seed = seed if seed is not None else random.randrange(2 ** 31)
+        size = tuple(max(64, int(edge * settings['preview_scale']) // 8 * 8) for edge in canvas.size)
+        prompt = self._prepare_with_prompt("inpaint", canvas, None, prompt_future)
+        small_canvas = canvas.resize(size, Image.Resampling.BILINEAR)
+        small_mask = mask.resize(size, Image.Resampling.BILINEAR)
+        logger.info(f"미리보기 생성: {canvas.size} -> {size}, seed {seed}")
+        config = self.generation_cfg()
+        latents = ad_generator.run_inpainting(self.pipe, small_canvas, small_mask, prompt, config, seed=seed, size=size, callback=self._generation_callback(config), output_type="latent")
+        images = ad_generator.decode_latents(self.pipe, latents)
+        best = self.rank_images(images, prompt, canvas=small_canvas, mask=small_mask)[0]
+        return PreviewResult(best["image"], seed, prompt, latents[best["index"]:best["index"] + 1].cpu())
+
+    def run_refine(self, canvas:Image.Image, mask:Image.Image, preview_image:Image.Image, prompt:str, seed:int, preview_latents=None):
+        '''
+        미리보기 정제 (2단계).
+        미리보기 latent를 latent 공간에서 원래 크기로 키우고, 같은 seed의 노이즈를 refine_strength 시점만큼 더해 그 지점부터 현재 프로필의 품질로 이어서 denoise 합니다.
+        미리보기의 구도와 색감은 유지되고 세부 묘사만 다시 생성됩니다.
+        제품 영역 조건(마스크된 이미지)에는 미리보기를 키워 제품을 다시 합성한 이미지를 사용합니다.
+        preview_latents가 없으면(이전 버전의 미리보기) 합성 이미지에서 img2img로 정제합니다.
+        '''
+        settings = progressive_settings()
+        self.prepare_pipeline("inpaint")
+        config = self.generation_cfg()
+        upscaled = preview_image.convert("RGB").resize(canvas.size, Image.Resampling.LANCZOS)
+        init_image = Image.composite(canvas.convert("RGB"), upscaled, mask.convert("L"))
+        latents = None
+        if preview_latents is not None:
+            latents = ad_generator.refine_start_latents(self.pipe, preview_latents, canvas.size, config, settings['refine_strength'], seed)
+        logger.info(f"미리보기 정제: seed {seed}, strength {settings['refine_strength']}, latent 재사용 {latents is not None}")
+        images = ad_generator.run_inpainting(
+            self.pipe, init_image, mask, prompt, config,
+            seed=seed, strength=settings['refine_strength'], callback=self._generation_callback(config), latents=latents
         )
+        return self.evaluate_and_save(images, prompt, canvas=canvas, mask=mask)
 
-        return clip_sorted[0][0]
+    def rank_images(self, images: List[Image.Image], prompt: str, canvas: Image.Image = None, mask: Image.Image = None, sessions: Optional[List[str]] = None) -> List[dict]:
+        '''후보 이미지를 설정된 평가 백엔드(evaluation.backend)로 평가하여 점수 내림차순 [{"index", "image", "clip_score"}, ...]로 반환'''
+        self._emit('scoring', sessions, candidates=len(images))
+        return self.evaluator.evaluate_images(images, prompt, canvas=canvas, mask=mask)
+
+    def evaluate_and_save(self, images: List[Image.Image], prompt: str, canvas: Image.Image = None, mask: Image.Image = None, sessions: Optional[List[str]] = None):
+        '''
+        여러개의 생성된 이미지를 설정된 평가 백엔드(evaluation.backend)로 한 번에 평가하여 정렬 후 최상위(top_1) 이미지를 선택 후 반환
+        '''
+        return self.rank_images(images, prompt, canvas=canvas, mask=mask, sessions=sessions)[0]["image"]
 
     def cleanup(self):
-        '''파이프라인 정리'''
+        '''파이프라인과 광고 기획용 이벤트 루프 정리'''
         self._unload_pipeline()
+        self.planning_loop.stop(self.async_client.close())
     
     def _unload_pipeline(self):
         '''파이프라인을 정리 내부 호출 함수'''
         try:
-            if self.pipe:
-                self.pipe.to("cpu")
-                del self.pipe
-                self.pipe = None
+            self.pipe = None
+            self.current_mode = None
+            self.pool.clear()
         except Exception as e:
             logger.error(f"리소스 정리 실패: {str(e)}")
 
@@ -216,18 +515,16 @@ CATEGORY = "cosmetics"   # 사용자 설정 반영
 SIZE_INFO = (128, 128)   # 사용자 설정 반영
 POSITION = (300, 220)    # 사용자 설정 반영
 base_dir = os.path.abspath("./app/services")
-print(base_dir)
 # base_dir = os.path.join(base_dir, 'model_dev')
+config_path = os.path.join(base_dir, "model_config.yaml")
 try:
-    config_path = os.path.join(base_dir, "model_config.yaml")
     cfg = utils.load_config(config_path)
 except Exception as e:
-    print(f"경로를 찾지 못했습니다: {e}")
+    logger.error(f"설정 파일을 읽지 못했습니다: {config_path} ({e})")
+    raise
 
 # IMAGE = Image.open(cfg['paths']['product_image'])
 
-generator = AdImageGenerator(cfg, CATEGORY)
-
 config_update = {
     'canvas_size': CANVAS_SIZE,
     'product_type': CATEGORY,
@@ -237,15 +534,52 @@ config_update = {
         },
     }
 # generator.cfg['paths']['product_image'] = IMAGE
-generator.update_config(config_update)
-
-if not os.path.exists(cfg['paths']['lora_dir']):
-    print(os.path.abspath('./'))
-    lora_dir = os.path.join(os.path.abspath('../'), cfg['paths']['lora_dir'])
-    cfg['paths']['lora_dir'] = lora_dir
-
-def step1():
-    return generator.image_append()
+cfg.update(config_update)
+
+def _resolve_paths(config: dict):
+    '''LoRA 경로가 현재 작업 디렉토리 기준으로 없으면 상위 디렉토리 기준으로 바꿉니다. (generator 생성 시점에 한 번)'''
+    if not os.path.exists(config['paths']['lora_dir']):
+        lora_dir = os.path.join(os.path.abspath('../'), config['paths']['lora_dir'])
+        logger.debug(f"LoRA 경로를 찾지 못해 상위 디렉토리 기준으로 변경합니다: {lora_dir} (cwd: {os.path.abspath('./')})")
+        config['paths']['lora_dir'] = lora_dir
+
+def _build_generator() -> "AdImageGenerator":
+    _resolve_paths(cfg)
+    return AdImageGenerator(cfg, CATEGORY)
+
+# 무거운 구성요소는 import 시점이 아니라 처음 사용할 때(또는 lifespan warm-up에서) 로드합니다.
+rembg_session = model_registry.register(
+    "rembg",
+    lambda: utils.get_rembg_session(**cfg.get('rembg', {})),
+)
+generator = model_registry.register(
+    "image_generator",
+    _build_generator,
+    cleanup=lambda gen: gen.cleanup(),
+)
+
+def profile_names() -> List[str]:
+    '''설정된 생성 프로필 이름 목록 (요청 검증용)'''
+    return list(cfg.get('generation_profiles', {}).get('profiles', {}).keys())
+
+def save_preview_latents(preview: PreviewResult, path: str) -> Optional[str]:
+    '''미리보기 latent를 파일로 저장합니다. (정제 작업에서 load_latents로 다시 읽음) latent가 없으면 None'''
+    if preview.latents is None:
+        return None
+    ad_generator.save_latents(preview.latents, path)
+    return path
+
+def get_generator() -> AdImageGenerator:
+    '''AdImageGenerator를 반환합니다. 처음 호출될 때 CLIP, GPT 클라이언트 등을 로드합니다.'''
+    return generator.get()
+
+def step1(image: Image.Image) -> Image.Image:
+    '''
+    Step1: 업로드된 제품 이미지의 배경을 제거합니다.
+    작업 워커가 사용하는 generator의 상태를 건드리지 않도록 배경 제거 결과만 반환합니다.
+    '''
+    _, back_rm = utils.remove_background(image, session=rembg_session.get())
+    return back_rm
 
 def step1_5():
     '''
@@ -262,9 +596,9 @@ def step1_5():
         - mask (Image.Image): back_rm_canv의 제품 마스킹
     
     '''
-    return generator.image_process()
+    return get_generator().image_process()
 
-def step2(mode: str, canvas:Image.Image=None, mask:Image.Image=None, ref_image:Image.Image=None):
+def step2(mode: str, canvas:Image.Image=None, mask:Image.Image=None, ref_image:Image.Image=None, prompt_future=None):
     '''
     step2: 입력 정보를 기반으로 프롬프트 생성 + 이미지 생성을 진행합니다.
     내부적으로 평가 함수가 존재하며, 평가를 기반으로 top_1 이미지를 반환합니다.
@@ -273,15 +607,135 @@ def step2(mode: str, canvas:Image.Image=None, mask:Image.Image=None, ref_image:I
         - mode: 생성 모드
         - canvas: 전처리된 전체 이미지 (배경 + 제품)
         - mask: 제품부분이 마스킹된 이미지 (invert 됩니다.)
+        - prompt_future: 이미 시작한 프롬프트 생성 (generator.start_prompt, 없으면 step2에서 시작)
     
     output:
         - result: 내부 평가 함수를 통과한 top_1 이미지
     '''
     if mode == 'text2img':
-        return generator.run_text2img(canvas, ref_image)
+        return get_generator().run_text2img(canvas, ref_image, prompt_future)
     elif mode == 'inpaint':
         if canvas is None and mask is None:
+            if prompt_future is not None:
+                prompt_future.cancel()
             raise ValueError(f"입력 정보가 잘못되었습니다. canvas: {type(canvas)}, mask: {type(mask)} 필수 정보를 확인하고 다시 입력해 주세요.")
-        return generator.run_inpaint(canvas, mask, ref_image)
+        return get_generator().run_inpaint(canvas, mask, ref_image, prompt_future)
     else:
-        raise TypeError(f"{mode} is not supported")
\ No newline at end of file
+        raise TypeError(f"{mode} is not supported")
+
+def _apply_job_spec(spec):
+    '''작업 명세의 제품 이미지, 카테고리, 위치/크기 정보를 generator에 반영합니다.'''
+    x, y, width, height = spec.product_box
+    generator = get_generator()
+    generator.back_rm = Image.open(spec.back_rm_path).convert("RGBA")
+    generator.category = spec.category
+    generator.marketing_type = spec.prompt
+    generator.cfg['image_config']['resize_info'] = (width, height)
+    generator.cfg['image_config']['position'] = (x, y)
+    generator.cfg['canvas_type'] = spec.canvas_type
+    generator.profile = spec.profile
+    generator.event_sessions = [spec.session_id]
+
+def _prepare_job(spec):
+    '''
+    작업 명세를 반영하고 캔버스를 만든 즉시 광고 기획(GPT)을 시작한 뒤, 그동안 마스크를 생성합니다.
+    output: (canvas, mask, prompt_future)
+    '''
+    _apply_job_spec(spec)
+    generator = get_generator()
+    canvas, back_rm_canv = generator.compose_canvas()
+    prompt_future = generator.start_prompt(canvas, use_cache=spec.use_prompt_cache)
+    try:
+        mask = generator.build_mask(back_rm_canv)
+    except BaseException:
+        prompt_future.cancel()
+        raise
+    progress_events.publish(spec.session_id, 'canvas_ready', canvas_type=spec.canvas_type, size=list(canvas.size))
+    return canvas, mask, prompt_future
+
+def run_background_job(spec) -> Union[Image.Image, PreviewResult]:
+    '''
+    작업 명세(BackgroundJobSpec) 하나를 generator에 반영하고 배경을 생성합니다.
+    generator를 변경하므로 작업 큐의 워커 스레드에서만 호출해야 합니다.
+
+    output:
+        - result: 내부 평가 함수를 통과한 top_1 이미지 (phase가 preview이면 PreviewResult)
+    '''
+    if spec.phase == 'refine':
+        _apply_job_spec(spec)
+        canvas, _, mask = step1_5()
+        progress_events.publish(spec.session_id, 'canvas_ready', canvas_type=spec.canvas_type, size=list(canvas.size))
+        preview_image = Image.open(spec.preview_image_path)
+        preview_latents = ad_generator.load_latents(spec.preview_latents_path) if spec.preview_latents_path else None
+        return get_generator().run_refine(canvas, mask, preview_image, spec.sd_prompt, spec.seed, preview_latents)
+
+    canvas, mask, prompt_future = _prepare_job(spec)
+    if spec.phase == 'preview':
+        return get_generator().run_preview(canvas, mask, prompt_future, seed=spec.seed)
+    result = step2(mode=spec.mode, canvas=canvas, mask=mask, prompt_future=prompt_future)
+    return result[0] if isinstance(result, list) else result
+
+def batch_key(spec):
+    '''
+    하나의 파이프라인 호출로 묶을 수 있는 작업을 구분하는 키.
+    같은 모드(inpaint), 같은 canvas_type, 같은 LoRA category, 같은 생성 프로필일 때만 묶을 수 있으며,
+    묶을 수 없는 작업은 None을 반환합니다.
+    '''
+    if spec.mode != 'inpaint' or spec.phase != 'full':
+        return None
+    return (spec.mode, spec.canvas_type, spec.category, spec.profile)
+
+def batch_limit(spec) -> int:
+    '''
+    spec과 함께 묶을 수 있는 최대 작업 수.
+    한 번의 파이프라인 호출이 만드는 이미지 수(작업 수 x 프로필의 num_image)가
+    jobs.batching.max_batch_images를 넘지 않도록 제한합니다. (가속기 메모리 보호)
+    '''
+    max_images = cfg.get('jobs', {}).get('batching', {}).get('max_batch_images')
+    if not max_images:
+        return 1 << 30
+    profiles_cfg = cfg.get('generation_profiles', {})
+    profile = profiles_cfg.get('profiles', {}).get(spec.profile or profiles_cfg.get('default'), {})
+    num_image = profile.get('num_image', cfg['generation']['num_image'])
+    return max(1, max_images // num_image)
+
+def run_background_batch(specs) -> List[Union[Image.Image, Exception]]:
+    '''
+    batch_key가 같은 작업들을 한 번의 inpainting 호출로 생성합니다.
+    각 작업의 캔버스/마스크/프롬프트는 작업별로 준비하며, 준비 단계에서 실패한 작업은
+    해당 위치에 예외 객체를 담아 반환하고 나머지 작업은 그대로 진행합니다.
+
+    output:
+        - results: specs와 같은 순서의 top_1 이미지 또는 예외 객체
+    '''
+    if len(specs) == 1 or batch_key(specs[0]) is None:
+        results = []
+        for spec in specs:
+            try:
+                results.append(run_background_job(spec))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    results: List[Union[Image.Image, Exception, None]] = [None] * len(specs)
+    items, indices = [], []
+    for idx, spec in enumerate(specs):
+        try:
+            canvas, mask, prompt_future = _prepare_job(spec)
+            items.append((canvas, mask, spec.prompt, prompt_future))
+            indices.append(idx)
+        except Exception as e:
+            logger.error(f"세션 {spec.session_id}: 배치 준비 실패: {e}")
+            results[idx] = e
+
+    if items:
+        get_generator().event_sessions = [specs[idx].session_id for idx in indices]
+        try:
+            for idx, image in zip(indices, get_generator().run_inpaint_batch(items)):
+                results[idx] = image
+        except Exception as e:
+            for item in items:
+                item[3].cancel()
+            for idx in indices:
+                results[idx] = e
+    return results
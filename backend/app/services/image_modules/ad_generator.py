@@ -1,27 +1,134 @@
 from PIL import Image, ImageOps
-from typing import Dict
+from typing import Callable, Dict, List, Optional, Tuple
 from image_modules.utils import log_execution_time, logger
 import logging
 
+def seeded_generator(pipe, seed: Optional[int]):
+    """seed가 있으면 파이프라인 device의 torch.Generator를 반환합니다. (미리보기와 정제 단계의 노이즈를 재현하기 위함)"""
+    if seed is None:
+        return None
+    import torch
+    return torch.Generator(device=pipe.device).manual_seed(seed)
+
+def step_callback_kwargs(callback: Optional[Callable]) -> Dict:
+    """파이프라인 step 콜백 인자. callback(pipe, step, timestep, callback_kwargs)은 callback_kwargs를 그대로 반환해야 합니다."""
+    if callback is None:
+        return {}
+    return {"callback_on_step_end": callback, "callback_on_step_end_tensor_inputs": ["latents"]}
+
 @log_execution_time(label="Inpainting process...")
-def run_inpainting(pipe, original_image: Image.Image, product_mask: Image.Image, prompt: str, config: Dict) -> Image.Image:
+def run_inpainting(
+    pipe,
+    original_image: Image.Image,
+    product_mask: Image.Image,
+    prompt: str,
+    config: Dict,
+    seed: Optional[int] = None,
+    size: Optional[Tuple[int, int]] = None,
+    strength: Optional[float] = None,
+    callback: Optional[Callable] = None,
+    latents=None,
+    output_type: str = "pil",
+) -> Image.Image:
     """
     제품을 제외한 배경 영역만 Inpainting으로 리터칭합니다.
+
+    Args:
+        - seed: 노이즈 seed (None이면 무작위)
+        - size: (width, height). None이면 canvas_type의 크기 (미리보기는 축소된 크기 사용)
+        - strength: 1.0 미만이면 original_image를 출발점으로 일부 step만 다시 생성 (미리보기 정제)
+        - callback: 매 step 끝에 호출할 함수 (진행 이벤트, latent 미리보기)
+        - latents: 시작 latent (refine_start_latents, 미리보기 정제)
+        - output_type: "latent"이면 VAE decode 없이 latent 텐서를 반환 (미리보기의 latent를 정제 단계에서 다시 쓰기 위함)
     """
     logger.info("Running inpainting with inverted mask")
+    width, height = size or config['canvas_size'][config['canvas_type']]
+    extra = {"strength": strength} if strength is not None else {}
+    if latents is not None:
+        extra["latents"] = latents
     return pipe(
         image=original_image.convert("RGB"),
         mask_image=ImageOps.invert(product_mask),
         prompt=prompt,
         num_inference_steps=config["generation"]["inference_steps"],
         guidance_scale=config["generation"]["guidance_scale"],
+        height=height,
+        width=width,
+        num_images_per_prompt=config['generation']['num_image'],
+        generator=seeded_generator(pipe, seed),
+        output_type=output_type,
+        **extra,
+        **step_callback_kwargs(callback)
+    ).images
+
+def decode_latents(pipe, latents) -> List[Image.Image]:
+    """output_type="latent"로 받은 latent를 VAE로 decode하여 PIL 이미지 리스트로 반환합니다."""
+    import torch
+    with torch.no_grad():
+        decoded = pipe.vae.decode(latents.to(pipe.vae.dtype) / pipe.vae.config.scaling_factor, return_dict=False)[0]
+    return pipe.image_processor.postprocess(decoded, output_type="pil")
+
+def save_latents(latents, path: str):
+    import torch
+    torch.save(latents.detach().to("cpu", dtype=torch.float16), path)
+
+def load_latents(path: str):
+    import torch
+    return torch.load(path, map_location="cpu", weights_only=True)  # 세션 데이터의 경로이므로 텐서만 허용
+
+def refine_start_latents(pipe, preview_latents, size: Tuple[int, int], config: Dict, strength: float, seed: Optional[int]):
+    """
+    미리보기 latent(1 x 4 x h/8 x w/8)를 latent 공간에서 목표 크기(size)로 키운 뒤,
+    정제 시작 시점(strength)의 노이즈를 seed로 더해 파이프라인의 latents 인자로 넘길 시작 latent를 만듭니다.
+
+    diffusers inpaint 파이프라인은 latents 인자를 노이즈로 간주해 init_noise_sigma를 곱하므로, 미리 나눠서 반환합니다.
+    (정제 step은 이 latent에서 이어서 denoise 하므로 미리보기의 구도와 색감이 유지됩니다.)
+    """
+    import torch
+    import torch.nn.functional as F
+    from diffusers.utils.torch_utils import randn_tensor
+
+    width, height = size
+    steps = config["generation"]["inference_steps"]
+    num_image = config["generation"]["num_image"]
+    dtype = pipe.unet.dtype
+
+    latents = preview_latents.to(device=pipe.device, dtype=torch.float32)
+    latents = F.interpolate(latents, size=(height // pipe.vae_scale_factor, width // pipe.vae_scale_factor), mode="bicubic", align_corners=False)
+    latents = latents.repeat(num_image, 1, 1, 1).to(dtype)
+
+    # 파이프라인의 get_timesteps와 같은 방식으로 정제 시작 timestep을 구한다.
+    pipe.scheduler.set_timesteps(steps, device=pipe.device)
+    t_start = max(steps - min(int(steps * strength), steps), 0)
+    start_timestep = pipe.scheduler.timesteps[t_start * pipe.scheduler.order:][:1].repeat(num_image)
+    noise = randn_tensor(latents.shape, generator=seeded_generator(pipe, seed), device=pipe.device, dtype=dtype)
+    noised = pipe.scheduler.add_noise(latents, noise, start_timestep)
+    return noised / pipe.scheduler.init_noise_sigma
+
+@log_execution_time(label="Batched inpainting process...")
+def run_inpainting_batch(pipe, original_images: List[Image.Image], product_masks: List[Image.Image], prompts: List[str], config: Dict, callback: Optional[Callable] = None) -> List[List[Image.Image]]:
+    """
+    여러 요청의 캔버스, 마스크, 프롬프트를 쌓아 한 번의 Inpainting 호출로 생성한 뒤,
+    결과를 요청별 리스트로 나눠 반환합니다. 모든 요청은 같은 canvas_type이어야 합니다.
+    """
+    num_image = config['generation']['num_image']
+    logger.info(f"Running batched inpainting: {len(prompts)} requests x {num_image} images")
+    images = pipe(
+        image=[image.convert("RGB") for image in original_images],
+        mask_image=[ImageOps.invert(mask) for mask in product_masks],
+        prompt=prompts,
+        num_inference_steps=config["generation"]["inference_steps"],
+        guidance_scale=config["generation"]["guidance_scale"],
         height=config['canvas_size'][config['canvas_type']][1],
         width=config['canvas_size'][config['canvas_type']][0],
-        num_images_per_prompt=config['generation']['num_image']
+        num_images_per_prompt=num_image,
+        **step_callback_kwargs(callback)
     ).images
+    # 파이프라인 출력은 프롬프트 순서대로 num_image개씩 이어져 있다.
+    return [images[i * num_image:(i + 1) * num_image] for i in range(len(prompts))]
 
 @log_execution_time(label="Background image generating...")
-def generate_background(pipe, prompt: str, config: Dict) -> Image.Image:
+def generate_background(pipe, prompt: str, config: Dict, callback: Optional[Callable] = None) -> Image.Image:
     """
     Stable Diffusion을 통해 광고 배경 이미지를 생성합니다.
     """
@@ -33,7 +140,8 @@ def generate_background(pipe, prompt: str, config: Dict) -> Image.Image:
         guidance_scale=config["generation"]["guidance_scale"],
         height=config['canvas_size'][config['canvas_type']][1],
         width=config['canvas_size'][config['canvas_type']][0],
-        num_images_per_prompt=config['generation']['num_image']
+        num_images_per_prompt=config['generation']['num_image'],
+        **step_callback_kwargs(callback)
     ).images
     return result
 
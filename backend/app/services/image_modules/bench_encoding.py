@@ -0,0 +1,75 @@
+# GPT vision 이미지 인코딩 정책 벤치마크 (전송 바이트, 인코딩 시간, 이미지 토큰)
+# 실행 : cd backend/app/services && python -m image_modules.bench_encoding [모델 이름]
+import base64
+import io
+import sys
+import time
+import numpy as np
+from PIL import Image
+from image_modules import utils
+
+CANVAS_SIZES = [(512, 512), (512, 768), (768, 448), (1024, 1024)]
+REPEAT = 10
+POLICIES = {
+    "legacy_png": None,  # 기존 utils.encode_image (원본 크기 PNG)
+    "png_768": {"max_edge": 768, "format": "png", "quality": 0},
+    "jpeg_768_q85": {"max_edge": 768, "format": "jpeg", "quality": 85},
+    "webp_768_q80": {"max_edge": 768, "format": "webp", "quality": 80},
+    "jpeg_512_q85": {"max_edge": 512, "format": "jpeg", "quality": 85},
+    "webp_512_q75": {"max_edge": 512, "format": "webp", "quality": 75},
+}
+
+def make_sample(size) -> Image.Image:
+    '''그라데이션 배경 위에 노이즈가 섞인 제품 영역이 있는 캔버스 (사진과 비슷한 압축 특성)'''
+    width, height = size
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[:height, :width]
+    rgba = np.zeros((height, width, 4), dtype=np.uint8)
+    rgba[..., 0] = (xx / width * 255).astype(np.uint8)
+    rgba[..., 1] = (yy / height * 255).astype(np.uint8)
+    rgba[..., 2] = 128
+    inside = ((xx - width / 2) / (width / 4)) ** 2 + ((yy - height / 2) / (height / 4)) ** 2 <= 1
+    noise = rng.integers(0, 60, size=(height, width, 3), dtype=np.uint8)
+    rgba[..., :3] = np.where(inside[..., None], 120 + noise, rgba[..., :3])
+    rgba[..., 3] = 255
+    return Image.fromarray(rgba, mode="RGBA")
+
+def encode(image: Image.Image, policy):
+    if policy is None:
+        return utils.encode_image(image), "image/png"
+    utils._vision_memo.clear()  # 메모이제이션 없이 인코딩 시간 측정
+    return utils.encode_image_for_vision(image, **policy)
+
+def measure(image: Image.Image, policy) -> float:
+    encode(image, policy)  # warm-up
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        encode(image, policy)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+def main():
+    model_name = sys.argv[1] if len(sys.argv) > 1 else "gpt-4.1-mini"
+    utils.logger.setLevel("WARNING")
+    print(f"model: {model_name}")
+    print(f"{'canvas':>10} | {'policy':>14} | {'bytes':>9} | {'b64 bytes':>9} | {'encode(ms)':>10} | {'tokens(low)':>11} | {'tokens(high)':>12}")
+    for size in CANVAS_SIZES:
+        sample = make_sample(size)
+        for name, policy in POLICIES.items():
+            b64, _ = encode(sample, policy)
+            encoded_size = Image.open(io.BytesIO(base64.b64decode(b64))).size
+            elapsed = measure(sample, policy)
+            low = utils.estimate_vision_tokens(encoded_size, "low", model_name)
+            high = utils.estimate_vision_tokens(encoded_size, "high", model_name)
+            print(f"{'x'.join(map(str, size)):>10} | {name:>14} | {len(b64) * 3 // 4:>9} | {len(b64):>9} | {elapsed:>10.2f} | {low:>11} | {high:>12}")
+
+    # 같은 이미지를 다시 인코딩하면 메모이제이션된 결과를 사용
+    sample = make_sample(CANVAS_SIZES[0])
+    policy = POLICIES["jpeg_512_q85"]
+    utils._vision_memo.clear()
+    utils.encode_image_for_vision(sample, **policy)
+    start = time.perf_counter()
+    utils.encode_image_for_vision(sample, **policy)
+    print(f"memoized hit: {(time.perf_counter() - start) * 1000:.2f}ms (픽셀 해시 계산 포함)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# 마스크 생성 마이크로 벤치마크
+# 실행 : cd backend/app/services && python -m image_modules.bench_mask
+import time
+import numpy as np
+from PIL import Image, ImageFilter
+from image_modules import utils
+
+SIZES = [512, 1024, 2048]
+REPEAT = 10
+
+def create_mask_legacy(product_image: Image.Image, threshold: int = 250, blur_radius: int = 5) -> Image.Image:
+    '''이전 구현 (Image.eval 람다 + PIL GaussianBlur). 비교용.'''
+    alpha = product_image.getchannel("A")
+    mask = Image.eval(alpha, lambda a: 255 if a > threshold else 0).convert("L")
+    if blur_radius > 0:
+        mask = mask.filter(ImageFilter.GaussianBlur(radius=blur_radius))
+    return mask
+
+def make_sample(size: int) -> Image.Image:
+    '''가운데 타원형 제품이 있는 RGBA 샘플 이미지'''
+    yy, xx = np.mgrid[:size, :size]
+    inside = ((xx - size / 2) / (size / 3)) ** 2 + ((yy - size / 2) / (size / 4)) ** 2 <= 1
+    rgba = np.zeros((size, size, 4), dtype=np.uint8)
+    rgba[..., :3] = 200
+    rgba[..., 3] = np.where(inside, 255, 0)
+    return Image.fromarray(rgba, mode="RGBA")
+
+def measure(fn, *args, **kwargs) -> float:
+    fn(*args, **kwargs)  # warm-up
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn(*args, **kwargs)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+def main():
+    utils.logger.setLevel("WARNING")
+    print(f"{'size':>6} | {'legacy(ms)':>10} | {'gaussian(ms)':>12} | {'box(ms)':>8}")
+    for size in SIZES:
+        sample = make_sample(size)
+        legacy = measure(create_mask_legacy, sample, 10, 10)
+        gaussian = measure(utils.create_mask, sample, 10, 10)
+        box = measure(utils.create_mask, sample, 10, 10, blur_mode="box")
+        print(f"{size:>6} | {legacy:>10.2f} | {gaussian:>12.2f} | {box:>8.2f}")
+
+if __name__ == "__main__":
+    main()
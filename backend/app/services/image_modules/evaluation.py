@@ -1,18 +1,74 @@
 # backend/app/services/image_modules/evaluation.py
-import torch
-import torch.nn.functional as F
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+import numpy as np
+import cv2
 from PIL import Image
-from transformers import CLIPProcessor, CLIPModel
 # from transformers import BlipProcessor, BlipForConditionalGeneration
 # from aesthetics_predictor import AestheticsPredictorV1
 from image_modules.utils import logger, log_execution_time
 
-class ImageEvaluator:
-    def __init__(self, device='cuda'):
-        logger.info("이미지 평가를 위한 모델을 로드합니다.")
-        self.device = device
-        self.clip_model = CLIPModel.from_pretrained("openai/clip-vit-large-patch14").eval().to(device)
-        self.clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-large-patch14")
+CLIP_LARGE_MODEL_ID = "openai/clip-vit-large-patch14"
+CLIP_SMALL_MODEL_ID = "openai/clip-vit-base-patch32"
+
+class BaseEvaluator(ABC):
+    '''
+    후보 이미지 랭킹 백엔드의 공통 인터페이스.
+    evaluate_images는 [{"index", "image", "clip_score"}, ...]를 점수 내림차순으로 반환합니다.
+    (점수 키 이름은 기존 호출부와의 호환을 위해 백엔드와 관계없이 clip_score를 사용합니다.)
+    '''
+    name = "base"
+
+    @abstractmethod
+    def evaluate_images(
+        self,
+        images: List[Image.Image],
+        prompt: str,
+        canvas: Optional[Image.Image] = None,
+        mask: Optional[Image.Image] = None,
+    ) -> List[Dict[str, Any]]:
+        ...
+
+    @staticmethod
+    def _rank(images: List[Image.Image], scores: List[float]) -> List[Dict[str, Any]]:
+        ranked = [
+            {"index": idx, "image": image, "clip_score": round(score, 2)}
+            for idx, (image, score) in enumerate(zip(images, scores))
+        ]
+        ranked.sort(key=lambda x: x["clip_score"], reverse=True)
+        return ranked
+
+class ImageEvaluator(BaseEvaluator):
+    '''
+    CLIP 기반 평가. model_id로 large/base 모델을 선택할 수 있고,
+    CPU에서는 quantize=True로 Linear 층을 int8 동적 양자화하여 점수 계산을 가볍게 할 수 있습니다.
+    torch는 이 클래스 안에서만 import합니다. (heuristic 백엔드는 torch 없이 동작)
+    '''
+    name = "clip"
+
+    def __init__(
+        self,
+        device: Optional[str] = None,
+        text_cache_size: int = 128,
+        model_id: str = CLIP_LARGE_MODEL_ID,
+        quantize: bool = False,
+    ):
+        import torch
+        from transformers import CLIPProcessor, CLIPModel
+
+        logger.info(f"이미지 평가를 위한 모델을 로드합니다. ({model_id})")
+        # 가속기가 없으면 CPU에서 동작
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.text_cache_size = text_cache_size
+        self._text_cache: "OrderedDict[str, Any]" = OrderedDict()  # prompt -> 정규화된 text embedding
+        self.clip_model = CLIPModel.from_pretrained(model_id).eval().to(self.device)
+        if quantize:
+            if self.device != "cpu":
+                logger.warning("동적 양자화는 CPU에서만 지원되어 적용하지 않습니다.")
+            else:
+                self.clip_model = torch.quantization.quantize_dynamic(self.clip_model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.clip_processor = CLIPProcessor.from_pretrained(model_id)
         # self.blip_model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base").eval().to(device)
         # self.blip_processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
         # self.aesthetic_model = AestheticsPredictorV1.from_pretrained("shunk031/aesthetics-predictor-v1-vit-large-patch14").eval().to(device)
@@ -25,25 +81,156 @@ class ImageEvaluator:
         logger.debug(f"Aesthtic Score: {round(outputs.logits.squeeze().item(), 2)}")
         return round(outputs.logits.squeeze().item(), 2)
 
+    def encode_text(self, prompt: str) -> "torch.Tensor":
+        '''프롬프트의 정규화된 CLIP text embedding을 반환합니다. 같은 프롬프트는 캐시를 사용합니다.'''
+        import torch
+
+        if prompt in self._text_cache:
+            self._text_cache.move_to_end(prompt)
+            return self._text_cache[prompt]
+        text_inputs = self.clip_processor(text=[prompt], return_tensors="pt", padding=True, truncation=True).to(self.device)
+        with torch.no_grad():
+            text_embeds = torch.nn.functional.normalize(self.clip_model.get_text_features(**text_inputs), dim=-1)
+        self._text_cache[prompt] = text_embeds
+        if len(self._text_cache) > self.text_cache_size:
+            self._text_cache.popitem(last=False)
+        return text_embeds
+
     @log_execution_time(label="생성된 이미지 평가를 시작합니다...")
-    @torch.no_grad()
+    def evaluate_images(
+        self,
+        images: List[Image.Image],
+        prompt: str,
+        canvas: Optional[Image.Image] = None,
+        mask: Optional[Image.Image] = None,
+    ) -> List[Dict[str, Any]]:
+        '''
+        여러 후보 이미지를 한 번의 forward로 평가하고 Clip score 내림차순으로 정렬하여 반환합니다.
+        프롬프트는 한 번만 인코딩합니다.
+
+        returns:
+            - [{"index": 원래 순서, "image": 이미지, "clip_score": 점수}, ...] (점수 내림차순)
+        '''
+        import torch
+
+        if not images:
+            return []
+        logger.info(f"생성된 이미지 {len(images)}장을 평가합니다.")
+        text_embeds = self.encode_text(prompt)
+        image_inputs = self.clip_processor(images=images, return_tensors="pt").to(self.device)
+        with torch.no_grad():
+            image_embeds = torch.nn.functional.normalize(self.clip_model.get_image_features(**image_inputs), dim=-1)
+        scores = (image_embeds @ text_embeds.T).squeeze(-1).float().cpu().tolist()
+
+        ranked = self._rank(images, [score * 100 for score in scores])
+        logger.debug(f"Clip Score: {[r['clip_score'] for r in ranked]}")
+        return ranked
+
     def evaluate_image(self, image: Image.Image, prompt: str):
         '''이미지에 대한 평가 함수'''
-        logger.info("생성된 이미지를 평가합니다.")
-        clip_inputs = self.clip_processor(text=prompt, images=image, return_tensors="pt", padding=True).to(self.device)
-        clip_score = F.cosine_similarity(
-            self.clip_model(**clip_inputs).image_embeds,
-            self.clip_model(**clip_inputs).text_embeds
-        ).item() * 100
-
-        logger.debug(f"Clip Score: {round(clip_score, 2)}")
         # blip_inputs = self.blip_processor(image, return_tensors="pt").to(self.device)
         # caption_ids = self.blip_model.generate(**blip_inputs, max_new_tokens=30)
         # caption = self.blip_processor.decode(caption_ids[0], skip_special_tokens=True)
         # logger.debug(f"Caption 기록: {caption[:10]}...")
-
         return {
-            "clip_score": round(clip_score, 2),
+            "clip_score": self.evaluate_images([image], prompt)[0]["clip_score"],
             # "aesthetic_score": self.get_aesthetic_score(image),
             # "blip_caption": caption
         }
+
+
+class HeuristicEvaluator(BaseEvaluator):
+    '''
+    모델 없이 CPU에서 빠르게 동작하는 휴리스틱 평가.
+        - coverage: 제품 영역(mask)이 원본 캔버스와 얼마나 같게 보존되었는지
+        - harmony: 배경 색상(hue)의 분산이 작을수록 조화로운 것으로 판단
+        - sharpness: Laplacian 분산 기반 선명도
+    각 항목을 0~1로 정규화한 뒤 가중합 x 100을 점수로 사용합니다.
+    '''
+    name = "heuristic"
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.weights = {"coverage": 0.4, "harmony": 0.3, "sharpness": 0.3}
+        self.weights.update(weights or {})
+
+    @log_execution_time(label="휴리스틱 평가를 시작합니다...")
+    def evaluate_images(
+        self,
+        images: List[Image.Image],
+        prompt: str,
+        canvas: Optional[Image.Image] = None,
+        mask: Optional[Image.Image] = None,
+    ) -> List[Dict[str, Any]]:
+        scores = []
+        for image in images:
+            rgb = np.asarray(image.convert("RGB"))
+            product = self._product_mask(mask, image.size)
+            parts = {
+                "coverage": self._coverage(rgb, canvas, product),
+                "harmony": self._harmony(rgb, product),
+                "sharpness": self._sharpness(rgb),
+            }
+            scores.append(sum(self.weights[k] * v for k, v in parts.items()) * 100)
+        ranked = self._rank(images, scores)
+        logger.debug(f"Heuristic Score: {[r['clip_score'] for r in ranked]}")
+        return ranked
+
+    @staticmethod
+    def _product_mask(mask: Optional[Image.Image], size) -> Optional[np.ndarray]:
+        if mask is None:
+            return None
+        if mask.size != size:
+            mask = mask.resize(size, Image.Resampling.BILINEAR)
+        return np.asarray(mask.convert("L")) > 127
+
+    @staticmethod
+    def _coverage(rgb: np.ndarray, canvas: Optional[Image.Image], product: Optional[np.ndarray]) -> float:
+        if canvas is None or product is None or not product.any():
+            return 1.0
+        if canvas.size != (rgb.shape[1], rgb.shape[0]):
+            canvas = canvas.resize((rgb.shape[1], rgb.shape[0]), Image.Resampling.BILINEAR)
+        reference = np.asarray(canvas.convert("RGB"))
+        diff = np.abs(rgb[product].astype(np.int16) - reference[product].astype(np.int16)).mean()
+        return float(1.0 - diff / 255.0)
+
+    @staticmethod
+    def _harmony(rgb: np.ndarray, product: Optional[np.ndarray]) -> float:
+        hsv = cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV)
+        background = ~product if product is not None else np.ones(rgb.shape[:2], dtype=bool)
+        hue = hsv[..., 0][background].astype(np.float32) * (2 * np.pi / 180.0)  # OpenCV hue: 0~179
+        sat = hsv[..., 1][background].astype(np.float32) / 255.0
+        if sat.sum() == 0:
+            return 1.0
+        # 채도 가중 원형 평균의 길이 (1에 가까울수록 색상이 한 방향으로 모여 있음)
+        resultant = np.hypot((sat * np.cos(hue)).sum(), (sat * np.sin(hue)).sum()) / sat.sum()
+        return float(resultant)
+
+    @staticmethod
+    def _sharpness(rgb: np.ndarray) -> float:
+        gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        variance = cv2.Laplacian(gray, cv2.CV_64F).var()
+        return float(1.0 - np.exp(-variance / 100.0))
+
+def build_evaluator(config: Dict) -> BaseEvaluator:
+    '''
+    설정(evaluation 섹션)의 backend 값에 맞는 평가 모듈을 생성합니다.
+        - clip: openai/clip-vit-large-patch14 (기본)
+        - clip_small: 작은 CLIP (옵션으로 CPU int8 양자화)
+        - heuristic: 모델 없이 mask 보존율, 색 조화, 선명도로 평가
+    '''
+    eval_cfg = config.get("evaluation", {})
+    backend = eval_cfg.get("backend", "clip")
+    device = eval_cfg.get("device")
+    device = None if device in (None, "auto") else device
+
+    if backend == "clip":
+        return ImageEvaluator(device=device, model_id=eval_cfg.get("clip_model_id", CLIP_LARGE_MODEL_ID))
+    if backend == "clip_small":
+        return ImageEvaluator(
+            device=device,
+            model_id=eval_cfg.get("clip_small_model_id", CLIP_SMALL_MODEL_ID),
+            quantize=eval_cfg.get("quantize", False),
+        )
+    if backend == "heuristic":
+        return HeuristicEvaluator(weights=eval_cfg.get("heuristic_weights"))
+    raise ValueError(f"지원하지 않는 평가 백엔드입니다: {backend}")
@@ -1,16 +1,181 @@
-from openai import OpenAI
-from typing import List, Dict, Optional, Any
+import asyncio
+import json
+import concurrent.futures
+import threading
+from openai import OpenAI, AsyncOpenAI
+from typing import Awaitable, List, Dict, Optional, Any
 from image_modules.utils import log_execution_time, logger
 
+AD_PLAN_SYSTEM_PROMPT = """
+            당신은 창의적인 AI 광고 기획자입니다. 주어진 제품 이미지를 보고 제품의 종류, 특징, 색감, 구성요소를 요약하고, 해당 제품이 돋보일 수 있도록 배경 디자인과 분위기를 제안하세요.
+
+            배경은 Stable Diffusion을 통해 생성될 예정이며, 제품은 이미지에서 보이는 위치에 고정되어 있으므로 배경은 해당 위치를 고려한 구성으로 디자인되어야 합니다.
+
+            선택적으로 참고 이미지가 있을 경우 광고 스타일이나 분위기를 참고하여 유사한 톤이나 무드를 제안할 수 있습니다.
+
+            📌 출력 구성 예시:
+            - 제품 요약:
+            - 배경 디자인 제안: 최대한 직관적이고 간결하게
+            - 광고 분위기 키워드:
+            - 짧은 카피 제안:
+
+            예시는 제공하지 마세요.
+            """
+
+SD_PROMPT_SYSTEM_PROMPT = """
+        You are a prompt generator for Stable Diffusion v1.5 inpainting.
+
+        Convert the following Korean advertisement background description into a single, natural English sentence describing only the background scene.
+
+        Exclude product names, brand names, or overlay text. Emphasize product location, mood, lighting, depth, texture, and style to guide realistic image generation.
+
+        Format: [Style or Mood], [Background elements], [Lighting or Material], [Camera angle], [Focus information]
+
+        Output only keywords in a comma-separated list.
+
+        Do not include the information of product, only the background.
+        """
+
+STRUCTURED_PLAN_SYSTEM_PROMPT = """
+            당신은 창의적인 AI 광고 기획자이자 Stable Diffusion v1.5 inpainting 프롬프트 작성자입니다.
+            제품 이미지가 주어지면 제품의 종류, 특징, 색감을 파악하고, 제품이 돋보이는 배경 디자인과 분위기를 기획하세요.
+            제품은 이미지에서 보이는 위치에 고정되어 있으므로 배경은 해당 위치를 고려해야 합니다.
+            참고 이미지가 있으면 그 스타일과 분위기를 참고하세요. 이미지가 없으면 제품 종류만으로 기획하세요.
+
+            아래 필드를 가진 JSON 객체 하나만 출력하세요.
+            - ad_plan: 한국어 광고 기획 (제품 요약, 배경 디자인 제안, 분위기 키워드를 간결하게)
+            - sd_prompt: 배경만 묘사하는 영어 키워드를 쉼표로 구분한 목록
+              형식: [Style or Mood], [Background elements], [Lighting or Material], [Camera angle], [Focus information]
+              제품명, 브랜드명, 문구, 사람은 포함하지 마세요. 60단어 이내로 작성하세요.
+            - copy: 한국어 짧은 광고 카피 한 문장
+            """
+
+STRUCTURED_PLAN_SCHEMA = {
+    "name": "ad_background_plan",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "ad_plan": {"type": "string"},
+            "sd_prompt": {"type": "string"},
+            "copy": {"type": "string"},
+        },
+        "required": ["ad_plan", "sd_prompt", "copy"],
+        "additionalProperties": False,
+    },
+}
+
+def _image_part(b64: str, mime: str = "image/png", detail: Optional[str] = None) -> Dict[str, Any]:
+    image_url: Dict[str, Any] = {"url": f"data:{mime};base64,{b64}"}
+    if detail:
+        image_url["detail"] = detail
+    return {"type": "image_url", "image_url": image_url}
+
+def _is_image_b64(b64: Optional[str]) -> bool:
+    # 간단한 base64 유효성 검사 (PNG / JPEG / WebP 시작 부분 체크)
+    return bool(b64) and isinstance(b64, str) and b64.startswith(("iVBOR", "/9j/", "UklGR"))
+
+def build_ad_plan_messages(
+    product_b64: str,
+    ref_b64: Optional[str] = None,
+    product_type: str = "food",
+    marketing_type: str = "홍보 배너 제작",
+    mime: str = "image/png",
+    detail: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    '''
+    제품 이미지(및 참조 이미지) 기반 광고 기획 요청 메시지 (동기/비동기 클라이언트 공용)
+    mime / detail: 이미지 인코딩 포맷과 vision detail 힌트 (utils.encode_image_for_vision)
+    '''
+    user_prompt: List[Dict[str, Any]] = [
+        {"type": "text", "text": f"Product type: {product_type}. Context: {marketing_type}."},
+        _image_part(product_b64, mime, detail),
+    ]
+    if _is_image_b64(ref_b64):
+        user_prompt.append(_image_part(ref_b64, mime, detail))
+
+    return [
+        {"role": "system", "content": AD_PLAN_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def build_sd_prompt_messages(ad_description: str) -> List[Dict[str, Any]]:
+    '''한글 광고 기획서 → 영어 SD 프롬프트 변환 요청 메시지'''
+    return [
+        {"role": "system", "content": SD_PROMPT_SYSTEM_PROMPT},
+        {"role": "user", "content": ad_description}
+    ]
+
+def build_structured_plan_messages(
+    product_b64: Optional[str] = None,
+    ref_b64: Optional[str] = None,
+    product_type: str = "food",
+    marketing_type: str = "홍보 배너 제작",
+    mime: str = "image/png",
+    detail: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    '''기획 + SD 프롬프트 + 카피를 한 번에 요청하는 메시지. product_b64가 없으면 텍스트 기반으로 기획합니다.'''
+    user_prompt: List[Dict[str, Any]] = [
+        {"type": "text", "text": f"Product type: {product_type}. Context: {marketing_type}의 분위기에 맞는 배경 생성."},
+    ]
+    if product_b64:
+        user_prompt.append(_image_part(product_b64, mime, detail))
+        if _is_image_b64(ref_b64):
+            user_prompt.append(_image_part(ref_b64, mime, detail))
+
+    return [
+        {"role": "system", "content": STRUCTURED_PLAN_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def parse_structured_plan(content: str) -> Dict[str, str]:
+    '''
+    구조화된 기획 응답(JSON)을 검증합니다. 필드가 없거나 비어 있으면 ValueError가 발생합니다.
+    sd_prompt는 쉼표 목록이어야 하며, 모델이 설명 문장을 붙인 경우를 막기 위해 줄바꿈 이후는 버립니다.
+    '''
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON 형식이 아닙니다: {e}") from e
+    if not isinstance(data, dict):
+        raise ValueError("JSON 객체가 아닙니다.")
+
+    plan = {}
+    for field in STRUCTURED_PLAN_SCHEMA["schema"]["required"]:
+        value = data.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"'{field}' 필드가 없거나 비어 있습니다.")
+        plan[field] = value.strip()
+
+    plan["sd_prompt"] = plan["sd_prompt"].splitlines()[0].strip()
+    if plan["sd_prompt"].count(",") < 2:
+        raise ValueError(f"sd_prompt가 쉼표 목록 형식이 아닙니다: {plan['sd_prompt']}")
+    return plan
+
+def _check_sd_prompt(result: str) -> str:
+    # 간단한 검증
+    if result.count(",") < 2:
+        logger.warning("Output prompt seems too short or malformed")
+    return result
+
+def _response_content(response) -> str:
+    choice = response.choices[0]
+    if not hasattr(choice, "message") or not choice.message.content:
+        raise RuntimeError("GPT 응답이 비어 있습니다.")
+    return choice.message.content.strip()
+
 class GPTClient:
     """
     OpenAI GPT 모델을 활용한 광고 기획, 프롬프트 변환, 이미지 분석 기능을 제공합니다.
     """
 
-    def __init__(self, api_key: str, model_name: str):
+    def __init__(self, api_key: str, model_name: str, cache=None, base_url: Optional[str] = None, governor=None):
         logger.info(f"Initializing GPTClient with model: {model_name}")
-        self.client = OpenAI(api_key=api_key)
+        # base_url: OpenAI 호환 서버 (None이면 기본 API), 재시도는 governor가 담당
+        self.client = OpenAI(api_key=api_key, base_url=base_url, **({"max_retries": 0} if governor is not None else {}))
         self.model_name = model_name
+        self.cache = cache  # utils.response_cache.ResponseCache (None이면 캐시하지 않음)
+        self.governor = governor  # app.services.llm_governor.LLMGovernor (속도/동시성 제한 + 재시도)
 
     def chat(self, messages: List[Dict[str, Any]], max_tokens: int = 300) -> str:
         """
@@ -33,18 +198,29 @@ class GPTClient:
         Returns:
             str: GPT 응답 텍스트
         """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key("gpt_chat", model=self.model_name, messages=messages, max_tokens=max_tokens)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Using cached OpenAI response")
+                return cached
+
         try:
             logger.info("Sending message to OpenAI...")
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
-                max_tokens=max_tokens
-            )
-            choice = response.choices[0]
-            if not hasattr(choice, "message") or not choice.message.content:
-                raise RuntimeError("GPT 응답이 비어 있습니다.")
-            content = choice.message.content.strip()
+            request = dict(model=self.model_name, messages=messages, max_tokens=max_tokens)
+            if self.governor is not None:
+                response = self.governor.call_sync(
+                    self.model_name,
+                    lambda: self.client.chat.completions.create(**request),
+                    tokens=self.governor.estimate_tokens(messages, max_tokens),
+                )
+            else:
+                response = self.client.chat.completions.create(**request)
+            content = _response_content(response)
             logger.info("Received response from OpenAI")
+            if cache_key is not None:
+                self.cache.set(cache_key, content)
             return content
         except Exception as e:
             logger.error(f"Chat API request failed: {e}")
@@ -62,37 +238,7 @@ class GPTClient:
         제품 이미지(및 참조 이미지)를 기반으로 한 광고 기획안을 생성합니다.
         """
         logger.info("Generating ad plan using GPT")
-
-        system_prompt = """
-            당신은 창의적인 AI 광고 기획자입니다. 주어진 제품 이미지를 보고 제품의 종류, 특징, 색감, 구성요소를 요약하고, 해당 제품이 돋보일 수 있도록 배경 디자인과 분위기를 제안하세요.
-
-            배경은 Stable Diffusion을 통해 생성될 예정이며, 제품은 이미지에서 보이는 위치에 고정되어 있으므로 배경은 해당 위치를 고려한 구성으로 디자인되어야 합니다.
-
-            선택적으로 참고 이미지가 있을 경우 광고 스타일이나 분위기를 참고하여 유사한 톤이나 무드를 제안할 수 있습니다.
-
-            📌 출력 구성 예시:
-            - 제품 요약:
-            - 배경 디자인 제안: 최대한 직관적이고 간결하게
-            - 광고 분위기 키워드: 
-            - 짧은 카피 제안:
-
-            예시는 제공하지 마세요.
-            """
-
-        user_prompt: List[Dict[str, Any]] = [
-            {"type": "text", "text": f"Product type: {product_type}. Context: {marketing_type}."},
-            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{product_b64}"}},
-        ]
-        # 간단한 base64 유효성 검사 (PNG 시작 부분 체크)
-        if ref_b64 and isinstance(ref_b64, str) and ref_b64.startswith(("iVBOR", "/9j/")):
-            user_prompt.append({"type": "image_url", "image_url": {"url": f"data:image/png;base64,{ref_b64}"}})
-
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
-
-        return self.chat(messages)
+        return self.chat(build_ad_plan_messages(product_b64, ref_b64, product_type, marketing_type))
 
     @log_execution_time(label="Converting to Prompt...")
     def convert_to_sd_prompt(self, ad_description: str) -> str:
@@ -100,30 +246,158 @@ class GPTClient:
         한글 광고 기획서를 영어 이미지 프롬프트로 변환합니다.
         """
         logger.info("Converting ad plan to Stable Diffusion prompt")
+        return _check_sd_prompt(self.chat(build_sd_prompt_messages(ad_description), max_tokens=77))
 
-        system_prompt = """
-        You are a prompt generator for Stable Diffusion v1.5 inpainting.
+class AsyncGPTClient:
+    """
+    GPTClient의 비동기 버전. 요청마다 timeout을 적용하고, 작업이 취소되면 진행 중인 HTTP 요청도 함께 취소됩니다.
+    httpx 연결은 처음 사용한 이벤트 루프에 묶이므로 하나의 루프(BackgroundLoop)에서만 사용해야 합니다.
+    """
 
-        Convert the following Korean advertisement background description into a single, natural English sentence describing only the background scene.
+    def __init__(self, api_key: str, model_name: str, cache=None, base_url: Optional[str] = None, governor=None, timeout: float = 60.0):
+        logger.info(f"Initializing AsyncGPTClient with model: {model_name}")
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, **({"max_retries": 0} if governor is not None else {}))
+        self.model_name = model_name
+        self.cache = cache
+        self.governor = governor
+        self.timeout = timeout
 
-        Exclude product names, brand names, or overlay text. Emphasize product location, mood, lighting, depth, texture, and style to guide realistic image generation.
+    async def chat(self, messages: List[Dict[str, Any]], max_tokens: int = 300, use_cache: bool = True, response_format: Optional[Dict[str, Any]] = None) -> str:
+        """
+        GPTClient.chat과 같은 캐시 키를 사용하므로 동기/비동기 경로가 캐시를 공유합니다.
+        use_cache=False이면 캐시를 읽지 않고 새로 요청한 뒤 결과로 캐시를 갱신합니다.
+        response_format: JSON 응답 형식 (structured outputs)
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key(messages, max_tokens, response_format)
+            cached = self.cache.get(cache_key) if use_cache else None
+            if cached is not None:
+                logger.info("Using cached OpenAI response")
+                return cached
 
-        Format: [Style or Mood], [Background elements], [Lighting or Material], [Camera angle], [Focus information]
+        try:
+            logger.info("Sending message to OpenAI (async)...")
+            request = dict(model=self.model_name, messages=messages, max_tokens=max_tokens)
+            if response_format is not None:
+                request["response_format"] = response_format
+            if self.governor is not None:
+                # governor의 재시도/대기까지 포함한 전체 시간에 timeout 적용
+                response = await asyncio.wait_for(
+                    self.governor.call(
+                        self.model_name,
+                        lambda: self.client.chat.completions.create(**request),
+                        tokens=self.governor.estimate_tokens(messages, max_tokens),
+                    ),
+                    timeout=self.timeout,
+                )
+            else:
+                response = await asyncio.wait_for(self.client.chat.completions.create(**request), timeout=self.timeout)
+            content = _response_content(response)
+            logger.info("Received response from OpenAI (async)")
+            if cache_key is not None:
+                self.cache.set(cache_key, content)
+            return content
+        except asyncio.CancelledError:
+            logger.info("Chat API request cancelled")
+            raise
+        except asyncio.TimeoutError as e:
+            logger.error(f"Chat API request timed out after {self.timeout}s")
+            raise RuntimeError("GPT 응답 시간 초과") from e
+        except Exception as e:
+            logger.error(f"Chat API request failed: {e}")
+            raise RuntimeError("GPT 응답 실패") from e
 
-        Output only keywords in a comma-separated list.
+    @log_execution_time(label="Generating Ad Plan (async)...")
+    async def analyze_ad_plan(
+        self,
+        product_b64: str,
+        ref_b64: Optional[str] = None,
+        product_type: str = "food",
+        marketing_type: str = "홍보 배너 제작",
+        use_cache: bool = True,
+        mime: str = "image/png",
+        detail: Optional[str] = None
+    ) -> str:
+        logger.info("Generating ad plan using GPT")
+        return await self.chat(build_ad_plan_messages(product_b64, ref_b64, product_type, marketing_type, mime, detail), use_cache=use_cache)
 
-        Do not include the information of product, only the background.
+    @log_execution_time(label="Converting to Prompt (async)...")
+    async def convert_to_sd_prompt(self, ad_description: str, use_cache: bool = True) -> str:
+        logger.info("Converting ad plan to Stable Diffusion prompt")
+        return _check_sd_prompt(await self.chat(build_sd_prompt_messages(ad_description), max_tokens=77, use_cache=use_cache))
+
+    @log_execution_time(label="Generating Structured Ad Plan (async)...")
+    async def plan_structured(
+        self,
+        product_b64: Optional[str] = None,
+        ref_b64: Optional[str] = None,
+        product_type: str = "food",
+        marketing_type: str = "홍보 배너 제작",
+        max_tokens: int = 450,
+        use_cache: bool = True,
+        mime: str = "image/png",
+        detail: Optional[str] = None
+    ) -> Dict[str, str]:
+        """
+        광고 기획, 영어 SD 프롬프트, 카피를 한 번의 호출로 받습니다. (analyze_ad_plan + convert_to_sd_prompt 대체)
+        응답이 스키마에 맞지 않으면 ValueError가 발생하며, 잘못된 응답은 캐시에 남기지 않습니다.
         """
+        logger.info("Generating structured ad plan using GPT")
+        messages = build_structured_plan_messages(product_b64, ref_b64, product_type, marketing_type, mime, detail)
+        response_format = {"type": "json_schema", "json_schema": STRUCTURED_PLAN_SCHEMA}
+        content = await self.chat(messages, max_tokens=max_tokens, use_cache=use_cache, response_format=response_format)
+        try:
+            return parse_structured_plan(content)
+        except ValueError:
+            if self.cache is not None:
+                self.cache.delete(self._cache_key(messages, max_tokens, response_format))
+            raise
+
+    def _cache_key(self, messages: List[Dict[str, Any]], max_tokens: int, response_format: Optional[Dict[str, Any]] = None) -> str:
+        extra = {"response_format": response_format} if response_format is not None else {}
+        return self.cache.make_key("gpt_chat", model=self.model_name, messages=messages, max_tokens=max_tokens, **extra)
+
+    async def close(self):
+        await self.client.close()
+
+class BackgroundLoop:
+    """
+    동기 코드(작업 워커 스레드)에서 코루틴을 백그라운드로 실행하기 위한 전용 이벤트 루프 스레드.
+    submit()은 concurrent.futures.Future를 반환하며, future.cancel()은 실행 중인 코루틴에 CancelledError를 전달합니다.
+    """
 
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": ad_description}
-        ]
+    def __init__(self, name: str = "gpt-background-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
 
-        result = self.chat(messages, max_tokens=77)
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True)
+                self._thread.start()
+            return self._loop
 
-        # 간단한 검증
-        if result.count(",") < 2:
-            logger.warning("Output prompt seems too short or malformed")
+    def submit(self, coro: Awaitable[Any]) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
 
-        return result
\ No newline at end of file
+    def stop(self, cleanup: Optional[Awaitable[Any]] = None, timeout: float = 5.0):
+        '''cleanup 코루틴(예: 클라이언트 close)을 실행한 뒤 루프를 종료합니다.'''
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop, self._thread = None, None
+        if loop is None:
+            if cleanup is not None and asyncio.iscoroutine(cleanup):
+                cleanup.close()
+            return
+        if cleanup is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(cleanup, loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"{self.name} 정리 실패: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        loop.close()
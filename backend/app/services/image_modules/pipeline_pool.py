@@ -0,0 +1,238 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import torch
+from image_modules import pipeline_utils
+from image_modules.utils import log_execution_time, logger
+
+class PipelinePool:
+    '''
+    (mode, category) 단위로 파이프라인을 상주시키는 풀.
+
+    - 같은 model_id를 쓰는 모드(text2img/controlnet, inpaint/controlnet_inpaint)는
+      from_pipe로 UNet/VAE/텍스트 인코더를 공유하므로 가중치를 한 번만 읽습니다.
+    - LoRA는 어댑터 이름 단위로 한 번만 로드하고, 카테고리가 바뀌면 set_adapters로 전환합니다.
+    - max_entries를 넘으면 가장 오래 쓰지 않은 (mode, category)의 어댑터를,
+      max_memory_gb를 넘으면 가장 오래 쓰지 않은 base 모델을 내립니다. (LRU)
+    - 생성 프로필(generation_profiles)의 scheduler와 추가 LoRA(예: LCM)는 상주 파이프라인에서 교체만 합니다.
+
+    Args:
+        - config: 설정값 (sd_pipeline, lora, paths, pipeline_pool 섹션 사용)
+    '''
+    def __init__(self, config: Dict):
+        self.cfg = config
+        pool_cfg = config.get("pipeline_pool", {})
+        max_memory_gb = pool_cfg.get("max_memory_gb")
+        self.max_memory_bytes = int(max_memory_gb * 1024 ** 3) if max_memory_gb else None
+        self.max_entries = pool_cfg.get("max_entries", 8)
+
+        self._bases: Dict[str, object] = {}                 # model_id -> 가중치를 가진 파이프라인
+        self._base_bytes: Dict[str, int] = {}               # model_id -> 추정 메모리 사용량
+        self._views: Dict[str, object] = {}                 # mode -> 파이프라인 (base를 공유)
+        self._adapters: Dict[str, set] = {}                 # model_id -> 로드된 LoRA 어댑터 이름
+        self._active: Dict[str, Optional[Tuple]] = {}       # model_id -> 현재 활성화된 (카테고리, 프로필 LoRA)
+        self._default_schedulers: Dict[str, object] = {}    # mode -> 모델 기본 scheduler
+        self._schedulers: Dict[Tuple[str, str], object] = {}  # (mode, scheduler 이름) -> scheduler
+        self._entries: "OrderedDict[Tuple[str, str], str]" = OrderedDict()  # (mode, category) -> model_id
+        self._model_lru: "OrderedDict[str, None]" = OrderedDict()  # base model_id 사용 순서 (오래된 것부터)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def model_id_for(self, mode: str) -> str:
+        model_id = self.cfg["sd_pipeline"].get(mode, {}).get("model_id")
+        if model_id is None:
+            raise ValueError(f"Unsupported pipeline_type: {mode}, Choose from {list(pipeline_utils.PIPELINE_CLASSES.keys())}")
+        return model_id
+
+    def get(self, mode: str, category: Optional[str] = None, profile: Optional[Dict] = None):
+        '''
+        mode와 category에 맞는 파이프라인을 반환합니다. 필요한 경우에만 가중치와 LoRA를 로드합니다.
+        profile이 있으면 프로필의 scheduler와 LoRA(예: LCM)를 적용합니다. (없으면 모델 기본 scheduler)
+        '''
+        profile = profile or {}
+        with self._lock:
+            key = (mode, category)
+            model_id = self.model_id_for(mode)
+            if key in self._entries and mode in self._views:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            else:
+                self.misses += 1
+                logger.info(f"Pipeline pool miss: {key}")
+
+            pipe = self._get_view(mode, model_id)
+            self._activate_category(pipe, model_id, category, profile.get("lora"))
+            self._set_scheduler(mode, pipe, profile.get("scheduler", "default"))
+            self._entries[key] = model_id
+            self._entries.move_to_end(key)
+            self._model_lru[model_id] = None
+            self._model_lru.move_to_end(model_id)
+            self._evict(keep=key)
+            return pipe
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": [list(key) for key in self._entries],
+                "resident_models": list(self._bases.keys()),
+                "memory_bytes": sum(self._base_bytes.values()),
+                "max_memory_bytes": self.max_memory_bytes,
+            }
+
+    def clear(self):
+        '''모든 파이프라인을 내립니다.'''
+        with self._lock:
+            for model_id in list(self._bases.keys()):
+                self._unload_base(model_id)
+            self._entries.clear()
+
+    def _get_view(self, mode: str, model_id: str):
+        if mode in self._views:
+            return self._views[mode]
+
+        base = self._bases.get(model_id)
+        if base is None:
+            logger.info(f"{mode} 파이프라인을 새로 로드합니다. (model_id: {model_id})")
+            pipe = pipeline_utils.load_pipeline_by_type(self.cfg, mode)
+            self._bases[model_id] = pipe
+            self._base_bytes[model_id] = estimate_pipeline_bytes(pipe)
+            self._adapters[model_id] = set()
+            self._active[model_id] = None
+        else:
+            logger.info(f"{mode} 파이프라인을 기존 가중치로 구성합니다. (model_id: {model_id})")
+            pipe = pipeline_utils.derive_pipeline(base, self.cfg, mode)
+        self._views[mode] = pipe
+        self._default_schedulers[mode] = pipe.scheduler
+        return pipe
+
+    def _set_scheduler(self, pipe_mode: str, pipe, name: str):
+        '''view의 scheduler만 교체합니다. (가중치를 공유하는 다른 view에는 영향 없음)'''
+        if name == "default":
+            scheduler = self._default_schedulers[pipe_mode]
+        else:
+            scheduler = self._schedulers.get((pipe_mode, name))
+            if scheduler is None:
+                scheduler = pipeline_utils.build_scheduler(name, self._default_schedulers[pipe_mode].config)
+                self._schedulers[(pipe_mode, name)] = scheduler
+        if pipe.scheduler is not scheduler:
+            logger.info(f"{pipe_mode} scheduler 교체: {name} ({type(scheduler).__name__})")
+            pipe.scheduler = scheduler
+
+    @log_execution_time(label="Switch LoRA Adapters")
+    def _activate_category(self, pipe, model_id: str, category: Optional[str], profile_lora: Optional[Dict] = None):
+        '''
+        카테고리의 LoRA 어댑터를 (필요하면 로드하고) 활성화합니다. UNet을 공유하므로 model_id 단위로 관리합니다.
+        profile_lora: 생성 프로필의 추가 LoRA {name, path, weight_name, scale} (예: LCM LoRA). 카테고리 어댑터와 함께 활성화합니다.
+        '''
+        state = (category, profile_lora["name"] if profile_lora else None)
+        if self._active.get(model_id) == state:
+            return
+
+        lora_items = list(self.cfg['lora']['category_map'].get(category, [])) if category else []
+        if profile_lora:
+            lora_items.append(profile_lora)
+        loaded = self._adapters.setdefault(model_id, set())
+        adapter_names, adapter_weights = [], []
+        for lora in lora_items:
+            name = lora["name"]
+            if name not in loaded:
+                try:
+                    pipe.load_lora_weights(
+                        pretrained_model_name_or_path_or_dict=lora.get("path", self.cfg['paths']['lora_dir']),
+                        weight_name=lora.get("weight_name", f"{name}.safetensors"),
+                        adapter_name=name
+                    )
+                    loaded.add(name)
+                except Exception as e:
+                    logger.error(f"Failed to load LoRA '{name}': {e}")
+                    continue
+            adapter_names.append(name)
+            adapter_weights.append(lora.get("scale", 1.0))
+
+        if adapter_names:
+            pipe.enable_lora()
+            pipe.set_adapters(adapter_names, adapter_weights)
+        elif loaded:
+            logger.warning("No LoRA category specified. Using base model only.")
+            pipe.disable_lora()
+        self._active[model_id] = state
+        logger.debug(f"LoRA 적용 상태: {adapter_names}")
+
+    def _evict(self, keep: Tuple[str, str]):
+        # 1. 항목 수 제한: 오래 쓰지 않은 (mode, category)의 어댑터를 내린다.
+        while len(self._entries) > self.max_entries:
+            key, model_id = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            del self._entries[key]
+            self._drop_unused_adapters(model_id)
+            self.evictions += 1
+            logger.info(f"Pipeline pool evicted entry: {key}")
+
+        # 2. 메모리 제한: 항목이 남지 않은 base부터, 그 다음 오래 쓰지 않은 base 모델을 내린다.
+        if self.max_memory_bytes is None:
+            return
+        keep_model = self._entries.get(keep)
+        while sum(self._base_bytes.values()) > self.max_memory_bytes:
+            candidates = [m for m in self._model_lru if m in self._bases and m != keep_model]
+            candidates += [m for m in self._bases if m not in self._model_lru and m != keep_model]
+            in_use = set(self._entries.values())
+            victim = next((m for m in candidates if m not in in_use), None) or next(iter(candidates), None)
+            if victim is None:
+                logger.warning("Pipeline pool exceeds memory budget but nothing can be evicted")
+                break
+            self._unload_base(victim)
+            self.evictions += 1
+            logger.info(f"Pipeline pool evicted model: {victim}")
+
+    def _drop_unused_adapters(self, model_id: str):
+        '''남아 있는 항목이 쓰지 않는 어댑터를 UNet에서 제거합니다.'''
+        # 프로필 LoRA(예: LCM)는 카테고리와 무관하게 다시 쓰이므로 유지
+        in_use = {
+            profile["lora"]["name"]
+            for profile in self.cfg.get("generation_profiles", {}).get("profiles", {}).values()
+            if profile.get("lora")
+        }
+        for (_, category), entry_model in self._entries.items():
+            if entry_model == model_id and category:
+                in_use.update(l["name"] for l in self.cfg['lora']['category_map'].get(category, []))
+        unused = self._adapters.get(model_id, set()) - in_use
+        if unused and model_id in self._bases:
+            self._bases[model_id].delete_adapters(list(unused))
+            self._adapters[model_id] -= unused
+
+    def _unload_base(self, model_id: str):
+        try:
+            for mode in [m for m, p in self._views.items() if self.model_id_for(m) == model_id]:
+                del self._views[mode]
+                self._default_schedulers.pop(mode, None)
+                for key in [k for k in self._schedulers if k[0] == mode]:
+                    del self._schedulers[key]
+            for key in [k for k, m in self._entries.items() if m == model_id]:
+                del self._entries[key]
+            base = self._bases.pop(model_id, None)
+            self._base_bytes.pop(model_id, None)
+            self._model_lru.pop(model_id, None)
+            self._adapters.pop(model_id, None)
+            self._active.pop(model_id, None)
+            if base is not None:
+                base.to("cpu")
+                del base
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except Exception as e:
+            logger.error(f"리소스 정리 실패: {str(e)}")
+
+def estimate_pipeline_bytes(pipe) -> int:
+    '''파이프라인 구성요소(nn.Module)의 파라미터와 버퍼 크기 합을 추정합니다.'''
+    total = 0
+    for component in pipe.components.values():
+        if isinstance(component, torch.nn.Module):
+            total += sum(p.numel() * p.element_size() for p in component.parameters())
+            total += sum(b.numel() * b.element_size() for b in component.buffers())
+    return total
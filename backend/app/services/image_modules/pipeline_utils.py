@@ -5,6 +5,10 @@ from diffusers import (
     StableDiffusionControlNetPipeline,
     StableDiffusionControlNetInpaintPipeline,
     ControlNetModel,
+    DPMSolverMultistepScheduler,
+    EulerDiscreteScheduler,
+    EulerAncestralDiscreteScheduler,
+    LCMScheduler,
 )
 from typing import Dict, Literal
 import logging
@@ -26,6 +30,25 @@ CONTROLNET_MODEL_MAP = {
     "openpose": "lllyasviel/sd-controlnet-openpose",
 }
 
+# 생성 프로필에서 선택하는 scheduler. (클래스, 모델 기본 설정에 덮어쓸 인자)
+SCHEDULERS = {
+    "dpmpp_2m": (DPMSolverMultistepScheduler, {"algorithm_type": "dpmsolver++", "solver_order": 2}),
+    "dpmpp_2m_karras": (DPMSolverMultistepScheduler, {"algorithm_type": "dpmsolver++", "solver_order": 2, "use_karras_sigmas": True}),
+    "euler": (EulerDiscreteScheduler, {}),
+    "euler_a": (EulerAncestralDiscreteScheduler, {}),
+    "lcm": (LCMScheduler, {}),  # LCM LoRA와 함께 4~8 step으로 사용
+}
+
+def build_scheduler(name: str, base_config):
+    '''
+    모델 기본 scheduler 설정(base_config)으로 name에 해당하는 scheduler를 만든다.
+    scheduler는 가중치가 없으므로 상주 중인 파이프라인에서 다시 로드하지 않고 바로 교체할 수 있다.
+    '''
+    if name not in SCHEDULERS:
+        raise ValueError(f"Unsupported scheduler: {name}, Choose from {['default'] + list(SCHEDULERS.keys())}")
+    scheduler_cls, overrides = SCHEDULERS[name]
+    return scheduler_cls.from_config(base_config, **overrides)
+
 @log_execution_time(label="Load ControlNets")
 def load_controlnets(config, names: list[str], dtype=torch.float16, device="cuda"):
     '''controlnet을 로드한다. names인자에 여러 조건이 들어올경우 다중으로 controlnet을 로드한다.'''
@@ -85,6 +108,24 @@ def load_pipeline_by_type(config: Dict, pipeline_type: str, controlnet_types: li
 
     return create_pipeline(pipe_cls, model_id, device, torch_dtype, controlnet)
 
+@log_execution_time(label="Derive SD Pipeline")
+def derive_pipeline(base_pipe, config: Dict, pipeline_type: str, controlnet_types: list[str] = None):
+    '''
+    이미 로드된 파이프라인의 구성요소(UNet/VAE/텍스트 인코더)를 그대로 공유하는 다른 type의 파이프라인을 만든다.
+    가중치를 다시 읽지 않으므로 model_id가 같은 type 사이에서만 사용한다.
+    '''
+    pipe_cls = PIPELINE_CLASSES.get(pipeline_type)
+    if pipe_cls is None:
+        raise ValueError(f"Unsupported pipeline_type: {pipeline_type}, Choose from {list(PIPELINE_CLASSES.keys())}")
+
+    if "controlnet" in pipeline_type:
+        torch_dtype = getattr(torch, config["sd_pipeline"].get("torch_dtype", "float16"))
+        device = config["sd_pipeline"].get("device", "cuda")
+        types = controlnet_types or config.get("controlnet", {}).get("types", ["canny"])
+        controlnet = load_controlnets(config, types, dtype=torch_dtype, device=device)
+        return pipe_cls.from_pipe(base_pipe, controlnet=controlnet)
+    return pipe_cls.from_pipe(base_pipe)
+
 @log_execution_time(label="Load All Pipelines")
 def load_pipelines(config):
     '''현재 설정된 네가지 파이프라인 모두를 로드한다.'''
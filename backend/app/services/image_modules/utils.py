@@ -1,13 +1,16 @@
 import yaml
-from typing import Any, Dict, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 import logging
 import io
 import base64
+import hashlib
 import os
 import time
+import inspect
+import threading
+from collections import OrderedDict
 from functools import wraps
-from PIL import Image, ImageFilter
-from rembg import remove
+from PIL import Image
 import cv2
 import numpy as np
 
@@ -64,6 +67,18 @@ def setup_logger(name: str, level: int = logging.INFO, log_to_file: Optional[str
 def log_execution_time(label=None):
     '''각 기능의 추론시간 파악을 위한 데코레이터'''
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                name = label or func.__name__
+                logger.debug(f"[START] {name}")
+                start = time.time()
+                result = await func(*args, **kwargs)
+                elapsed = time.time() - start
+                logger.info(f"[TIME] {name} 실행 시간: {elapsed:.3f}초")
+                return result
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             name = label or func.__name__
@@ -76,6 +91,15 @@ def log_execution_time(label=None):
         return wrapper
     return decorator
 
+def image_digest(image: Image.Image) -> str:
+    '''
+    이미지 픽셀 내용의 SHA-256 해시 (모드, 크기 포함).
+    같은 이미지면 인코딩 결과도 같으므로, 인코딩하지 않고 캐시 키로 사용할 수 있습니다.
+    '''
+    digest = hashlib.sha256(f"{image.mode}:{image.size}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
 @log_execution_time(label="Encode image to base64...")
 def encode_image(
     image: Union[str, Image.Image], 
@@ -119,37 +143,162 @@ def encode_image(
         raise
 
 
+# ==================================== GPT vision 인코딩 정책 ====================================
+# 모델별로 긴 변 길이, 포맷(JPEG/WebP/PNG), 품질, detail 힌트를 정해 업로드 바이트와 이미지 토큰을 줄입니다.
+DEFAULT_VISION_POLICY = {"max_edge": 768, "format": "jpeg", "quality": 85, "detail": "low"}
+_VISION_MIME = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+# 32px 패치 단위로 과금하는 모델과 배율 (그 외 모델은 512px 타일 방식)
+_PATCH_MODELS = {"gpt-4.1-mini": 1.62, "gpt-4.1-nano": 2.46, "o4-mini": 1.72}
+
+_vision_memo: "OrderedDict[Tuple, Tuple[str, str]]" = OrderedDict()
+_vision_memo_lock = threading.Lock()
+VISION_MEMO_ENTRIES = 64
+
+def vision_policy(config: Dict[str, Any], model_name: str) -> Dict[str, Any]:
+    '''설정(vision_encoding 섹션)의 default에 모델별 값을 덮어쓴 인코딩 정책을 반환합니다.'''
+    policy = dict(DEFAULT_VISION_POLICY)
+    policy.update(config.get("default", {}))
+    policy.update(config.get("models", {}).get(model_name, {}))
+    return policy
+
+def estimate_vision_tokens(size: Tuple[int, int], detail: Optional[str] = None, model_name: str = "gpt-4.1-mini") -> int:
+    '''OpenAI 문서의 계산 방식으로 이미지 한 장의 입력 토큰 수를 추정합니다.'''
+    width, height = size
+    if model_name in _PATCH_MODELS:
+        patches = -(-width // 32) * -(-height // 32)
+        if patches > 1536:
+            scale = (1536 * 32 * 32 / (width * height)) ** 0.5
+            patches = -(-int(width * scale) // 32) * -(-int(height * scale) // 32)
+        return int(min(patches, 1536) * _PATCH_MODELS[model_name])
+    if detail == "low":
+        return 85
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * (-(-int(width) // 512)) * (-(-int(height) // 512))
+
+def encode_image_for_vision(image: Image.Image, max_edge: Optional[int] = 768, format: str = "jpeg", quality: int = 85, detail: Optional[str] = None) -> Tuple[str, str]:
+    '''
+    정책에 맞게 이미지를 줄이고 압축하여 (base64, MIME 타입)을 반환합니다.
+    같은 이미지(픽셀 해시)와 정책이면 이전 인코딩 결과를 재사용합니다. detail은 메시지에 넣는 힌트이며 인코딩에는 영향이 없습니다.
+    '''
+    format = format.lower()
+    if format not in _VISION_MIME:
+        raise ValueError(f"지원하지 않는 인코딩 포맷입니다: {format}")
+    key = (image_digest(image), max_edge, format, quality)
+    with _vision_memo_lock:
+        if key in _vision_memo:
+            _vision_memo.move_to_end(key)
+            return _vision_memo[key]
+
+    start = time.perf_counter()
+    encoded = image.convert("RGB")
+    if max_edge and max(encoded.size) > max_edge:
+        encoded = encoded.copy()
+        encoded.thumbnail((max_edge, max_edge), Image.Resampling.BILINEAR)  # 축소 비율이 작아 LANCZOS와 차이가 거의 없음
+
+    buffered = io.BytesIO()
+    if format == "png":
+        encoded.save(buffered, format="PNG")
+    else:
+        encoded.save(buffered, format=format.upper(), quality=quality)
+    result = (base64.b64encode(buffered.getvalue()).decode("utf-8"), _VISION_MIME[format])
+    logger.info(f"Encoded image for vision: {image.size} -> {encoded.size}, {format} q{quality}, {len(buffered.getvalue())} bytes, {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    with _vision_memo_lock:
+        _vision_memo[key] = result
+        while len(_vision_memo) > VISION_MEMO_ENTRIES:
+            _vision_memo.popitem(last=False)
+    return result
+
+# SD 1.x latent(4채널) → RGB 선형 근사 계수. VAE decode 없이 진행 중인 이미지를 대략적으로 보여주기 위함
+LATENT_RGB_FACTORS = np.array([
+    [0.3512, 0.2297, 0.3227],
+    [0.3250, 0.4974, 0.2350],
+    [-0.2829, 0.1762, 0.2721],
+    [-0.2120, -0.2616, -0.7177],
+], dtype=np.float32)
+
+def latent_preview(latent, max_edge: int = 128, quality: int = 70) -> str:
+    '''
+    파이프라인 step 콜백의 latent 한 장(4 x h/8 x w/8, torch 텐서 또는 배열)을 저해상도 JPEG data URL로 변환합니다.
+    선형 근사이므로 색감과 구도만 확인하는 용도이며, latent 크기(원본의 1/8)를 긴 변이 max_edge가 되도록 조정합니다.
+    '''
+    array = latent.detach().float().cpu().numpy() if hasattr(latent, "detach") else np.asarray(latent, dtype=np.float32)
+    rgb = np.einsum("chw,cr->hwr", array[:LATENT_RGB_FACTORS.shape[0]], LATENT_RGB_FACTORS)
+    rgb = np.clip((rgb + 1.0) * 127.5, 0, 255).astype(np.uint8)
+    preview = Image.fromarray(rgb, mode="RGB")
+    scale = max_edge / max(preview.size)
+    if scale != 1:
+        preview = preview.resize((round(preview.width * scale), round(preview.height * scale)), Image.Resampling.BILINEAR)
+    buffered = io.BytesIO()
+    preview.save(buffered, format="JPEG", quality=quality)
+    return "data:image/jpeg;base64," + base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+
+_REMBG_SESSIONS: Dict[Tuple, Any] = {}
+_REMBG_LOCK = threading.Lock()
+
+def get_rembg_session(model_name: str = "u2net", providers: Optional[List[str]] = None, num_threads: Optional[int] = None):
+    '''
+    rembg 세션을 (모델, ONNX providers, 스레드 수) 단위로 한 번만 생성하여 재사용한다.
+
+    Args:
+        - model_name: rembg 모델 이름 (예: u2net, u2netp, isnet-general-use)
+        - providers: onnxruntime execution providers (예: ["CUDAExecutionProvider", "CPUExecutionProvider"])
+        - num_threads: onnxruntime 스레드 수 (rembg는 세션 생성 시 OMP_NUM_THREADS를 참조한다)
+
+    returns:
+        - rembg session
+    '''
+    key = (model_name, tuple(providers) if providers else None, num_threads)
+    with _REMBG_LOCK:
+        if key not in _REMBG_SESSIONS:
+            logger.info(f"Creating rembg session: model={model_name}, providers={providers}, threads={num_threads}")
+            # rembg는 onnxruntime, pymatting 등을 함께 불러오므로 세션이 처음 필요할 때 import 한다.
+            from rembg import new_session
+            if num_threads:
+                os.environ["OMP_NUM_THREADS"] = str(num_threads)
+            _REMBG_SESSIONS[key] = new_session(model_name, providers=providers)
+        return _REMBG_SESSIONS[key]
+
+def remove_background_array(image: np.ndarray, session=None) -> np.ndarray:
+    '''
+    ndarray(H, W, 3|4) 입력의 배경을 제거하여 RGBA ndarray로 반환한다. PNG 인코딩/디코딩을 거치지 않는다.
+    '''
+    from rembg import remove
+    return remove(image, session=session or get_rembg_session())
+
 @log_execution_time(label="Remove Background...")
-def remove_background(image: Union[str, Image.Image]) -> Tuple[Image.Image, Image.Image]:
+def remove_background(image: Union[str, Image.Image, np.ndarray], session=None) -> Tuple[Image.Image, Image.Image]:
     """
     이미지에서 배경을 제거하고 RGBA로 반환합니다.
     
     Args:
-        image (str or PIL.Image.Image): 파일 경로 또는 PIL 이미지 객체
+        image (str, PIL.Image.Image or np.ndarray): 파일 경로, PIL 이미지 객체 또는 RGB(A) 배열
+        session: get_rembg_session으로 만든 rembg 세션 (없으면 기본 세션 사용)
 
     Returns:
         Tuple[Image.Image, Image.Image]: (원본 RGBA 이미지, 배경제거된 RGBA 이미지)
     """
     try:
-        # 1. 이미지 로딩 및 바이트 변환
+        # 1. 이미지 로딩
         if isinstance(image, str):
             logger.info(f"🔍 Removing background from image path: {image}")
-            with open(image, "rb") as f:
-                input_data = f.read()
-            original_image = Image.open(io.BytesIO(input_data)).convert("RGBA")
-
+            original_image = Image.open(image).convert("RGBA")
         elif isinstance(image, Image.Image):
             logger.info("🔍 Removing background from PIL.Image object")
-            buffered = io.BytesIO()
-            image.convert("RGBA").save(buffered, format="PNG")
-            input_data = buffered.getvalue()
             original_image = image.convert("RGBA")
+        elif isinstance(image, np.ndarray):
+            logger.info("🔍 Removing background from ndarray")
+            original_image = Image.fromarray(image).convert("RGBA")
         else:
             raise TypeError(f"❌ Unsupported image type: {type(image)}")
 
-        # 2. rembg 처리
-        output_data = remove(input_data)
-        transparent_image = Image.open(io.BytesIO(output_data)).convert("RGBA")
+        # 2. rembg 처리 (ndarray in / ndarray out)
+        output_array = remove_background_array(np.asarray(original_image), session=session)
+        transparent_image = Image.fromarray(output_array).convert("RGBA")
 
         # 3. 사이즈 불일치 로그
         if original_image.size != transparent_image.size:
@@ -163,10 +312,10 @@ def remove_background(image: Union[str, Image.Image]) -> Tuple[Image.Image, Imag
 
 
 @log_execution_time(label="Resize to Ratio")
-def resize_to_ratio(image: Image.Image, target_size: Tuple[int, int]) -> Image.Image:
-    '''이미지의 크기를 resample 기법으로 변환한다.'''
+def resize_to_ratio(image: Image.Image, target_size: Tuple[int, int], keep_alpha: bool = False) -> Image.Image:
+    '''이미지의 크기를 resample 기법으로 변환한다. keep_alpha가 True이면 알파 채널을 유지한다.'''
     try:
-        image = image.convert("RGB")
+        image = image.convert("RGBA" if keep_alpha else "RGB")
         original_width, original_height = image.size
         target_width, target_height = target_size
 
@@ -180,14 +329,23 @@ def resize_to_ratio(image: Image.Image, target_size: Tuple[int, int]) -> Image.I
         raise
 
 @log_execution_time(label="Create Masking image...")
-def create_mask(product_image: Image.Image, threshold: int = 250, blur_radius: int = 5) -> Image.Image:
+def create_mask(
+    product_image: Image.Image,
+    threshold: int = 250,
+    blur_radius: float = 5,
+    margin: int = 0,
+    blur_mode: str = "gaussian",
+) -> Image.Image:
     '''
     이미지의 마스크를 생성한다. Gaussian Blur를 추가하여 이미지 경계에 대한 정보를 흐릿하게 만들었다.
+    알파 채널을 uint8 배열로 꺼내 OpenCV 연산(임계값, 모폴로지, 분리형 블러)으로 처리한다.
 
     Args:
         - product_image: 마스킹 작업이 필요한 제품 이미지
         - threshold: 마스킹 생성시 설정하는 임계치 (0~254)
-        - blur_radius: 경계 정보에 추가할 노이즈의 정도
+        - blur_radius: 경계 정보에 추가할 노이즈의 정도 (Gaussian sigma)
+        - margin: 마스크 확장(+)/축소(-) 픽셀 수
+        - blur_mode: "gaussian" (분리형 Gaussian) 또는 "box" (3회 box blur 근사)
     
     returns:
         - mask 이미지
@@ -199,18 +357,38 @@ def create_mask(product_image: Image.Image, threshold: int = 250, blur_radius: i
         product_image = product_image.convert("RGBA")
 
     try:
-        alpha = product_image.getchannel("A")
-        mask = Image.eval(alpha, lambda a: 255 if a > threshold else 0).convert("L")
-
-        if blur_radius > 0:
-            logger.info(f"Applying GaussianBlur with radius {blur_radius}")
-            mask = mask.filter(ImageFilter.GaussianBlur(radius=blur_radius))
-
-        return mask
+        alpha = np.ascontiguousarray(np.asarray(product_image.getchannel("A"), dtype=np.uint8))
+        mask = create_mask_array(alpha, threshold, blur_radius, margin, blur_mode)
+        return Image.fromarray(mask, mode="L")
     except Exception as e:
         logger.error(f"Failed to create mask: {e}")
         raise
 
+def create_mask_array(
+    alpha: np.ndarray,
+    threshold: int = 250,
+    blur_radius: float = 5,
+    margin: int = 0,
+    blur_mode: str = "gaussian",
+) -> np.ndarray:
+    '''알파 채널(uint8, HxW) 배열로부터 마스크 배열(uint8, HxW)을 만든다. create_mask의 배열 버전.'''
+    _, mask = cv2.threshold(alpha, threshold, 255, cv2.THRESH_BINARY)
+
+    if margin:
+        size = 2 * abs(int(margin)) + 1
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (size, size))
+        mask = cv2.dilate(mask, kernel) if margin > 0 else cv2.erode(mask, kernel)
+
+    if blur_radius > 0:
+        if blur_mode == "box":
+            # 3회 box blur는 Gaussian에 근사하며, 반경이 커도 비용이 일정하다.
+            box = max(1, int(round(np.sqrt(4 * blur_radius ** 2 + 1))))
+            for _ in range(3):
+                mask = cv2.blur(mask, (box, box))
+        else:
+            mask = cv2.GaussianBlur(mask, (0, 0), sigmaX=blur_radius, sigmaY=blur_radius)
+    return mask
+
 
 @log_execution_time(label="Overlaying product image...")
 def overlay_product(background: Image.Image, product: Image.Image, position: Tuple[int, int] = (120, 360)):
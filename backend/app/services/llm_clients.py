@@ -0,0 +1,121 @@
+# backend/app/services/llm_clients.py
+
+import logging
+from typing import Optional
+from fastapi import HTTPException, status
+from pydantic_settings import BaseSettings
+
+from app.services.text_modules.text_models import OpenAIClient
+from app.services.llm_governor import governor
+from utils.response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+class OpenAIClientSettings(BaseSettings):
+    """프로세스 전체에서 공유하는 AsyncOpenAI 클라이언트의 연결 풀/타임아웃 설정 (환경 변수 OPENAI_CLIENT_* 로 변경 가능)"""
+    base_url: Optional[str] = None          # OpenAI 호환 서버 주소 (예: 로컬 stand-in http://localhost:8100/v1). 텍스트/광고 기획 클라이언트 모두 사용
+    max_connections: int = 64               # 동시에 열어둘 수 있는 최대 연결 수
+    max_keepalive_connections: int = 16     # 요청 사이에 유지할 유휴 연결 수
+    keepalive_expiry: float = 30.0          # 유휴 연결 유지 시간 (초)
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+    write_timeout: float = 10.0
+    pool_timeout: float = 5.0               # 풀에서 연결을 기다리는 최대 시간
+    max_retries: int = 2                    # LLM governor가 켜져 있으면 재시도는 governor가 담당하므로 0으로 고정
+
+    class Config:
+        env_file = ".env"
+        extra = "allow"
+        env_prefix = "OPENAI_CLIENT_"
+
+class ResponseCacheSettings(BaseSettings):
+    """OpenAIClient / GPTClient가 함께 쓰는 응답 캐시 설정 (환경 변수 LLM_CACHE_* 로 변경 가능)"""
+    enabled: bool = True
+    max_memory_mb: int = 64
+    max_entries: int = 5000
+    ttl_sec: float = 24 * 3600
+    sqlite_path: str = ""           # 지정하면 uvicorn 워커 프로세스끼리 공유하는 SQLite 계층을 사용 (예: ./database/llm_cache.db)
+    max_disk_mb: int = 512
+
+    class Config:
+        env_file = ".env"
+        extra = "allow"
+        env_prefix = "LLM_CACHE_"
+
+settings = OpenAIClientSettings()
+cache_settings = ResponseCacheSettings()
+
+def build_response_cache(config: ResponseCacheSettings = cache_settings) -> ResponseCache:
+    if not config.enabled:
+        return ResponseCache(max_bytes=0, max_entries=0)  # 아무것도 저장하지 않는 캐시
+    return ResponseCache(
+        max_bytes=config.max_memory_mb * 1024 * 1024,
+        max_entries=config.max_entries,
+        ttl=config.ttl_sec,
+        sqlite_path=config.sqlite_path or None,
+        max_disk_bytes=config.max_disk_mb * 1024 * 1024,
+    )
+
+response_cache = build_response_cache()
+
+_openai_client: Optional[OpenAIClient] = None
+
+def create_async_openai(api_key: str, client_settings: OpenAIClientSettings = settings):
+    """연결 풀 한도, keep-alive, 타임아웃을 적용한 AsyncOpenAI 인스턴스를 생성합니다."""
+    import httpx
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=client_settings.max_connections,
+            max_keepalive_connections=client_settings.max_keepalive_connections,
+            keepalive_expiry=client_settings.keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            connect=client_settings.connect_timeout,
+            read=client_settings.read_timeout,
+            write=client_settings.write_timeout,
+            pool=client_settings.pool_timeout,
+        ),
+    )
+    max_retries = 0 if governor is not None else client_settings.max_retries
+    return AsyncOpenAI(api_key=api_key, base_url=client_settings.base_url, http_client=http_client, max_retries=max_retries)
+
+def startup():
+    """lifespan 시작 시 한 번 호출합니다. API 키가 없으면 텍스트 생성 요청만 503으로 응답하고 서버는 계속 뜹니다."""
+    global _openai_client
+    try:
+        _openai_client = OpenAIClient(
+            client=create_async_openai(OpenAIClient.load_api_key()),
+            cache=response_cache,
+            governor=governor,
+        )
+        logger.info(f"공유 OpenAI 클라이언트 생성 완료 (base_url={settings.base_url or 'default'}, max_connections={settings.max_connections}, keepalive={settings.max_keepalive_connections})")
+    except Exception as e:
+        _openai_client = None
+        logger.error(f"공유 OpenAI 클라이언트 생성 실패: {e}")
+
+async def shutdown():
+    """lifespan 종료 시 호출합니다. 열린 연결을 모두 닫습니다."""
+    global _openai_client
+    if _openai_client is None:
+        return
+    try:
+        await _openai_client.close()
+        logger.info("공유 OpenAI 클라이언트 종료 완료")
+    except Exception as e:
+        logger.error(f"공유 OpenAI 클라이언트 종료 중 오류 발생: {e}")
+    finally:
+        _openai_client = None
+
+def cache_stats() -> dict:
+    return {"enabled": cache_settings.enabled, **response_cache.stats()}
+
+def governor_stats() -> dict:
+    return governor.stats() if governor is not None else {"enabled": False}
+
+def get_openai_client() -> OpenAIClient:
+    """라우터 의존성: lifespan에서 생성한 공유 OpenAIClient를 반환합니다."""
+    if _openai_client is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="OpenAI 클라이언트가 초기화되지 않았습니다. OPENAI_API_KEY 설정을 확인해주세요.")
+    return _openai_client
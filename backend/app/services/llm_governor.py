@@ -0,0 +1,360 @@
+# backend/app/services/llm_governor.py
+
+import asyncio, logging, random, threading, time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+from pydantic_settings import BaseSettings
+
+from utils.llm_tokens import estimate_request_tokens
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+class LLMGovernorSettings(BaseSettings):
+    """모든 LLM 호출이 거치는 동시성/속도 제한 설정 (환경 변수 LLM_GOVERNOR_* 로 변경 가능)"""
+    enabled: bool = True
+    max_concurrency: int = 16                   # 프로세스 전체 동시 요청 수
+    acquire_timeout_sec: float = 30.0           # 슬롯/토큰을 기다리는 최대 시간 (넘으면 GovernorTimeoutError)
+    burst_sec: float = 10.0                     # 토큰 버킷 용량 = 분당 한도 * burst_sec / 60
+    default_rpm: float = 500
+    default_tpm: float = 200_000
+    model_limits: Dict[str, Dict[str, float]] = {
+        "gpt-4.1-mini": {"rpm": 500, "tpm": 200_000},
+        "gpt-4.1-nano": {"rpm": 500, "tpm": 200_000},
+    }
+    default_output_tokens: int = 512            # max_tokens가 없을 때 출력 토큰 추정값
+    max_retries: int = 4
+    backoff_base_sec: float = 0.5
+    backoff_max_sec: float = 20.0
+    hedge_enabled: bool = False                 # 호출이 모델별 지연 p{hedge_percentile}를 넘으면 같은 요청을 한 번 더 보냄 (async 호출만)
+    hedge_percentile: float = 95
+    hedge_min_samples: int = 20
+    latency_window: int = 200
+
+    class Config:
+        env_file = ".env"
+        extra = "allow"
+        env_prefix = "LLM_GOVERNOR_"
+
+class GovernorTimeoutError(RuntimeError):
+    """acquire_timeout_sec 안에 실행 슬롯이나 토큰을 얻지 못했을 때 발생합니다."""
+
+class TokenBucket:
+    """
+    초당 rate만큼 채워지는 토큰 버킷. reserve는 토큰을 미리 차감하고 기다려야 하는 시간을 반환합니다.
+    (음수 잔량을 허용하므로 동기/비동기 호출 모두 반환된 시간만큼 sleep 하면 됩니다.)
+    """
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate = rate_per_sec
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate) if self.rate > 0 else 0.0
+
+    def refund(self, amount: float):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + min(amount, self.capacity))
+
+class _LatencyWindow:
+    def __init__(self, size: int):
+        self._values: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, value: float):
+        with self._lock:
+            self._values.append(value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._values:
+                return None
+            ordered = sorted(self._values)
+        return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+    def __len__(self):
+        return len(self._values)
+
+class LLMGovernor:
+    """
+    OpenAIClient(async)와 GPTClient(sync)가 함께 쓰는 LLM 호출 관리자.
+
+    - 모델별 요청 수(rpm) / 토큰 수(tpm) 토큰 버킷으로 호출 속도를 제한합니다.
+    - 프로세스 전체 동시 요청 수를 max_concurrency로 제한합니다. (스레드/이벤트 루프 공용)
+    - 429/5xx/연결 오류는 Retry-After를 우선하여 지터가 있는 지수 백오프로 재시도합니다.
+    - hedge_enabled이면 모델별 지연 p95를 넘은 async 호출에 대해 같은 요청을 한 번 더 보내고 먼저 끝난 응답을 사용합니다.
+    """
+    def __init__(self, config: LLMGovernorSettings):
+        self.cfg = config
+        self._slots = threading.BoundedSemaphore(config.max_concurrency)
+        self._buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        self._latency: Dict[str, _LatencyWindow] = {}
+        self._queue_wait = _LatencyWindow(config.latency_window)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+
+    def estimate_tokens(self, messages: List[Dict[str, Any]], max_tokens: Optional[int] = None, n: int = 1) -> int:
+        """tpm 버킷에서 차감할 요청 토큰 추정치. max_tokens가 없으면 설정의 default_output_tokens를 출력 토큰으로 사용합니다."""
+        return estimate_request_tokens(messages, max_tokens, n, default_output_tokens=self.cfg.default_output_tokens)
+
+    # 실행 슬롯 / 버킷
+
+    def _model_buckets(self, model: str) -> Dict[str, TokenBucket]:
+        with self._lock:
+            if model not in self._buckets:
+                limits = self.cfg.model_limits.get(model, {})
+                rpm = limits.get("rpm", self.cfg.default_rpm)
+                tpm = limits.get("tpm", self.cfg.default_tpm)
+                self._buckets[model] = {
+                    "requests": TokenBucket(rpm / 60, rpm * self.cfg.burst_sec / 60),
+                    "tokens": TokenBucket(tpm / 60, tpm * self.cfg.burst_sec / 60),
+                }
+                self._latency[model] = _LatencyWindow(self.cfg.latency_window)
+            return self._buckets[model]
+
+    def _reserve(self, model: str, tokens: int) -> float:
+        buckets = self._model_buckets(model)
+        return max(buckets["requests"].reserve(1), buckets["tokens"].reserve(tokens))
+
+    def _refund(self, model: str, tokens: int):
+        buckets = self._model_buckets(model)
+        buckets["requests"].refund(1)
+        buckets["tokens"].refund(tokens)
+
+    def _enter(self, waited: float):
+        self._queue_wait.add(waited)
+        with self._lock:
+            self._in_flight += 1
+            self.calls += 1
+
+    def _exit(self, model: str, elapsed: Optional[float]):
+        with self._lock:
+            self._in_flight -= 1
+        if elapsed is not None:
+            self._latency[model].add(elapsed)
+        self._slots.release()
+
+    def _timeout(self, model: str, tokens: int):
+        self._refund(model, tokens)
+        with self._lock:
+            self.timeouts += 1
+        raise GovernorTimeoutError(f"LLM 호출 대기 시간 초과 (model={model}, timeout={self.cfg.acquire_timeout_sec}s)")
+
+    async def _acquire_async(self, model: str, tokens: int):
+        start = time.monotonic()
+        wait = self._reserve(model, tokens)
+        if wait > self.cfg.acquire_timeout_sec:
+            self._timeout(model, tokens)
+        try:
+            if wait:
+                await asyncio.sleep(wait)
+            delay = 0.005
+            while not self._slots.acquire(blocking=False):  # 스레드와 공유하는 세마포어이므로 이벤트 루프를 막지 않도록 폴링
+                if time.monotonic() - start > self.cfg.acquire_timeout_sec:
+                    self._timeout(model, tokens)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.05)
+        except asyncio.CancelledError:  # 대기 중 취소되면 예약한 버킷을 돌려준다
+            self._refund(model, tokens)
+            raise
+        self._enter(time.monotonic() - start)
+
+    def _acquire_sync(self, model: str, tokens: int):
+        start = time.monotonic()
+        wait = self._reserve(model, tokens)
+        if wait > self.cfg.acquire_timeout_sec:
+            self._timeout(model, tokens)
+        if wait:
+            time.sleep(wait)
+        if not self._slots.acquire(timeout=max(0.0, self.cfg.acquire_timeout_sec - (time.monotonic() - start))):
+            self._timeout(model, tokens)
+        self._enter(time.monotonic() - start)
+
+    # 재시도
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        status_code = getattr(error, "status_code", None)
+        if status_code is not None:
+            return status_code in RETRYABLE_STATUS
+        return type(error).__name__ in ("APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout")
+
+    def _backoff(self, error: Exception, attempt: int) -> float:
+        """Retry-After(-ms) 헤더가 있으면 그 값 이상, 없으면 full jitter 지수 백오프."""
+        retry_after = None
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers:
+            try:
+                if headers.get("retry-after-ms"):
+                    retry_after = float(headers["retry-after-ms"]) / 1000
+                elif headers.get("retry-after"):
+                    retry_after = float(headers["retry-after"])
+            except ValueError:
+                retry_after = None
+        jitter = random.uniform(0, min(self.cfg.backoff_max_sec, self.cfg.backoff_base_sec * 2 ** attempt))
+        return min(self.cfg.backoff_max_sec, max(retry_after or 0.0, jitter))
+
+    def _should_retry(self, error: Exception, attempt: int) -> Optional[float]:
+        if attempt >= self.cfg.max_retries or not self._is_retryable(error):
+            with self._lock:
+                self.failures += 1
+            return None
+        with self._lock:
+            self.retries += 1
+        delay = self._backoff(error, attempt)
+        logger.warning(f"LLM 호출 재시도 {attempt + 1}/{self.cfg.max_retries} ({delay:.2f}초 후): {error}")
+        return delay
+
+    # 호출
+    async def _attempt(self, model: str, func: Callable[[], Awaitable[Any]], tokens: int) -> Any:
+        await self._acquire_async(model, tokens)
+        start = time.monotonic()
+        elapsed = None
+        try:
+            result = await func()
+            elapsed = time.monotonic() - start
+            return result
+        finally:
+            self._exit(model, elapsed)
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        window = self._latency.get(model)
+        if not self.cfg.hedge_enabled or window is None or len(window) < self.cfg.hedge_min_samples:
+            return None
+        return window.percentile(self.cfg.hedge_percentile)
+
+    async def _attempt_hedged(self, model: str, func: Callable[[], Awaitable[Any]], tokens: int) -> Any:
+        delay = self._hedge_delay(model)
+        if delay is None:
+            return await self._attempt(model, func, tokens)
+
+        tasks = []  # 호출자가 취소되어도 남은 시도가 동시성 슬롯을 잡고 있지 않도록 finally에서 정리
+        try:
+            primary = asyncio.ensure_future(self._attempt(model, func, tokens))
+            tasks.append(primary)
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+
+            with self._lock:
+                self.hedges += 1
+            backup = asyncio.ensure_future(self._attempt(model, func, tokens))
+            tasks.append(backup)
+            pending = {primary, backup}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        return task.result()
+            raise primary.exception() or backup.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def call(self, model: str, func: Callable[[], Awaitable[Any]], tokens: int, hedge: bool = True) -> Any:
+        """async 호출: func()를 속도/동시성 제한 안에서 실행하고, 실패하면 재시도합니다."""
+        attempt = 0
+        while True:
+            try:
+                if hedge:
+                    return await self._attempt_hedged(model, func, tokens)
+                return await self._attempt(model, func, tokens)
+            except GovernorTimeoutError:
+                raise
+            except Exception as e:
+                delay = self._should_retry(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    def call_sync(self, model: str, func: Callable[[], Any], tokens: int) -> Any:
+        """동기 호출 (작업 워커 스레드의 GPTClient용). hedge는 지원하지 않습니다."""
+        attempt = 0
+        while True:
+            self._acquire_sync(model, tokens)
+            start = time.monotonic()
+            elapsed = None
+            try:
+                result = func()
+                elapsed = time.monotonic() - start
+                return result
+            except Exception as e:
+                delay = self._should_retry(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+            finally:
+                self._exit(model, elapsed)
+            time.sleep(delay)
+
+    @asynccontextmanager
+    async def stream(self, model: str, func: Callable[[], Awaitable[Any]], tokens: int):
+        """
+        스트리밍 호출: 스트림을 여는 func()까지만 재시도하고, 스트림을 다 읽을 때까지 실행 슬롯을 유지합니다.
+            async with governor.stream(model, open_stream, tokens) as stream: ...
+        """
+        attempt = 0
+        while True:
+            await self._acquire_async(model, tokens)
+            start = time.monotonic()
+            try:
+                stream = await func()
+                break
+            except Exception as e:
+                self._exit(model, None)
+                delay = self._should_retry(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+
+        elapsed = None
+        try:
+            yield stream
+            elapsed = time.monotonic() - start
+        finally:
+            self._exit(model, elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "in_flight": self._in_flight,
+                "max_concurrency": self.cfg.max_concurrency,
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "timeouts": self.timeouts,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
+            models = list(self._latency.items())
+        stats["queue_wait_p50"] = self._queue_wait.percentile(50)
+        stats["queue_wait_p95"] = self._queue_wait.percentile(95)
+        stats["latency"] = {
+            model: {"p50": window.percentile(50), "p95": window.percentile(95), "samples": len(window)}
+            for model, window in models
+        }
+        return stats
+
+settings = LLMGovernorSettings()
+governor: Optional[LLMGovernor] = LLMGovernor(settings) if settings.enabled else None
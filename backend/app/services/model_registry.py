@@ -0,0 +1,86 @@
+# backend/app/services/model_registry.py
+
+import logging, threading, time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+class LazyComponent:
+    '''
+    처음 사용할 때 한 번만 생성되는 무거운 구성요소(모델, 세션 등)의 holder.
+    여러 스레드에서 동시에 get()을 호출해도 factory는 한 번만 실행됩니다.
+    '''
+    def __init__(self, name: str, factory: Callable[[], Any], cleanup: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.factory = factory
+        self.cleanup = cleanup
+        self._value: Any = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> Any:
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                logger.info(f"{self.name} 로드 시작")
+                start = time.time()
+                try:
+                    self._value = self.factory()
+                except Exception as e:
+                    self.error = str(e)
+                    logger.error(f"{self.name} 로드 실패: {e}")
+                    raise
+                self.load_seconds = time.time() - start
+                self.error = None
+                self._loaded = True
+                logger.info(f"{self.name} 로드 완료 ({self.load_seconds:.2f}초)")
+        return self._value
+
+    def unload(self):
+        '''로드된 경우에만 cleanup을 호출하고 holder를 비웁니다.'''
+        with self._lock:
+            if self._loaded and self.cleanup:
+                self.cleanup(self._value)
+            self._value = None
+            self._loaded = False
+
+    def status(self) -> Dict[str, Any]:
+        return {"loaded": self._loaded, "load_seconds": self.load_seconds, "error": self.error}
+
+_components: Dict[str, LazyComponent] = {}
+
+def register(name: str, factory: Callable[[], Any], cleanup: Optional[Callable[[Any], None]] = None) -> LazyComponent:
+    '''구성요소를 등록하고 holder를 반환합니다. 이 시점에는 아무것도 로드하지 않습니다.'''
+    component = LazyComponent(name, factory, cleanup)
+    _components[name] = component
+    return component
+
+def status() -> Dict[str, Dict[str, Any]]:
+    '''등록된 구성요소별 로드 상태'''
+    return {name: component.status() for name, component in _components.items()}
+
+def warm_up(names: Optional[Iterable[str]] = None):
+    '''지정한(없으면 전체) 구성요소를 미리 로드합니다. 실패해도 다음 구성요소는 계속 로드합니다.'''
+    for name in (names if names is not None else list(_components)):
+        component = _components.get(name)
+        if component is None:
+            logger.warning(f"등록되지 않은 구성요소입니다: {name}")
+            continue
+        try:
+            component.get()
+        except Exception:
+            pass
+
+def unload_all():
+    for component in _components.values():
+        try:
+            component.unload()
+        except Exception as e:
+            logger.error(f"{component.name} 정리 중 오류 발생: {e}")
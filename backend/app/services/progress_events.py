@@ -0,0 +1,140 @@
+# backend/app/services/progress_events.py
+
+import asyncio, itertools, logging, threading, time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 배경 생성 진행 이벤트 (세션 단위)
+#   queued / running                 작업 큐 상태
+#   cutout_ready                     /preprocess 배경 제거 완료
+#   canvas_ready                     제품 합성 캔버스와 마스크 준비
+#   plan_ready / prompt_ready        GPT 광고 기획, SD 프롬프트 완료
+#   diffusion_step                   파이프라인 step k/N (설정에 따라 저해상도 latent 미리보기 포함)
+#   scoring                          후보 이미지 평가
+#   saved                            결과 저장 (image_url)
+#   done / failed                    작업 종료
+
+@dataclass
+class _Channel:
+    '''세션 하나의 이벤트 순번, 최근 이벤트 기록, 구독자 목록'''
+    seq: "itertools.count" = field(default_factory=lambda: itertools.count(1))
+    history: Deque[Dict[str, Any]] = field(default_factory=deque)
+    subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = field(default_factory=list)
+    touched_at: float = field(default_factory=time.monotonic)
+
+class ProgressBroker:
+    '''
+    세션별 진행 이벤트 발행/구독.
+    publish는 작업 워커, 광고 기획 루프, 파이프라인 step 콜백 등 어느 스레드에서나 호출할 수 있으며,
+    구독자의 이벤트 루프로 call_soon_threadsafe를 통해 전달합니다.
+
+    - 이벤트마다 세션 내 순번(seq)을 붙이며, keep=True인 이벤트는 최근 history_size개를 보관하여
+      늦게 연결하거나 다시 연결한 구독자에게 seq 이후의 이벤트를 먼저 보내줍니다. (SSE Last-Event-ID)
+    - diffusion_step처럼 자주 발생하는 이벤트는 keep=False로 보관하지 않습니다.
+    - 구독자 큐가 가득 차면 가장 오래된 이벤트를 버립니다. (느린 클라이언트가 워커를 막지 않도록)
+    - 구독자가 없고 idle_ttl 동안 이벤트가 없는 세션은 정리합니다.
+    '''
+    def __init__(self, history_size: int = 64, queue_size: int = 256, idle_ttl: float = 600):
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self.idle_ttl = idle_ttl
+        self._channels: Dict[str, _Channel] = {}
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def publish(self, session_id: Optional[str], stage: str, keep: bool = True, **data) -> Optional[Dict[str, Any]]:
+        '''이벤트를 발행합니다. session_id가 없으면 무시합니다.'''
+        if not session_id:
+            return None
+        with self._lock:
+            channel = self._channels.get(session_id)
+            if channel is None:
+                self._prune()
+                channel = self._channels[session_id] = _Channel()
+            event = {"seq": next(channel.seq), "stage": stage, "time": time.time(), **data}
+            channel.touched_at = time.monotonic()
+            if keep:
+                channel.history.append(event)
+                while len(channel.history) > self.history_size:
+                    channel.history.popleft()
+            subscribers = list(channel.subscribers)
+
+        for loop, event_queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, event_queue, event)
+            except RuntimeError:  # 구독자의 이벤트 루프가 이미 닫힌 경우
+                pass
+        return event
+
+    def _offer(self, event_queue: asyncio.Queue, event: Dict[str, Any]):
+        '''구독자 이벤트 루프에서 실행됩니다.'''
+        if event_queue.full():
+            event_queue.get_nowait()
+            self.dropped += 1
+        event_queue.put_nowait(event)
+
+    async def subscribe(self, session_id: str, after: int = 0, heartbeat: Optional[float] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        '''
+        세션의 이벤트를 도착 순서대로 돌려주는 async generator.
+        seq가 after보다 큰 보관 이벤트를 먼저 보낸 뒤 새 이벤트를 기다립니다. 종료(연결 끊김)되면 구독을 해제합니다.
+        heartbeat초 동안 이벤트가 없으면 None을 돌려줍니다. (연결 유지용)
+        '''
+        event_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        subscriber = (asyncio.get_running_loop(), event_queue)
+        with self._lock:
+            channel = self._channels.get(session_id)
+            if channel is None:  # 알 수 없는 세션 구독도 채널을 만들므로 publish와 같이 오래된 채널을 정리
+                self._prune()
+                channel = self._channels[session_id] = _Channel()
+            channel.subscribers.append(subscriber)
+            backlog = [event for event in channel.history if event["seq"] > after]
+        try:
+            last_seq = after
+            for event in backlog:
+                last_seq = event["seq"]
+                yield event
+            while True:
+                try:
+                    event = await asyncio.wait_for(event_queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event["seq"] <= last_seq:  # 구독 등록과 history 복사 사이에 발행된 이벤트
+                    continue
+                last_seq = event["seq"]
+                yield event
+        finally:
+            with self._lock:
+                channel.subscribers.remove(subscriber)
+                channel.touched_at = time.monotonic()
+
+    def _prune(self):
+        '''구독자가 없고 오래된 세션 채널을 정리합니다. (_lock 안에서 호출)'''
+        now = time.monotonic()
+        expired = [
+            session_id for session_id, channel in self._channels.items()
+            if not channel.subscribers and now - channel.touched_at > self.idle_ttl
+        ]
+        for session_id in expired:
+            del self._channels[session_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._channels),
+                "subscribers": sum(len(channel.subscribers) for channel in self._channels.values()),
+                "dropped": self.dropped,
+            }
+
+broker = ProgressBroker()
+
+def publish(session_id: Optional[str], stage: str, keep: bool = True, **data) -> Optional[Dict[str, Any]]:
+    return broker.publish(session_id, stage, keep=keep, **data)
+
+def publish_many(session_ids: List[str], stage: str, keep: bool = True, **data):
+    '''배치로 묶인 여러 세션에 같은 이벤트를 발행합니다.'''
+    for session_id in session_ids:
+        broker.publish(session_id, stage, keep=keep, **data)
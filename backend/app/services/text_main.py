@@ -1,4 +1,6 @@
-import asyncio
+import asyncio, os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))  # backend/utils (응답 캐시)
+
 from text_modules.text_models import OpenAIClient
 from text_modules.text_prompts import PROMPT_CONFIGS
 
@@ -23,7 +25,7 @@ async def main():
             ["instagram", "blog", "poster"]
         )
         
-        system_prompt, few_shot_examples = PROMPT_CONFIGS[ad_type]
+        system_prompt, few_shot_examples, strategy = PROMPT_CONFIGS[ad_type]
         
         model_type = select_option(
             "모델 유형 선택 (mini / nano): ", 
@@ -37,7 +39,7 @@ async def main():
         
         # 광고 생성 실행
         await openai_client.run_generation(
-            model_type, user_prompt, system_prompt, few_shot_examples
+            model_type, user_prompt, system_prompt, few_shot_examples, strategy
         )
         
     except Exception as e:
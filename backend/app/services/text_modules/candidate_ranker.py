@@ -0,0 +1,115 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+# 광고 문구 후보 후처리: 거의 같은 후보를 MinHash로 묶고, 형식 규칙 점수로 정렬하여 상위 k개만 남깁니다.
+# 후보는 OpenAIClient의 결과 형식 (temperature, content, elapsed) 튜플을 그대로 사용합니다.
+
+Candidate = Tuple[float, str, float]
+
+@dataclass(frozen=True)
+class FormatRule:
+    """text_prompts의 광고 유형별 출력 조건을 점수화하기 위한 규칙"""
+    prefix: Optional[str] = None            # 최종 출력 형식의 시작 기호 (예: 📢, 🎯)
+    sentences: Tuple[int, int] = (1, 99)    # 권장 문장 수 범위
+    length: Tuple[int, int] = (1, 10_000)   # 권장 글자 수 범위
+    hashtags: Tuple[int, int] = (0, 0)      # 권장 해시태그 수 범위
+    allow_emoji: bool = True
+    paragraphs: Tuple[int, int] = (1, 99)
+
+FORMAT_RULES: Dict[str, FormatRule] = {
+    "instagram": FormatRule(prefix="📢", sentences=(3, 5), length=(80, 500), hashtags=(1, 5)),
+    "blog": FormatRule(sentences=(5, 40), length=(300, 3000), paragraphs=(2, 3)),
+    "poster": FormatRule(prefix="🎯", sentences=(1, 2), length=(5, 45), allow_emoji=False),
+}
+
+SCORE_WEIGHTS = {"prefix": 0.2, "sentences": 0.25, "length": 0.25, "hashtags": 0.15, "emoji": 0.1, "paragraphs": 0.05}
+
+_HASHTAG = re.compile(r"#[^\s#]+")
+_SENTENCE_END = re.compile(r"[.!?。…]+|[\n]+")
+_EMOJI = re.compile("[\U0001F300-\U0001FAFF☀-➿]")
+_NORMALIZE = re.compile(r"[\s\W_]+", re.UNICODE)
+
+# ==================================== MinHash ====================================
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+def _permutations(num_perm: int, seed: int = 1) -> List[Tuple[int, int]]:
+    perms = []
+    for i in range(num_perm):
+        digest = hashlib.blake2b(f"{seed}:{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "little") % _MERSENNE_PRIME or 1
+        b = int.from_bytes(digest[8:], "little") % _MERSENNE_PRIME
+        perms.append((a, b))
+    return perms
+
+_PERMS = _permutations(64)
+
+def shingles(text: str, k: int = 3) -> Set[str]:
+    """공백과 문장부호를 제거한 글자 k-gram 집합 (한국어는 단어보다 글자 단위가 안정적)"""
+    normalized = _NORMALIZE.sub("", text.lower())
+    if len(normalized) <= k:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + k] for i in range(len(normalized) - k + 1)}
+
+def minhash(shingle_set: Set[str], perms: Sequence[Tuple[int, int]] = _PERMS) -> List[int]:
+    if not shingle_set:
+        return [_MAX_HASH] * len(perms)
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in shingle_set]
+    return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in perms]
+
+def estimated_jaccard(sig_a: List[int], sig_b: List[int]) -> float:
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+# ==================================== 점수 ====================================
+def _in_range(value: int, bounds: Tuple[int, int]) -> float:
+    """범위 안이면 1, 벗어난 정도에 따라 0까지 감소"""
+    low, high = bounds
+    if low <= value <= high:
+        return 1.0
+    distance = low - value if value < low else value - high
+    return max(0.0, 1.0 - distance / max(high - low + 1, low, 1))
+
+def score_candidate(content: str, ad_type: str) -> float:
+    """형식 준수(시작 기호, 이모지), 문장/단락 수, 해시태그 수, 길이로 0~1 점수를 계산합니다."""
+    rule = FORMAT_RULES.get(ad_type, FormatRule())
+    text = content.strip()
+    if not text:
+        return 0.0
+    hashtags = _HASHTAG.findall(text)
+    body = _HASHTAG.sub("", text)
+    sentences = [s for s in _SENTENCE_END.split(body) if len(s.strip()) > 1]
+    paragraphs = [p for p in re.split(r"\n\s*\n", body) if p.strip()]
+    length = len(body.replace(rule.prefix or "", "").strip())
+
+    scores = {
+        "prefix": 1.0 if rule.prefix is None or text.startswith(rule.prefix) else 0.0,
+        "sentences": _in_range(len(sentences), rule.sentences),
+        "length": _in_range(length, rule.length),
+        "hashtags": _in_range(len(hashtags), rule.hashtags),
+        "emoji": 1.0 if rule.allow_emoji or not _EMOJI.search(body.replace(rule.prefix or "", "")) else 0.0,
+        "paragraphs": _in_range(len(paragraphs), rule.paragraphs),
+    }
+    return sum(SCORE_WEIGHTS[name] * value for name, value in scores.items())
+
+# ==================================== 후처리 ====================================
+def rank_candidates(candidates: List[Candidate], ad_type: str, top_k: Optional[int] = None, dedup_threshold: float = 0.7) -> List[Candidate]:
+    """
+    후보를 점수 내림차순으로 정렬하고, 이미 선택된 후보와 추정 Jaccard 유사도가 dedup_threshold 이상이면 버린 뒤 상위 top_k개를 반환합니다.
+    빈 문구는 제외합니다. 결과의 첫 번째 후보가 기본 선택값입니다.
+    """
+    scored = [(score_candidate(c[1], ad_type), i, c) for i, c in enumerate(candidates) if c[1] and c[1].strip()]
+    scored.sort(key=lambda item: (-item[0], item[1]))  # 점수가 같으면 원래 순서(낮은 온도) 우선
+
+    kept: List[Candidate] = []
+    signatures: List[List[int]] = []
+    for _, _, candidate in scored:
+        signature = minhash(shingles(candidate[1]))
+        if any(estimated_jaccard(signature, other) >= dedup_threshold for other in signatures):
+            continue
+        kept.append(candidate)
+        signatures.append(signature)
+        if top_k and len(kept) >= top_k:
+            break
+    return kept
@@ -0,0 +1,205 @@
+import contextvars
+import logging
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+from pydantic_settings import BaseSettings
+
+from .text_prompts import PROMPT_CONFIGS, PromptConfig
+
+logger = logging.getLogger(__name__)
+
+class PromptBudgetSettings(BaseSettings):
+    """광고 유형별 프롬프트 토큰 예산 (환경 변수 PROMPT_BUDGET_* 로 변경 가능)"""
+    tokenizer_model: str = "gpt-4.1-mini"
+    few_shot_max_tokens: Optional[int] = None           # 모든 광고 유형에 적용할 few-shot 토큰 상한 (None이면 자르지 않음)
+    few_shot_max_tokens_by_type: Dict[str, int] = {}    # 광고 유형별 상한 (예: {"blog": 1500})
+
+    class Config:
+        env_file = ".env"
+        extra = "allow"
+        env_prefix = "PROMPT_BUDGET_"
+
+settings = PromptBudgetSettings()
+
+# ==================================== 토큰 수 계산 ====================================
+_encoders: Dict[str, Any] = {}
+
+def _encoder(model: str):
+    """모델의 tiktoken 인코더를 반환합니다. tiktoken을 불러올 수 없으면 None (estimate_tokens로 추정)"""
+    if model not in _encoders:
+        try:
+            import tiktoken
+            try:
+                _encoders[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encoders[model] = tiktoken.get_encoding("o200k_base")
+        except ImportError:
+            logger.warning("tiktoken이 설치되어 있지 않아 토큰 수를 문자 종류별로 추정합니다. (requirements.txt 확인)")
+            _encoders[model] = None
+    return _encoders[model]
+
+_WIDE_CHARS = re.compile(r"[\u1100-\u11ff\u3130-\u318f\uac00-\ud7a3\u3040-\u30ff\u4e00-\u9fff]")
+
+def estimate_tokens(text: str) -> int:
+    """
+    tiktoken이 없을 때의 추정치. 한글/한자/가나는 글자당 약 1토큰, 그 밖의 비 ASCII 문자(이모지 등)는 글자당 1토큰,
+    ASCII(영문, 숫자, 공백, 문장부호)는 4글자당 1토큰으로 셉니다.
+    """
+    wide = len(_WIDE_CHARS.findall(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    other = len(text) - wide - ascii_chars
+    return wide + other + (ascii_chars + 3) // 4
+
+def is_estimated(model: str = settings.tokenizer_model) -> bool:
+    return _encoder(model) is None
+
+def count_tokens(text: str, model: str = settings.tokenizer_model) -> int:
+    encoder = _encoder(model)
+    if encoder is None:
+        return estimate_tokens(text)
+    return len(encoder.encode(text))
+
+def count_message_tokens(messages: List[Dict[str, Any]], model: str = settings.tokenizer_model) -> int:
+    """chat 메시지 목록의 입력 토큰 수 (메시지당 4토큰, 응답 시작 3토큰의 형식 오버헤드 포함)"""
+    return sum(count_tokens(message.get("content") or "", model) + 4 for message in messages) + 3
+
+# ==================================== 시작 시 예산 계산 ====================================
+@dataclass
+class PromptBudget:
+    ad_type: str
+    system_tokens: int
+    few_shot_tokens: int
+    prefix_tokens: int              # 매 요청마다 동일하게 전송되는 고정 prefix (system + few-shot)
+    few_shot_examples: int
+    few_shot_trimmed: int
+    tokenizer: str
+
+_budgets: Dict[str, PromptBudget] = {}
+
+def normalize_examples(examples: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """few-shot 내용의 앞뒤 공백을 정리합니다. 모든 요청에서 바이트 단위로 같은 prefix를 보내기 위함."""
+    return [{"role": example["role"], "content": example["content"].strip()} for example in examples]
+
+def trim_few_shot(examples: List[Dict[str, str]], max_tokens: Optional[int], model: str = settings.tokenizer_model) -> List[Dict[str, str]]:
+    """(user, assistant) 예시 쌍을 앞에서부터 max_tokens 안에 들어가는 만큼만 남깁니다."""
+    if max_tokens is None:
+        return examples
+    kept, used = [], 0
+    for i in range(0, len(examples), 2):
+        pair = examples[i:i + 2]
+        cost = count_message_tokens(pair, model) - 3
+        if used + cost > max_tokens:
+            break
+        kept.extend(pair)
+        used += cost
+    return kept
+
+def initialize(configs: Dict[str, PromptConfig] = PROMPT_CONFIGS, config: PromptBudgetSettings = settings) -> Dict[str, PromptBudget]:
+    """
+    lifespan 시작 시 한 번 호출합니다. 광고 유형별 프롬프트를 정리(공백 정리, few-shot 예산 적용)하여
+    configs를 갱신하고, 토큰 수를 계산해 둡니다.
+    """
+    model = config.tokenizer_model
+    for ad_type, prompt_config in list(configs.items()):
+        system_prompt = prompt_config.system_prompt.strip()
+        examples = normalize_examples(prompt_config.few_shot_examples)
+        max_tokens = config.few_shot_max_tokens_by_type.get(ad_type, config.few_shot_max_tokens)
+        kept = trim_few_shot(examples, max_tokens, model)
+        configs[ad_type] = prompt_config._replace(system_prompt=system_prompt, few_shot_examples=kept)
+
+        system_tokens = count_message_tokens([{"role": "system", "content": system_prompt}], model) - 3
+        few_shot_tokens = count_message_tokens(kept, model) - 3 if kept else 0
+        _budgets[ad_type] = PromptBudget(
+            ad_type=ad_type,
+            system_tokens=system_tokens,
+            few_shot_tokens=few_shot_tokens,
+            prefix_tokens=system_tokens + few_shot_tokens,
+            few_shot_examples=len(kept) // 2,
+            few_shot_trimmed=(len(examples) - len(kept)) // 2,
+            tokenizer=model if _encoder(model) is not None else "estimate",
+        )
+        logger.info(
+            f"프롬프트 예산 [{ad_type}] prefix {_budgets[ad_type].prefix_tokens} tokens "
+            f"(system {system_tokens}, few-shot {few_shot_tokens}, 예시 {len(kept) // 2}개, 제외 {_budgets[ad_type].few_shot_trimmed}개)"
+        )
+    return _budgets
+
+# ==================================== 요청별 사용량 집계 ====================================
+@dataclass
+class RequestUsage:
+    ad_type: str
+    calls: int = 0
+    response_cache_hits: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_prompt_tokens: int = 0   # 공급자 측 prompt caching으로 할인된 입력 토큰
+
+    def add(self, usage: Any):
+        self.calls += 1
+        self.prompt_tokens += _field(usage, "prompt_tokens")
+        self.completion_tokens += _field(usage, "completion_tokens")
+        self.cached_prompt_tokens += _field(_field(usage, "prompt_tokens_details", None), "cached_tokens")
+
+    def to_dict(self) -> Dict[str, Any]:
+        report = asdict(self)
+        budget = _budgets.get(self.ad_type)
+        if budget is not None:
+            report["prefix_tokens"] = budget.prefix_tokens
+        return report
+
+def _field(obj: Any, name: str, default: Any = 0) -> Any:
+    if obj is None:
+        return default
+    value = obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+    return default if value is None else value
+
+_current_usage: contextvars.ContextVar[Optional[RequestUsage]] = contextvars.ContextVar("prompt_usage", default=None)
+_totals: Dict[str, Dict[str, int]] = {}
+_totals_lock = threading.Lock()
+
+@contextmanager
+def track_usage(ad_type: str):
+    """
+    블록 안에서 OpenAIClient가 보낸 요청의 토큰 사용량을 모읍니다. (asyncio 태스크는 생성 시점의 context를 이어받음)
+        with prompt_budget.track_usage(req.ad_type) as usage: ...
+        usage.to_dict()
+    """
+    usage = RequestUsage(ad_type)
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        try:
+            _current_usage.reset(token)
+        except ValueError:  # 스트리밍 응답이 다른 context에서 닫힌 경우
+            pass
+        with _totals_lock:
+            totals = _totals.setdefault(ad_type, {"requests": 0, "calls": 0, "response_cache_hits": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_prompt_tokens": 0})
+            totals["requests"] += 1
+            for key in ("calls", "response_cache_hits", "prompt_tokens", "completion_tokens", "cached_prompt_tokens"):
+                totals[key] += getattr(usage, key)
+
+def record_usage(usage: Any):
+    """API 응답의 usage를 현재 요청에 더합니다."""
+    current = _current_usage.get()
+    if current is not None and usage is not None:
+        current.add(usage)
+
+def record_cache_hit():
+    current = _current_usage.get()
+    if current is not None:
+        current.response_cache_hits += 1
+
+def report() -> Dict[str, Any]:
+    with _totals_lock:
+        totals = {ad_type: dict(values) for ad_type, values in _totals.items()}
+    estimated = is_estimated()
+    return {
+        "tokenizer": "estimate" if estimated else settings.tokenizer_model,
+        "estimated": estimated,  # True면 tiktoken 없이 문자 종류별로 추정한 값 (budgets의 토큰 수, few-shot 자르기 기준)
+        "budgets": {ad_type: asdict(budget) for ad_type, budget in _budgets.items()},
+        "totals": totals,
+    }
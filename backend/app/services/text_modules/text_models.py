@@ -1,78 +1,261 @@
 import os
 import time
 import asyncio
-import hashlib
-import json
+from contextlib import asynccontextmanager
 from openai import AsyncOpenAI
+from utils.response_cache import ResponseCache
+from .text_prompts import DEFAULT_TEMPERATURES, CandidateStrategy
+from . import prompt_budget
 
 class OpenAIClient:
-    def __init__(self):  # .env 파일로 api key 관리해서 유포되지 않게 하기
+    def __init__(self, client: AsyncOpenAI = None, cache: ResponseCache = None, governor=None):  # .env 파일로 api key 관리해서 유포되지 않게 하기
         # main.py에서 한번만 로드되도록 수정됨
         # base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
         # env_path = os.path.join(base_dir, ".env")
         # load_dotenv(env_path)
 
+        # 서버에서는 lifespan에서 만든 공유 클라이언트(연결 풀)를 주입받고, 단독 실행 시에만 새로 생성
+        self.client = client if client is not None else AsyncOpenAI(api_key=self.load_api_key())  # 비동기 처리 가능한 openai 모델 사용
+        self.response_cache = cache if cache is not None else ResponseCache()  # 크기/TTL 제한이 있는 응답 캐시 (메모리 LRU + 선택적 SQLite)
+        self.governor = governor  # app.services.llm_governor.LLMGovernor (속도/동시성 제한 + 재시도), None이면 바로 호출
+
+    @staticmethod
+    def load_api_key():
         api_key = os.getenv("OPENAI_API_KEY")
         if api_key is None:
             raise ValueError(" !!! need to check .env or path !!! ")  # key가 없거나 파일이 누락된 경우 에러 반환
-        
-        self.client = AsyncOpenAI(api_key=api_key)  # 비동기 처리 가능한 openai 모델 사용
-        self.response_cache = {}  # 캐싱 딕셔너리
+        return api_key
+
+    async def close(self):
+        """HTTP 연결 풀을 닫습니다."""
+        await self.client.close()
     
-    def make_cache_key(self, system_prompt, user_prompt, temperature, few_shot_examples):
-        payload = {  # 비슷한 입력 들어왔을 때 캐싱된 값을 통해서 자원 절약을 위함
-            "system": system_prompt,
-            "user": user_prompt,
-            "temp": temperature,
-            "fewshot": few_shot_examples
-        }
-        raw = json.dumps(payload, sort_keys=True).encode()
-        return hashlib.sha256(raw).hexdigest()  # 각 결과에 대해 hash 키 값으로 저장해둠
+    def make_cache_key(self, system_prompt, user_prompt, temperature, few_shot_examples, model=None, max_tokens=None, n=1):
+        # 비슷한 입력 들어왔을 때 캐싱된 값을 통해서 자원 절약을 위함 (모델, 토큰 상한, 후보 수가 다르면 다른 키)
+        return ResponseCache.make_key(
+            "text",
+            system=system_prompt,
+            user=user_prompt,
+            temp=temperature,
+            fewshot=few_shot_examples,
+            model=model,
+            max_tokens=max_tokens,
+            n=n,
+        )  # 각 결과에 대해 hash 키 값으로 저장해둠
     
-    async def fetch_response(self, system_prompt, user_prompt, temperature, model="gpt-4.1-mini", few_shot_examples=None):
-        """단일 응답 생성"""
-        cache_key = self.make_cache_key(system_prompt, user_prompt, temperature, few_shot_examples)
-        
-        if cache_key in self.response_cache:
-            return temperature, self.response_cache[cache_key]["content"], self.response_cache[cache_key]["elapsed"]
-        
+    @staticmethod
+    def model_name(model_type: str) -> str:
+        return "gpt-4.1-mini" if model_type == "mini" else "gpt-4.1-nano"
+
+    @staticmethod
+    def build_messages(system_prompt, user_prompt, few_shot_examples=None):
+        # 고정 prefix(system + few-shot)를 앞에, 요청마다 바뀌는 사용자 입력을 마지막에 두어 공급자 측 prompt caching이 적중하도록 함
         messages = [{"role": "system", "content": system_prompt}]
         if few_shot_examples:  # few-shot 예시가 있으면  -> 추후 기능 확장 시에 few-shot 데이터가 없는 경우도 고려함
             messages.extend(few_shot_examples)
         messages.append({"role": "user", "content": user_prompt})
+        return messages
+
+    @staticmethod
+    def _completion_options(max_tokens=None, n=1):
+        options = {}
+        if max_tokens:
+            options["max_tokens"] = max_tokens
+        if n > 1:
+            options["n"] = n
+        return options
+
+    async def _create(self, model, messages, temperature, max_tokens=None, n=1):
+        """chat.completions.create 호출. governor가 있으면 속도/동시성 제한과 재시도를 거칩니다."""
+        request = dict(model=model, messages=messages, temperature=temperature, **self._completion_options(max_tokens, n))
+        if self.governor is None:
+            response = await self.client.chat.completions.create(**request)
+        else:
+            response = await self.governor.call(
+                model,
+                lambda: self.client.chat.completions.create(**request),
+                tokens=self.governor.estimate_tokens(messages, max_tokens, n),
+            )
+        prompt_budget.record_usage(getattr(response, "usage", None))
+        return response
+
+    @asynccontextmanager
+    async def _open_stream(self, model, messages, temperature, max_tokens=None, n=1):
+        """스트리밍 호출. governor가 있으면 스트림을 다 읽을 때까지 실행 슬롯을 유지합니다."""
+        request = dict(
+            model=model, messages=messages, temperature=temperature, stream=True,
+            stream_options={"include_usage": True},  # 마지막 청크에 토큰 사용량 포함
+            **self._completion_options(max_tokens, n)
+        )
+        if self.governor is None:
+            yield await self.client.chat.completions.create(**request)
+            return
+        async with self.governor.stream(
+            model,
+            lambda: self.client.chat.completions.create(**request),
+            tokens=self.governor.estimate_tokens(messages, max_tokens, n),
+        ) as stream:
+            yield stream
+
+    async def fetch_response(self, system_prompt, user_prompt, temperature, model="gpt-4.1-mini", few_shot_examples=None, max_tokens=None):
+        """단일 응답 생성"""
+        cache_key = self.make_cache_key(system_prompt, user_prompt, temperature, few_shot_examples, model, max_tokens)
+        
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            prompt_budget.record_cache_hit()
+            return temperature, cached["content"], cached["elapsed"]
+        
+        messages = self.build_messages(system_prompt, user_prompt, few_shot_examples)
         
         start = time.time()  # 응답시간 로깅용  -> 추후에는 삭제 가능
-        response = await self.client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature
-        )  # 비동기 처리
+        response = await self._create(model, messages, temperature, max_tokens)  # 비동기 처리
         elapsed = time.time() - start  # 응답 소요시간 계산  -> 이것도 삭제 가능
         
         content = response.choices[0].message.content.strip()
-        self.response_cache[cache_key] = {"content": content, "elapsed": elapsed}
+        self.response_cache.set(cache_key, {"content": content, "elapsed": elapsed})
         
         return temperature, content, elapsed
+
+    async def fetch_samples(self, system_prompt, user_prompt, temperature, n, model="gpt-4.1-mini", few_shot_examples=None, max_tokens=None):
+        """한 번의 요청으로 n개의 응답 생성 (API의 n 파라미터 사용, 입력 토큰은 한 번만 과금)"""
+        cache_key = self.make_cache_key(system_prompt, user_prompt, temperature, few_shot_examples, model, max_tokens, n)
+
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            prompt_budget.record_cache_hit()
+            return [(temperature, content, cached["elapsed"]) for content in cached["contents"]]
+
+        start = time.time()
+        response = await self._create(model, self.build_messages(system_prompt, user_prompt, few_shot_examples), temperature, max_tokens, n)
+        elapsed = time.time() - start
+
+        contents = [(choice.message.content or "").strip() for choice in sorted(response.choices, key=lambda c: c.index)]
+        self.response_cache.set(cache_key, {"contents": contents, "elapsed": elapsed})
+        return [(temperature, content, elapsed) for content in contents]
     
-    async def generate_multiple_responses(self, system_prompt, user_prompt, model="gpt-4.1-mini", few_shot_examples=None, temperatures=None):
-        """여러 온도 설정으로 응답 생성"""
+    async def generate_multiple_responses(self, system_prompt, user_prompt, model="gpt-4.1-mini", few_shot_examples=None, temperatures=None, max_tokens=None, early_return_k=None):
+        """여러 온도 설정으로 응답 생성 (early_return_k가 있으면 먼저 끝난 k개만 받고 나머지 요청은 취소)"""
         if temperatures is None:
-            temperatures = [0.2, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+            temperatures = DEFAULT_TEMPERATURES
         
         tasks = [
-            self.fetch_response(system_prompt, user_prompt, temp, model, few_shot_examples)
+            self.fetch_response(system_prompt, user_prompt, temp, model, few_shot_examples, max_tokens)
             for temp in temperatures
         ]
-        results = await asyncio.gather(*tasks)  # 비동기 처리
-        return results
+        if not early_return_k or early_return_k >= len(tasks):
+            results = await asyncio.gather(*tasks)  # 비동기 처리
+            return results
+
+        pending = [asyncio.ensure_future(task) for task in tasks]
+        results = []
+        try:
+            for finished in asyncio.as_completed(pending):
+                results.append(await finished)
+                if len(results) >= early_return_k:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+        order = {temp: i for i, temp in enumerate(temperatures)}
+        return sorted(results, key=lambda r: order[r[0]])  # 온도 순서 유지
+
+    async def generate_candidates(self, system_prompt, user_prompt, model="gpt-4.1-mini", few_shot_examples=None, strategy: CandidateStrategy = None):
+        """광고 유형별 전략(PROMPT_CONFIGS의 CandidateStrategy)에 따라 후보 문구를 생성합니다."""
+        strategy = strategy or CandidateStrategy()
+        if strategy.mode == "n":
+            return await self.fetch_samples(
+                system_prompt, user_prompt, strategy.temperature, strategy.count, model, few_shot_examples, strategy.max_tokens
+            )
+        return await self.generate_multiple_responses(
+            system_prompt, user_prompt, model=model, few_shot_examples=few_shot_examples,
+            temperatures=strategy.sweep_temperatures(), max_tokens=strategy.max_tokens, early_return_k=strategy.early_return_k
+        )
     
-    async def run_generation(self, model_type: str, user_prompt: str, system_prompt: str, few_shot_examples=None):
+    async def stream_response(self, system_prompt, user_prompt, temperature, model="gpt-4.1-mini", few_shot_examples=None, max_tokens=None, n=1):
+        """
+        응답을 스트리밍으로 생성합니다. (후보 인덱스, 토큰 조각)을 도착하는 대로 yield 하고, 완료되면 캐시에 저장합니다.
+        n > 1이면 한 번의 요청에서 n개 후보를 함께 받습니다.
+        """
+        cache_key = self.make_cache_key(system_prompt, user_prompt, temperature, few_shot_examples, model, max_tokens, n)
+
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            prompt_budget.record_cache_hit()
+            for index, content in enumerate(cached["contents"] if n > 1 else [cached["content"]]):
+                yield index, content
+            return
+
+        start = time.time()
+        parts = [[] for _ in range(n)]
+        async with self._open_stream(model, self.build_messages(system_prompt, user_prompt, few_shot_examples), temperature, max_tokens, n) as stream:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    prompt_budget.record_usage(chunk.usage)
+                for choice in chunk.choices:
+                    delta = choice.delta.content
+                    if delta:
+                        parts[choice.index].append(delta)
+                        yield choice.index, delta
+
+        contents = ["".join(p).strip() for p in parts]
+        elapsed = time.time() - start
+        self.response_cache.set(cache_key, {"contents": contents, "elapsed": elapsed} if n > 1 else {"content": contents[0], "elapsed": elapsed})
+
+    async def stream_multiple_responses(self, system_prompt, user_prompt, model="gpt-4.1-mini", few_shot_examples=None, strategy: CandidateStrategy = None):
+        """
+        전략에 따라 후보 문구를 동시에 스트리밍합니다. 후보별 이벤트를 도착하는 순서대로 yield 합니다.
+            - {"event": "delta", "index": i, "temperature": t, "text": 토큰 조각}
+            - {"event": "candidate", "index": i, "temperature": t, "content": 완성된 문구, "elapsed": 소요 시간}
+            - {"event": "candidate_error", "index": i, "temperature": t, "error": 오류 메시지}
+        early_return_k개의 후보가 완성되거나 호출 측이 중간에 반복을 멈추면 남은 요청은 취소됩니다.
+        """
+        strategy = strategy or CandidateStrategy()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def produce(indices, temperature, n):
+            start = time.time()
+            parts = {index: [] for index in indices}
+            try:
+                async for offset, delta in self.stream_response(system_prompt, user_prompt, temperature, model, few_shot_examples, strategy.max_tokens, n):
+                    index = indices[offset]
+                    parts[index].append(delta)
+                    await queue.put({"event": "delta", "index": index, "temperature": temperature, "text": delta})
+                for index in indices:
+                    await queue.put({"event": "candidate", "index": index, "temperature": temperature, "content": "".join(parts[index]).strip(), "elapsed": time.time() - start})
+            except Exception as e:
+                for index in indices:
+                    await queue.put({"event": "candidate_error", "index": index, "temperature": temperature, "error": str(e)})
+
+        if strategy.mode == "n":
+            tasks = [asyncio.create_task(produce(list(range(strategy.count)), strategy.temperature, strategy.count))]
+            remaining = strategy.count
+        else:
+            temperatures = strategy.sweep_temperatures()
+            tasks = [asyncio.create_task(produce([i], temp, 1)) for i, temp in enumerate(temperatures)]
+            remaining = len(temperatures)
+
+        completed = 0
+        try:
+            while remaining:
+                event = await queue.get()
+                yield event
+                if event["event"] != "delta":
+                    remaining -= 1
+                    completed += event["event"] == "candidate"
+                    if strategy.early_return_k and completed >= strategy.early_return_k:
+                        break
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run_generation(self, model_type: str, user_prompt: str, system_prompt: str, few_shot_examples=None, strategy: CandidateStrategy = None):
         """전체 생성 과정 실행"""
         zero_set = time.time()  # 사용자 입력 완료 시간
-        model_name = "gpt-4.1-mini" if model_type == "mini" else "gpt-4.1-nano"
+        model_name = self.model_name(model_type)
         
-        results = await self.generate_multiple_responses(
-            system_prompt, user_prompt, model=model_name, few_shot_examples=few_shot_examples
+        results = await self.generate_candidates(
+            system_prompt, user_prompt, model=model_name, few_shot_examples=few_shot_examples, strategy=strategy
         )
  
         last_time = time.time()  # 결과 출력 완료 시간
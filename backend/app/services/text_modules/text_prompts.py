@@ -1,3 +1,42 @@
+from dataclasses import dataclass
+from typing import List, Literal, NamedTuple, Optional
+
+DEFAULT_TEMPERATURES = [0.2, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+
+@dataclass(frozen=True)
+class CandidateStrategy:
+    """
+    광고 유형별 후보 문구 생성 전략.
+
+    - mode="sweep": 온도를 바꿔가며 count번 요청 (temperatures에서 고르게 count개 선택)
+    - mode="n": 한 번의 요청에서 API의 n 파라미터로 count개 후보를 받음 (temperature 하나 사용)
+    - max_tokens: 후보 하나당 출력 토큰 상한 (None이면 제한 없음)
+    - early_return_k: sweep 모드에서 먼저 끝난 k개 후보만 받고 나머지 요청은 취소 (None이면 전부 기다림)
+    - top_k: 중복 제거와 점수 정렬(candidate_ranker) 후 응답에 남길 후보 수 (None이면 전부)
+    - dedup_threshold: 추정 Jaccard 유사도가 이 값 이상인 후보는 거의 같은 문구로 보고 하나만 남김
+    """
+    mode: Literal["sweep", "n"] = "sweep"
+    count: int = len(DEFAULT_TEMPERATURES)
+    temperatures: tuple = tuple(DEFAULT_TEMPERATURES)
+    temperature: float = 0.8
+    max_tokens: Optional[int] = None
+    early_return_k: Optional[int] = None
+    top_k: Optional[int] = None
+    dedup_threshold: float = 0.7
+
+    def sweep_temperatures(self) -> List[float]:
+        temps = list(self.temperatures)
+        if self.count >= len(temps):
+            return temps
+        if self.count <= 1:
+            return temps[:1]
+        return [temps[round(i * (len(temps) - 1) / (self.count - 1))] for i in range(self.count)]
+
+class PromptConfig(NamedTuple):
+    system_prompt: str
+    few_shot_examples: list
+    strategy: CandidateStrategy = CandidateStrategy()
+
 # ==================================== insta ====================================
 system_prompt_insta = """
 너는 소상공인들을 위한 인스타그램 광고 문구 생성기야. 사용자가 입력한 키워드(상품, 서비스, 장소, 특징 등)를 바탕으로 **스토리텔링이 있는 광고 문구**를 만들어줘.
@@ -234,8 +273,9 @@ few_shot_examples_poster = [
 ]
 
 # 딕셔너리로 편하게 불러오기 위함
+# 광고 유형별 후보 생성 전략: 지연 시간과 비용은 요청 수(count, mode)와 출력 토큰 상한(max_tokens)으로 조절
 PROMPT_CONFIGS = {
-    "instagram": (system_prompt_insta, few_shot_examples_insta),
-    "blog": (system_prompt_blog, few_shot_examples_blog),
-    "poster": (system_prompt_poster, few_shot_examples_poster)
+    "instagram": PromptConfig(system_prompt_insta, few_shot_examples_insta, CandidateStrategy(mode="sweep", count=8, max_tokens=600, top_k=4)),
+    "blog": PromptConfig(system_prompt_blog, few_shot_examples_blog, CandidateStrategy(mode="sweep", count=4, max_tokens=1500, early_return_k=3, top_k=3)),
+    "poster": PromptConfig(system_prompt_poster, few_shot_examples_poster, CandidateStrategy(mode="n", count=8, temperature=0.9, max_tokens=120, top_k=5, dedup_threshold=0.6))
 }
\ No newline at end of file
@@ -0,0 +1,112 @@
+# backend/utils/cutout_cache.py
+
+import hashlib, json, logging, os, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+class CutoutCache:
+    """
+    배경 제거 결과(RGBA PNG)를 업로드 이미지 바이트의 해시와 rembg 설정으로 식별하여 디스크에 저장하는 캐시.
+    디스크 파일은 static 하위 디렉토리에 보관하고, 메모리에는 LRU 순서의 인덱스만 유지합니다.
+
+    Args:
+        directory: 캐시 파일을 저장할 디렉토리.
+        max_bytes: 캐시 파일 전체 크기 한도 (초과 시 오래 사용하지 않은 항목부터 삭제).
+        max_entries: 최대 항목 수.
+        max_age: 항목의 최대 보관 시간 (초).
+    """
+    def __init__(self, directory: Union[str, os.PathLike], max_bytes: int = 512 * 1024 * 1024, max_entries: int = 2000, max_age: float = 7 * 24 * 3600):
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._index: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()  # key -> (파일 크기, 생성 시각)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(image_bytes: bytes, params: Optional[Dict[str, Any]] = None) -> str:
+        """업로드 이미지 바이트의 SHA-256 해시와 배경 제거 설정으로 캐시 키를 생성합니다."""
+        image_hash = hashlib.sha256(image_bytes).hexdigest()
+        raw = json.dumps({"image": image_hash, "params": params or {}}, sort_keys=True, default=str).encode()
+        return hashlib.sha256(raw).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """캐시된 배경 제거 이미지(PNG 바이트)를 반환합니다. 없거나 만료되었으면 None을 반환합니다."""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None or time.time() - entry[1] > self.max_age:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+            except OSError:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, image_bytes: bytes) -> str:
+        """배경 제거 이미지(PNG 바이트)를 저장하고 파일 경로를 반환합니다."""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(image_bytes)
+        os.replace(tmp_path, path)  # 여러 워커가 동시에 써도 완성된 파일만 보이도록 교체
+
+        with self._lock:
+            if key in self._index:
+                self._total_bytes -= self._index[key][0]
+            self._index[key] = (len(image_bytes), time.time())
+            self._index.move_to_end(key)
+            self._total_bytes += len(image_bytes)
+            self._evict()
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._index), "bytes": self._total_bytes}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.png")
+
+    def _load_index(self):
+        """디스크에 남아 있는 캐시 파일로 인덱스를 복원합니다. (수정 시각 순)"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".png"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for mtime, key, size in sorted(entries):
+            self._index[key] = (size, mtime)
+            self._total_bytes += size
+        with self._lock:
+            self._evict()
+        logger.info(f"배경 제거 캐시 인덱스 복원: {len(self._index)}개, {self._total_bytes} bytes")
+
+    def _evict(self):
+        now = time.time()
+        for key in [k for k, (_, created_at) in self._index.items() if now - created_at > self.max_age]:
+            self._remove(key)
+        while self._index and (self._total_bytes > self.max_bytes or len(self._index) > self.max_entries):
+            self._remove(next(iter(self._index)))
+
+    def _remove(self, key: str):
+        size, _ = self._index.pop(key)
+        self._total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
@@ -0,0 +1,206 @@
+# backend/utils/fake_openai_server.py
+# 실행 : cd backend && uvicorn utils.fake_openai_server:app --port 8100
+# 백엔드를 이 서버에 연결 : OPENAI_CLIENT_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=local uvicorn app.main:app
+#
+# OpenAI Chat Completions API(/v1/chat/completions)를 흉내 내는 로컬 서버입니다.
+# 네트워크나 API 비용 없이 텍스트 생성/광고 기획 경로를 부하 테스트하고 벤치마크하기 위해 사용합니다.
+#  - 같은 요청(모델, 메시지, 온도, 후보 인덱스)에는 항상 같은 응답을 돌려줍니다.
+#  - 응답 지연은 분포(fixed / uniform / normal / lognormal)로 설정하며, 스트리밍은 토큰 간 지연을 추가합니다.
+#  - error_rate 비율로 429/500/503 오류를 주입합니다. (429에는 Retry-After 헤더 포함)
+#  - response_format이 json_schema이면 스키마의 문자열 필드를 채운 JSON 객체를 돌려줍니다.
+
+import asyncio, hashlib, json, math, random, time, uuid
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic_settings import BaseSettings
+
+class FakeOpenAISettings(BaseSettings):
+    """로컬 stand-in 서버 설정 (환경 변수 FAKE_OPENAI_* 로 변경 가능)"""
+    latency_distribution: str = "lognormal"     # fixed / uniform / normal / lognormal
+    latency_ms: float = 800.0                    # 첫 토큰까지의 지연 (분포의 중앙값 또는 평균)
+    latency_spread_ms: float = 400.0             # uniform: ±폭, normal: 표준편차, lognormal: 중앙값 대비 p84 차이
+    token_latency_ms: float = 15.0               # 스트리밍 시 토큰(단어) 사이 지연
+    error_rate: float = 0.0                      # 0.0 ~ 1.0
+    error_statuses: str = "429,500,503"
+    retry_after_sec: float = 1.0
+    seed: int = 0
+    canned_responses_path: str = ""              # {"키워드": "응답", ...} JSON. 마지막 user 메시지에 키워드가 있으면 해당 응답 사용
+
+    class Config:
+        env_file = ".env"
+        extra = "allow"
+        env_prefix = "FAKE_OPENAI_"
+
+settings = FakeOpenAISettings()
+app = FastAPI(title="Local OpenAI stand-in")
+_rng = random.Random(settings.seed)
+_stats = {"requests": 0, "errors": 0, "streams": 0}
+
+DEFAULT_PHRASES = [
+    "오늘 하루를 특별하게 만들어 줄 한 잔",
+    "지금 아니면 만날 수 없는 한정 메뉴",
+    "당신의 일상에 작은 여유를 더하세요",
+    "한입이면 빠져드는 그 맛",
+    "soft morning light, wooden table, shallow depth of field, warm tones, eye-level shot",
+    "minimal studio backdrop, pastel gradient, soft shadows, product centered, 50mm lens",
+    "cozy cafe interior, bokeh lights, natural textures, golden hour, close-up",
+    "clean marble surface, fresh greenery, diffused daylight, top-down view",
+]
+
+def _load_canned() -> Dict[str, str]:
+    if not settings.canned_responses_path:
+        return {}
+    with open(settings.canned_responses_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+_canned = _load_canned()
+
+def _latency_seconds() -> float:
+    mean = settings.latency_ms
+    spread = settings.latency_spread_ms
+    dist = settings.latency_distribution
+    if dist == "uniform":
+        value = _rng.uniform(mean - spread, mean + spread)
+    elif dist == "normal":
+        value = _rng.gauss(mean, spread)
+    elif dist == "lognormal":
+        sigma = math.log1p(spread / mean) if mean > 0 else 0.0
+        value = mean * math.exp(_rng.gauss(0.0, sigma))
+    else:
+        value = mean
+    return max(0.0, value) / 1000
+
+def _text_of(content: Any) -> str:
+    """content가 문자열이거나 [{"type": "text"}, {"type": "image_url"}] 리스트인 경우 모두 텍스트만 추출합니다."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict) and part.get("type") == "text")
+    return ""
+
+def _count_images(messages: List[Dict[str, Any]]) -> int:
+    return sum(
+        1
+        for message in messages if isinstance(message.get("content"), list)
+        for part in message["content"] if isinstance(part, dict) and part.get("type") == "image_url"
+    )
+
+def _completion_text(body: Dict[str, Any], index: int) -> str:
+    """요청 내용과 후보 인덱스로 결정되는 응답 문장을 만듭니다."""
+    messages = body.get("messages", [])
+    last_user = next((_text_of(m.get("content")) for m in reversed(messages) if m.get("role") == "user"), "")
+    for keyword, response in _canned.items():
+        if keyword in last_user:
+            return response
+
+    raw = json.dumps({"model": body.get("model"), "messages": messages, "temperature": body.get("temperature"), "index": index}, sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.sha256(raw.encode()).digest()
+    count = 2 + digest[0] % 3
+    phrases = [DEFAULT_PHRASES[digest[i + 1] % len(DEFAULT_PHRASES)] for i in range(count)]
+    images = _count_images(messages)
+    suffix = f" (이미지 {images}장 참고)" if images else ""
+
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        properties = (response_format.get("json_schema") or {}).get("schema", {}).get("properties", {})
+        return json.dumps({name: ", ".join(phrases) for name in properties}, ensure_ascii=False)
+    if response_format.get("type") == "json_object":
+        return json.dumps({"text": ", ".join(phrases) + suffix}, ensure_ascii=False)
+    return ", ".join(phrases) + suffix
+
+def _truncate(text: str, max_tokens: Optional[int]) -> Tuple[str, str]:
+    """단어를 토큰으로 간주하여 max_tokens에서 자릅니다. (텍스트, finish_reason) JSON 응답도 그대로 잘리므로 검증 실패 경로를 재현할 수 있습니다."""
+    words = text.split(" ")
+    if max_tokens and len(words) > max_tokens:
+        return " ".join(words[:max_tokens]), "length"
+    return text, "stop"
+
+def _usage(body: Dict[str, Any], outputs: List[str]) -> Dict[str, int]:
+    prompt_tokens = sum(len(_text_of(m.get("content")).split()) for m in body.get("messages", [])) + 85 * _count_images(body.get("messages", []))
+    completion_tokens = sum(len(text.split()) for text in outputs)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+def _maybe_error() -> Optional[JSONResponse]:
+    if settings.error_rate <= 0 or _rng.random() >= settings.error_rate:
+        return None
+    _stats["errors"] += 1
+    status_code = int(_rng.choice([s for s in settings.error_statuses.split(",") if s.strip()]))
+    headers = {"Retry-After": str(settings.retry_after_sec)} if status_code == 429 else {}
+    error_type = "rate_limit_exceeded" if status_code == 429 else "server_error"
+    return JSONResponse(
+        status_code=status_code,
+        headers=headers,
+        content={"error": {"message": f"Injected {status_code} error", "type": error_type, "code": error_type}},
+    )
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    _stats["requests"] += 1
+    await asyncio.sleep(_latency_seconds())
+
+    error = _maybe_error()
+    if error is not None:
+        return error
+
+    n = int(body.get("n") or 1)
+    max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+    outputs = [_truncate(_completion_text(body, i), max_tokens) for i in range(n)]
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+    model = body.get("model", "gpt-4.1-mini")
+
+    if body.get("stream"):
+        _stats["streams"] += 1
+        usage = _usage(body, [text for text, _ in outputs]) if (body.get("stream_options") or {}).get("include_usage") else None
+        return StreamingResponse(_stream(completion_id, created, model, outputs, usage), media_type="text/event-stream")
+
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [
+            {"index": i, "message": {"role": "assistant", "content": text}, "finish_reason": finish_reason}
+            for i, (text, finish_reason) in enumerate(outputs)
+        ],
+        "usage": _usage(body, [text for text, _ in outputs]),
+    }
+
+async def _stream(completion_id: str, created: int, model: str, outputs, usage: Optional[Dict[str, int]] = None):
+    def chunk(index: int, delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": index, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    for index in range(len(outputs)):
+        yield chunk(index, {"role": "assistant", "content": ""})
+
+    # 후보들의 단어를 번갈아 전송 (실제 API처럼 여러 후보가 섞여서 도착)
+    words = [text.split(" ") for text, _ in outputs]
+    for position in range(max((len(w) for w in words), default=0)):
+        for index, tokens in enumerate(words):
+            if position < len(tokens):
+                yield chunk(index, {"content": tokens[position] if position == 0 else " " + tokens[position]})
+        await asyncio.sleep(settings.token_latency_ms / 1000)
+
+    for index, (_, finish_reason) in enumerate(outputs):
+        yield chunk(index, {}, finish_reason)
+    if usage is not None:  # stream_options.include_usage: choices가 빈 마지막 청크에 사용량 전송
+        payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model, "choices": [], "usage": usage}
+        yield f"data: {json.dumps(payload)}\n\n"
+    yield "data: [DONE]\n\n"
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [{"id": name, "object": "model", "owned_by": "local"} for name in ["gpt-4.1-mini", "gpt-4.1-nano"]]}
+
+@app.get("/stats")
+async def get_stats():
+    return {**_stats, "settings": settings.model_dump()}
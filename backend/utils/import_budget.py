@@ -0,0 +1,58 @@
+# backend/utils/import_budget.py
+# 실행 : cd backend && python -m utils.import_budget --budget 3.0
+# `python -X importtime`으로 app.main의 import 시간을 측정하고, 예산을 넘거나
+# 무거운 모델 라이브러리가 import 시점에 로드되면 0이 아닌 종료 코드를 반환합니다.
+
+import argparse, os, subprocess, sys
+from typing import Dict, List, Tuple
+
+BACKEND_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# import 시점에 로드되면 안 되는 모듈 (lifespan warm-up 또는 첫 요청 때 로드)
+DEFERRED_MODULES = ["torch", "diffusers", "transformers", "rembg", "onnxruntime"]
+
+def measure_import_time(module: str = "app.main") -> Dict[str, Tuple[int, int]]:
+    """모듈을 새 인터프리터에서 import 하고, 모듈별 (self, cumulative) 시간(us)을 반환합니다."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_ROOT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{module} import 실패:\n{completed.stderr[-2000:]}")
+
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="app.main import 시간 예산 확인")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_SEC", "3.0")), help="허용 import 시간 (초)")
+    parser.add_argument("--top", type=int, default=15, help="출력할 느린 모듈 수")
+    args = parser.parse_args(argv)
+
+    timings = measure_import_time(args.module)
+    total = timings.get(args.module, (0, 0))[1] / 1e6
+
+    print(f"{args.module} import 시간: {total:.3f}초 (예산 {args.budget:.3f}초)")
+    print("가장 느린 모듈 (cumulative):")
+    for name, (_, cumulative) in sorted(timings.items(), key=lambda x: x[1][1], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1e6:8.3f}초  {name}")
+
+    loaded_deferred = [m for m in DEFERRED_MODULES if m in timings]
+    if loaded_deferred:
+        print(f"import 시점에 로드된 무거운 모듈: {loaded_deferred}")
+    if total > args.budget or loaded_deferred:
+        print("FAIL")
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+# backend/utils/llm_tokens.py
+
+from typing import Any, Dict, List, Optional
+
+def estimate_request_tokens(messages: List[Dict[str, Any]], max_tokens: Optional[int] = None, n: int = 1, default_output_tokens: int = 512) -> int:
+    """요청의 입력 + 출력 토큰 수를 대략 추정합니다. (텍스트 3글자당 1토큰, 이미지 1장당 765토큰)"""
+    prompt_tokens = 0
+    for message in messages:
+        content = message.get("content")
+        parts = content if isinstance(content, list) else [{"type": "text", "text": content or ""}]
+        for part in parts:
+            if part.get("type") == "image_url":
+                prompt_tokens += 765
+            else:
+                prompt_tokens += len(part.get("text", "")) // 3 + 1
+        prompt_tokens += 4
+    return prompt_tokens + (max_tokens or default_output_tokens) * max(n, 1)
@@ -0,0 +1,94 @@
+# backend/utils/loadtest_event_loop.py
+# 실행 : cd backend && python -m utils.loadtest_event_loop --url http://localhost:8000 --image sample.png --session-id <세션ID>
+# 무거운 엔드포인트(기본: /image/preprocess)에 동시 요청을 보내는 동안 가벼운 엔드포인트(/)의 응답 시간을 측정합니다.
+# 블로킹 작업이 이벤트 루프를 막으면 가벼운 엔드포인트의 p99가 무거운 요청의 처리 시간만큼 늘어납니다.
+# 가벼운 요청의 p99 / 최대 응답 시간이 허용치를 넘거나 측정값이 없으면 종료 코드 1로 실패합니다. (CI 등에서 회귀 확인용)
+
+import argparse, asyncio, os, statistics, time
+from typing import Dict, List
+import aiohttp
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def ping_loop(session: aiohttp.ClientSession, url: str, stop: asyncio.Event, interval: float, latencies: List[float]):
+    """stop이 설정될 때까지 interval 간격으로 가벼운 엔드포인트를 호출하고 응답 시간(ms)을 기록합니다."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        async with session.get(url) as response:
+            await response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+
+async def heavy_request(session: aiohttp.ClientSession, url: str, image_bytes: bytes, headers: Dict[str, str], results: Dict[int, int]):
+    form = aiohttp.FormData()
+    form.add_field("file", image_bytes, filename="loadtest.png", content_type="image/png")
+    async with session.post(url, data=form, headers=headers) as response:
+        await response.read()
+        results[response.status] = results.get(response.status, 0) + 1
+
+async def run(args) -> int:
+    with open(args.image, "rb") as f:
+        image_bytes = f.read()
+    headers = {"session-id": args.session_id, "category": args.category}
+
+    latencies: List[float] = []
+    results: Dict[int, int] = {}
+    stop = asyncio.Event()
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        pings = [asyncio.create_task(ping_loop(session, f"{args.url}/", stop, args.ping_interval, latencies)) for _ in range(args.pingers)]
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def bounded():
+            async with semaphore:
+                await heavy_request(session, f"{args.url}{args.heavy_path}", image_bytes, headers, results)
+
+        await asyncio.gather(*(bounded() for _ in range(args.requests)), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*pings, return_exceptions=True)
+
+    print(f"무거운 요청 {args.requests}건 (동시 {args.concurrency}) : {elapsed:.2f}초, 상태 코드 {results}")
+    print(f"가벼운 요청 {len(latencies)}건 : p50 {percentile(latencies, 50):.1f}ms, "
+          f"p99 {percentile(latencies, 99):.1f}ms, max {max(latencies, default=0):.1f}ms, "
+          f"mean {statistics.fmean(latencies) if latencies else 0:.1f}ms")
+    failures = []
+    if not latencies:
+        failures.append("가벼운 요청의 응답 시간을 하나도 측정하지 못했습니다.")
+    if percentile(latencies, 99) > args.p99_budget_ms:
+        failures.append(f"p99 {percentile(latencies, 99):.1f}ms가 허용치({args.p99_budget_ms}ms)를 초과했습니다.")
+    if max(latencies, default=0) > args.max_budget_ms:
+        failures.append(f"최대 응답 시간 {max(latencies):.1f}ms가 허용치({args.max_budget_ms}ms)를 초과했습니다.")
+    if failures:
+        print("FAIL: 이벤트 루프가 블로킹되고 있을 수 있습니다.")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("PASS: 무거운 요청을 처리하는 동안 이벤트 루프가 응답했습니다.")
+    return 0
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="이벤트 루프 블로킹 부하 테스트")
+    parser.add_argument("--url", default=os.getenv("LOADTEST_URL", "http://localhost:8000"))
+    parser.add_argument("--heavy-path", default="/image/preprocess")
+    parser.add_argument("--image", required=True, help="업로드할 이미지 파일")
+    parser.add_argument("--session-id", required=True)
+    parser.add_argument("--category", default="food")
+    parser.add_argument("--requests", type=int, default=32, help="무거운 요청 수")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--pingers", type=int, default=2)
+    parser.add_argument("--ping-interval", type=float, default=0.05, help="가벼운 요청 간격 (초)")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--p99-budget-ms", type=float, default=200, help="가벼운 요청 p99 허용치 (초과 시 종료 코드 1)")
+    parser.add_argument("--max-budget-ms", type=float, default=1000, help="가벼운 요청 최대 응답 시간 허용치 (초과 시 종료 코드 1)")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,213 @@
+# backend/utils/response_cache.py
+
+import hashlib, json, logging, os, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """
+    LLM 응답 캐시. 프로세스 메모리의 LRU 계층과, 선택적으로 여러 워커 프로세스가 공유하는 SQLite 계층으로 구성됩니다.
+    값은 JSON으로 직렬화하며, 메모리 계층은 직렬화된 크기(byte)로 한도를 관리합니다.
+
+    Args:
+        max_bytes: 메모리 계층 전체 크기 한도 (초과 시 오래 사용하지 않은 항목부터 삭제).
+        max_entries: 메모리 계층 최대 항목 수.
+        ttl: 항목의 기본 보관 시간 (초). set 호출 시 항목별로 지정할 수 있습니다. None이면 만료되지 않습니다.
+        sqlite_path: SQLite 파일 경로. None이면 메모리 계층만 사용합니다.
+        max_disk_bytes: SQLite 계층 전체 크기 한도.
+    """
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entries: int = 5000,
+        ttl: Optional[float] = 24 * 3600,
+        sqlite_path: Optional[str] = None,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sqlite_path = sqlite_path
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, Tuple[str, int, Optional[float]]]" = OrderedDict()  # key -> (JSON, 크기, 만료 시각)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()  # sqlite3 연결은 스레드마다 따로 생성
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if sqlite_path:
+            os.makedirs(os.path.dirname(os.path.abspath(sqlite_path)), exist_ok=True)
+            self._init_db()
+
+    @staticmethod
+    def make_key(namespace: str, **payload: Any) -> str:
+        """요청을 구성하는 값(모델, 메시지, 온도 등)으로 캐시 키를 생성합니다."""
+        raw = json.dumps({"ns": namespace, **payload}, sort_keys=True, ensure_ascii=False, default=str).encode()
+        return hashlib.sha256(raw).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """캐시된 값을 반환합니다. 없거나 만료되었으면 None을 반환합니다."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[2] is not None and entry[2] < now:
+                    self._remove(key)
+                    self.expirations += 1
+                else:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return json.loads(entry[0])
+
+        if self.sqlite_path:
+            row = self._disk_get(key, now)
+            if row is not None:
+                value_json, expires_at = row
+                with self._lock:
+                    self.disk_hits += 1
+                    self._memory_put(key, value_json, expires_at)
+                return json.loads(value_json)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """값을 저장합니다. ttl을 지정하지 않으면 기본 ttl을 사용합니다."""
+        value_json = json.dumps(value, ensure_ascii=False)
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._memory_put(key, value_json, expires_at)
+        if self.sqlite_path:
+            try:
+                self._disk_put(key, value_json, expires_at)
+            except sqlite3.Error as e:
+                logger.warning(f"응답 캐시 SQLite 저장 실패: {e}")
+
+    def delete(self, key: str):
+        """항목을 삭제합니다. (예: 저장 후 검증에 실패한 응답)"""
+        with self._lock:
+            if key in self._memory:
+                self._remove(key)
+        if self.sqlite_path:
+            try:
+                conn = self._conn()
+                with conn:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            except sqlite3.Error as e:
+                logger.warning(f"응답 캐시 SQLite 삭제 실패: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.sqlite_path:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_bytes,
+            }
+        if self.sqlite_path:
+            try:
+                count, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+                stats.update({"disk_entries": count, "disk_bytes": size})
+            except sqlite3.Error as e:
+                stats["disk_error"] = str(e)
+        return stats
+
+    # 메모리 계층 (self._lock 안에서 호출)
+    def _memory_put(self, key: str, value_json: str, expires_at: Optional[float]):
+        size = len(key) + len(value_json.encode())
+        if size > self.max_bytes:
+            return
+        if key in self._memory:
+            self._remove(key)
+        self._memory[key] = (value_json, size, expires_at)
+        self._memory_bytes += size
+        while self._memory and (self._memory_bytes > self.max_bytes or len(self._memory) > self.max_entries):
+            self._remove(next(iter(self._memory)))
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        _, size, _ = self._memory.pop(key)
+        self._memory_bytes -= size
+
+    # SQLite 계층
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.sqlite_path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")       # 여러 워커 프로세스의 동시 읽기 허용
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+            conn.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[str, Optional[float]]]:
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            with conn:
+                if row[1] is not None and row[1] < now:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    with self._lock:
+                        self.expirations += 1
+                    return None
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return row
+        except sqlite3.Error as e:
+            logger.warning(f"응답 캐시 SQLite 조회 실패: {e}")
+            return None
+
+    def _disk_put(self, key: str, value_json: str, expires_at: Optional[float]):
+        conn = self._conn()
+        size = len(key) + len(value_json.encode())
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value_json, size, expires_at, time.time()),
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_disk_bytes:
+                # 오래 사용하지 않은 항목부터 한도의 90%까지 삭제
+                conn.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+                rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+                total = sum(size for _, size in rows)
+                victims = []
+                for victim, victim_size in rows:
+                    if total <= self.max_disk_bytes * 0.9:
+                        break
+                    victims.append((victim,))
+                    total -= victim_size
+                conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+                with self._lock:
+                    self.evictions += len(victims)
@@ -25,4 +25,12 @@ def save_image_to_disk(image: Image.Image, directory: Union[str, os.PathLike], p
     with open(file_path, "wb") as f:
         f.write(image_bytes)
     
+    return file_path
+
+def save_bytes_to_disk(image_bytes: bytes, directory: Union[str, os.PathLike]) -> str:
+    """이미 인코딩된 이미지 바이트를 다시 인코딩하지 않고 SHA 파일 이름으로 디스크에 저장."""
+    os.makedirs(directory, exist_ok=True)
+    file_path = os.path.join(directory, generate_sha_filename(image_bytes))
+    with open(file_path, "wb") as f:
+        f.write(image_bytes)
     return file_path
\ No newline at end of file
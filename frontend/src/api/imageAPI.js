@@ -19,22 +19,164 @@ export const preprocessImage = async (file, sessionId, category) => {
   });
 };
 
-export const generateBackground = async ({ mode, sessionId, prompt, productBox = null }) => {
+const JOB_POLL_INTERVAL_MS = 1000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+export const getJobStatus = async (jobId) => {
+  const response = await axios.get(`${IMAGE_API}/jobs/${jobId}`);
+  return response.data;
+};
+
+export const getJobResult = async (jobId) => {
+  const response = await axios.get(`${IMAGE_API}/jobs/${jobId}/result`);
+  return response.data;
+};
+
+// 세션 진행 이벤트 (GET /image/events, Server-Sent Events)
+export const PROGRESS_STAGES = [
+  "queued", "running", "cutout_ready", "canvas_ready", "plan_ready", "prompt_ready",
+  "diffusion_step", "scoring", "saved", "done", "failed",
+];
+
+// onEvent({ seq, stage, time, ... })를 호출하며, 반환한 함수로 구독을 끊습니다. (연결이 끊기면 브라우저가 Last-Event-ID로 다시 연결)
+// 브라우저가 다시 연결하지 않고 연결을 닫으면(예: /image/events가 200이 아닌 응답) onClosed를 호출합니다.
+export const subscribeProgress = (sessionId, onEvent, onClosed = null) => {
+  const source = new EventSource(`${IMAGE_API}/events?session_id=${encodeURIComponent(sessionId)}`);
+  PROGRESS_STAGES.forEach((stage) =>
+    source.addEventListener(stage, (e) => onEvent(JSON.parse(e.data)))
+  );
+  source.onerror = () => {
+    if (source.readyState === EventSource.CLOSED && onClosed) onClosed();
+  };
+  return () => source.close();
+};
+
+const pollJob = async (jobId) => {
+  while (true) {
+    let job;
+    try {
+      job = await getJobStatus(jobId);
+    } catch (err) {
+      if (err.response?.status === 404) {
+        throw new Error("작업을 찾을 수 없습니다. (서버가 다시 시작되었을 수 있습니다)");
+      }
+      throw err;
+    }
+    if (job.status === "done") {
+      return getJobResult(jobId);
+    }
+    if (job.status === "failed") {
+      throw new Error(job.error || "배경 생성 실패");
+    }
+    await sleep(JOB_POLL_INTERVAL_MS);
+  }
+};
+
+// 이 시간 동안 작업 이벤트가 없으면 작업 상태 조회로 전환 (서버 재시작으로 작업이 사라진 경우 등)
+const JOB_EVENT_IDLE_MS = 30000;
+
+// 작업을 등록하기 전에 구독하고, 이 작업의 queued 이벤트부터 done / failed까지의 이벤트를 onProgress로 전달합니다.
+// (이전 작업의 보관 이벤트는 건너뜀)
+// 이벤트 연결이 닫히거나 JOB_EVENT_IDLE_MS 동안 이벤트가 없으면 pollJob으로 결과를 기다립니다.
+const waitForJobEvents = (sessionId, submit, onProgress) =>
+  new Promise((resolve, reject) => {
+    let jobId = null;
+    let active = false;
+    let settled = false;
+    let polling = false;
+    let idleTimer = null;
+    const pending = [];
+
+    const finish = (callback, value) => {
+      if (settled) return;
+      settled = true;
+      clearTimeout(idleTimer);
+      close();
+      callback(value);
+    };
+
+    const fallback = () => {
+      if (settled || polling || !jobId) return;
+      polling = true;
+      clearTimeout(idleTimer);
+      close();
+      pollJob(jobId).then((result) => finish(resolve, result), (err) => finish(reject, err));
+    };
+
+    const resetIdle = () => {
+      clearTimeout(idleTimer);
+      idleTimer = setTimeout(fallback, JOB_EVENT_IDLE_MS);
+    };
+
+    const handle = (event) => {
+      if (polling) return;
+      if (!active) {
+        if (event.stage !== "queued" || event.job_id !== jobId) return;
+        active = true;
+      }
+      if (event.job_id && event.job_id !== jobId) return;
+      resetIdle();
+      if (onProgress) onProgress(event);
+      if (event.stage === "done") {
+        finish(resolve, event.result);
+      } else if (event.stage === "failed") {
+        finish(reject, new Error(event.error || "배경 생성 실패"));
+      }
+    };
+
+    let closed = false;
+    const close = subscribeProgress(
+      sessionId,
+      (event) => (jobId ? handle(event) : pending.push(event)),
+      () => {
+        closed = true;
+        fallback();
+      }
+    );
+    submit()
+      .then((id) => {
+        jobId = id;
+        if (closed) {
+          fallback();
+          return;
+        }
+        resetIdle();
+        pending.splice(0).forEach(handle);
+      })
+      .catch((err) => finish(reject, err));
+  });
+
+// phase: "full" (바로 생성) | "preview" (빠른 미리보기, 결과에 preview_id) | "refine" (previewId의 미리보기를 정제)
+// onProgress: 진행 이벤트 콜백 (EventSource를 지원하지 않으면 작업 상태 조회로 대체하며 호출되지 않음)
+export const generateBackground = async ({ mode, sessionId, prompt, productBox = null, phase = "full", previewId = null, profile = null, onProgress = null }) => {
   console.log("DEBUG: prompt before API call:", prompt);
-  return axios.post(
-    `${IMAGE_API}/generate-background`,
-    {
-      mode: mode,
-      prompt: prompt,
-      product_box: productBox,
-    },
-    {
-      headers: {
-        "session-id": sessionId,
-        "Content-Type": "application/json", 
+  const submit = async () => {
+    const submitted = await axios.post(
+      `${IMAGE_API}/generate-background`,
+      {
+        mode: mode,
+        prompt: prompt,
+        product_box: productBox,
+        phase: phase,
+        preview_id: previewId,
+        profile: profile,
       },
-    }
-  );
+      {
+        headers: {
+          "session-id": sessionId,
+          "Content-Type": "application/json", 
+        },
+      }
+    );
+    return submitted.data.job_id;
+  };
+
+  // 진행 이벤트로 작업 종료를 기다린 뒤 결과를 반환
+  if (typeof EventSource !== "undefined") {
+    return { data: await waitForJobEvents(sessionId, submit, onProgress) };
+  }
+  return { data: await pollJob(await submit()) };
 };
 
 export async function getGeneratedBackground(sessionId) {
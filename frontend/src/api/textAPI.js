@@ -26,6 +26,52 @@ export const generateAdText = async ({ ad_type, model_type, user_prompt, session
   return response.data.result;
 };
 
+/**
+ * 광고 문구 생성 스트리밍 API 호출 (Server-Sent Events)
+ * 후보별 토큰이 도착하는 대로 콜백을 호출하고, 전체 결과(generateAdText와 같은 형식)를 반환합니다.
+ * @param {Object} params - generateAdText와 같은 요청 파라미터
+ * @param {Object} handlers
+ * @param {(index: number, text: string) => void} [handlers.onDelta] - 토큰 조각 수신
+ * @param {(index: number, content: string) => void} [handlers.onCandidate] - 후보 하나 완성
+ */
+export const generateAdTextStream = async (
+  { ad_type, model_type, user_prompt, session_id },
+  { onDelta, onCandidate } = {}
+) => {
+  const response = await fetch(`${TEXT_API}/generate/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ ad_type, model_type, user_prompt, session_id }),
+  });
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({}));
+    throw new Error(error.detail || `광고 문구 생성 실패 (${response.status})`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || "{}");
+
+      if (event === "delta") onDelta?.(data.index, data.text);
+      else if (event === "candidate") onCandidate?.(data.index, data.content);
+      else if (event === "done") return data.result;
+      else if (event === "error") throw new Error(data.detail);
+    }
+  }
+  throw new Error("광고 문구 스트림이 완료되지 않았습니다.");
+};
+
 /**
  * 생성된 광고 문구를 백엔드에 저장하는 API 호출
  * @param {number} adId - 관련 광고의 ID
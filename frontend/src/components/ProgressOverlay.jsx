@@ -1,7 +1,8 @@
 import React, { useEffect, useState } from 'react';
 import './ProgressOverlay.css';
 
-const ProgressOverlay = ({ duration = 3000, processDone = false, customMessage = 'AI가 결과를 준비 중이에요' }) => {
+// progress: 서버 진행 이벤트로 계산한 { percent, message, previewUrl } (있으면 예상 시간 대신 표시)
+const ProgressOverlay = ({ duration = 3000, processDone = false, customMessage = 'AI가 결과를 준비 중이에요', progress = null }) => {
   const [width, setWidth] = useState(0);
   const [seconds, setSeconds] = useState((duration / 1000).toFixed(1));
   const [isOverDuration, setIsOverDuration] = useState(false);
@@ -40,6 +41,18 @@ const ProgressOverlay = ({ duration = 3000, processDone = false, customMessage =
 
   if (done) return null;
 
+  if (progress) {
+    return (
+      <div className="progress-overlay">
+        <div className="progress-bar" style={{ width: `${progress.percent}%` }}></div>
+        <div className="progress-time">
+          {progress.message || customMessage}
+          {progress.previewUrl && <img className="progress-preview" src={progress.previewUrl} alt="생성 중인 이미지 미리보기" />}
+        </div>
+      </div>
+    );
+  }
+
   return (
     <div className="progress-overlay">
       <div className="progress-bar" style={{ width: `${width}%` }}></div>
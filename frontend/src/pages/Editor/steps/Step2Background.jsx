@@ -18,8 +18,33 @@ const Step2Background = ({
   const [loading, setLoading] = useState(false);
   const [message, setMessage] = useState('');
   const [showProgress, setShowProgress] = useState(false);
+  const [progress, setProgress] = useState(null);
   const DURATION = 25000;
 
+  // 서버 진행 이벤트 → 진행률(%)과 안내 문구
+  const handleProgress = (event) => {
+    setProgress((prev) => {
+      const previewUrl = event.preview || prev?.previewUrl;
+      switch (event.stage) {
+        case 'queued': return { percent: 2, message: '⏳ 생성 대기 중이에요...' };
+        case 'running': return { percent: 5, message: '🧩 제품 이미지를 배치하고 있어요...' };
+        case 'canvas_ready': return { percent: 10, message: '🧠 광고 콘셉트를 기획하고 있어요...' };
+        case 'plan_ready': return { percent: 20, message: '📝 광고 콘셉트를 기획했어요' };
+        case 'prompt_ready': return { percent: 30, message: '🎨 배경을 그리기 시작해요' };
+        case 'diffusion_step':
+          return {
+            percent: 30 + Math.round((60 * event.step) / event.total),
+            message: `🌄 배경을 그리는 중 (${event.step}/${event.total})`,
+            previewUrl,
+          };
+        case 'scoring': return { percent: 92, message: '🔍 가장 잘 어울리는 배경을 고르고 있어요', previewUrl };
+        case 'saved': return { percent: 97, message: '💾 저장하고 있어요', previewUrl };
+        case 'done': return { percent: 100, message: '✅ 완료!' };
+        default: return prev;
+      }
+    });
+  };
+
   const handleGenerate = async () => {
     if (!localPrompt.trim()) {
       setMessage('❗ 프롬프트를 입력해 주세요.');
@@ -29,6 +54,7 @@ const Step2Background = ({
     setBgPrompt(localPrompt);
     setMessage('');
     setLoading(true);
+    setProgress(null);
     setShowProgress(true);
 
     const sdCanvType = {
@@ -84,6 +110,7 @@ const Step2Background = ({
         sessionId,
         prompt: localPrompt,
         productBox,
+        onProgress: handleProgress,
       });
 
       const imageUrl = await getGeneratedBackground(sessionId);
@@ -103,6 +130,7 @@ const Step2Background = ({
       {showProgress && <ProgressOverlay 
         duration={DURATION} 
         customMessage="🌄 배경 이미지를 자연스럽게 만들어내고 있어요..."
+        progress={progress}
 
       />
       }